@@ -0,0 +1,3 @@
+"""
+Performance benchmarks for bitforge. Run them with `python -m benchmarks`.
+"""
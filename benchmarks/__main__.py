@@ -0,0 +1,63 @@
+from __future__ import print_function, unicode_literals
+import argparse
+import fnmatch
+import sys
+
+from . import suites
+from .runner import *
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog = 'python -m benchmarks', description = 'Run bitforge benchmarks.')
+
+    parser.add_argument('-k', dest = 'pattern', default = '*',
+        help = 'only run benchmarks whose name matches this glob pattern')
+    parser.add_argument('--min-time', type = float, default = DEFAULT_MIN_TIME,
+        help = 'seconds spent timing each benchmark (default: %(default)s)')
+    parser.add_argument('--seed', type = int, default = DEFAULT_SEED,
+        help = 'random seed used to generate inputs (default: %(default)s)')
+    parser.add_argument('--save', metavar = 'PATH',
+        help = 'write results to a JSON file, to use later as --compare baseline')
+    parser.add_argument('--compare', metavar = 'PATH',
+        help = 'compare results against a baseline JSON file')
+    parser.add_argument('--threshold', type = float, default = 0.1,
+        help = 'ops/sec drop (fraction) reported as a regression (default: %(default)s)')
+    parser.add_argument('--list', action = 'store_true',
+        help = 'list benchmark names and exit')
+
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args  = parse_args(argv)
+    names = [ name for name in BENCHMARKS if fnmatch.fnmatch(name, args.pattern) ]
+
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    results = []
+    print(format_results([]))
+
+    # Print each row as soon as it's measured, some benchmarks take a while:
+    for name in names:
+        results.append(run(name, seed = args.seed, min_time = args.min_time))
+        print(format_results(results[-1:]).splitlines()[-1])
+        sys.stdout.flush()
+
+    if args.save:
+        save_results(results, args.save)
+
+    if args.compare:
+        comparisons = compare(load_results(args.compare), results, args.threshold)
+        print()
+        print(format_comparisons(comparisons))
+
+        if any(c.regressed for c in comparisons):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+import collections
+import json
+import os
+
+from bitforge import Transaction, Script, Opcode
+from bitforge.compat import chr, string_types
+from bitforge.encoding import decode_hex, encode_int, encode_script_number
+from bitforge.script import Interpreter
+from bitforge.script.opcode import OP_1
+
+
+TX_VALID_PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data', 'tx_valid.json')
+
+
+# One input of a corpus transaction, with everything needed to verify it:
+Spend = collections.namedtuple('Spend',
+    ['tx', 'nin', 'script_sig', 'script_pubkey', 'flags']
+)
+
+Corpus = collections.namedtuple('Corpus',
+    ['transactions', 'spends']
+)
+
+
+def push_bytes(data):
+    # Same encoding bitcoind uses for `CScript() << data`:
+    length = len(data)
+
+    if length < 76:
+        return chr(length) + data
+    elif length <= 0xFF:
+        return chr(76) + chr(length) + data
+    elif length <= 0xFFFF:
+        return chr(77) + encode_int(length, length = 2, big_endian = False) + data
+    else:
+        return chr(78) + encode_int(length, length = 4, big_endian = False) + data
+
+
+def parse_script(string):
+    """
+    Parse a script in the format of bitcoind's test data (see ParseScript in
+    bitcoind's core_read.cpp), where numbers are pushed, 0x-prefixed hex is
+    copied raw and opcodes may omit the OP_ prefix.
+    """
+    raw = b''
+
+    for word in string.split():
+        if word.isdigit() or (word.startswith('-') and word[1:].isdigit()):
+            number = int(word)
+
+            if number == 0:
+                raw += chr(0)
+            elif number == -1 or 1 <= number <= 16:
+                raw += chr(OP_1.number - 1 + number) # OP_1NEGATE, OP_1 ... OP_16
+            else:
+                raw += push_bytes(bytes(encode_script_number(number)))
+
+        elif word.startswith('0x') and len(word) > 2:
+            raw += decode_hex(word[2:])
+
+        elif len(word) >= 2 and word.startswith("'") and word.endswith("'"):
+            raw += push_bytes(word[1:-1].encode('utf-8'))
+
+        else:
+            name = word if word.startswith('OP_') else 'OP_' + word
+            raw += Opcode.from_name(name).bytes
+
+    return Script.from_bytes(raw)
+
+
+def parse_flags(string):
+    flags = 0
+
+    for name in filter(None, string.split(',')):
+        flags |= getattr(Interpreter, 'SCRIPT_VERIFY_' + name.strip(), 0)
+
+    return flags
+
+
+def load_tx_valid(path = TX_VALID_PATH):
+    """
+    Load bitcoind's tx_valid.json into a Corpus. Entries this library can't
+    parse yet (unknown opcode names, malformed scripts) are skipped, so the
+    corpus is always the same for a given file and library version.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+
+    transactions = []
+    spends = []
+
+    for entry in entries:
+        if not isinstance(entry[0], list):
+            continue # comment
+
+        try:
+            prevouts = {}
+            for prevout in entry[0]:
+                index = prevout[1] if prevout[1] >= 0 else 0xFFFFFFFF
+                prevouts[(prevout[0].lower(), index)] = parse_script(prevout[2])
+
+            tx = Transaction.from_hex(entry[1])
+
+        except Exception:
+            continue
+
+        transactions.append(tx)
+        flags = parse_flags(entry[2])
+
+        for nin, input in enumerate(tx.inputs):
+            tx_id = input.tx_id
+            if not isinstance(tx_id, string_types):
+                tx_id = tx_id.decode('ascii')
+
+            script_pubkey = prevouts.get((tx_id.lower(), input.txo_index))
+
+            if script_pubkey is not None:
+                spends.append(Spend(tx, nin, input.script, script_pubkey, flags))
+
+    return Corpus(transactions, spends)
@@ -0,0 +1,82 @@
+"""
+Measure the memory held by each instance of bitforge's value objects. Run it
+with `python -m benchmarks.memory`.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import collections
+import gc
+import random
+import sys
+
+from bitforge import PrivateKey, Address, Script, Instruction, Input, Output
+from bitforge.script import PayToPubkeyOut
+from bitforge.script.opcode import OP_DUP
+
+from .runner import DEFAULT_SEED, tracemalloc
+from .suites import random_bytes, random_privkeys
+
+
+DEFAULT_COUNT = 10000
+
+MemoryResult = collections.namedtuple('MemoryResult',
+    ['name', 'count', 'bytes_per_object', 'shallow_size']
+)
+
+
+def factories(rng):
+    # Arguments are built upfront, so only the object itself is measured:
+    privkeys = random_privkeys(rng, 8)
+    pubkey   = privkeys[0].to_public_key()
+    address  = pubkey.to_address()
+    script   = PayToPubkeyOut.create(address)
+
+    return collections.OrderedDict([
+        ('PrivateKey',  lambda i: PrivateKey(privkeys[i % 8].secret)),
+        ('PublicKey',   lambda i: pubkey._replace(compressed = bool(i % 2))),
+        ('Address',     lambda i: Address(address.phash, address.network)),
+        ('Instruction', lambda i: Instruction(OP_DUP)),
+        ('Script',      lambda i: Script(script.instructions)),
+        ('Input',       lambda i: Input(address.phash, i, script)),
+        ('Output',      lambda i: Output(i, script)),
+    ])
+
+
+def measure(name, factory, count):
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        before  = tracemalloc.get_traced_memory()[0]
+        objects = [ factory(i) for i in range(count) ]
+        after   = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    # Don't count the list holding the objects:
+    held = after - before - sys.getsizeof(objects)
+
+    return MemoryResult(name, count, held / float(count), sys.getsizeof(objects[0]))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'python -m benchmarks.memory', description = __doc__.strip())
+    parser.add_argument('--count', type = int, default = DEFAULT_COUNT)
+    parser.add_argument('--seed', type = int, default = DEFAULT_SEED)
+    args = parser.parse_args(argv)
+
+    if tracemalloc is None:
+        print('tracemalloc is not available on this Python')
+        return 1
+
+    print("%-16s %10s %16s %14s" % ('object', 'count', 'bytes/object', 'sizeof'))
+
+    for name, factory in factories(random.Random(args.seed)).items():
+        r = measure(name, factory, args.count)
+        print("%-16s %10d %16.1f %14d" % (r.name, r.count, r.bytes_per_object, r.shallow_size))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
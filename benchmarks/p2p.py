@@ -0,0 +1,53 @@
+"""
+Benchmarks of asyncio peer connections (Python 3.7+), registered by suites.
+"""
+from __future__ import unicode_literals
+import asyncio
+
+from bitforge import Transaction
+from bitforge.encoding import encode_hex
+from bitforge.transaction import AddressInput, AddressOutput
+from bitforge.p2p.peer import PeerPool
+from bitforge.p2p.testing import FakePeer
+
+from .runner import benchmark
+from .suites import random_bytes, random_privkeys
+
+
+@benchmark('p2p.ingest')
+def p2p_ingest(rng):
+    # 4 local peers announcing 500 transactions each, fetched into one pool:
+    address = random_privkeys(rng, 1)[0].to_address()
+    batches = [
+        [
+            Transaction([ AddressInput.create(encode_hex(random_bytes(rng, 32)).decode('ascii'), 0, address) ],
+                        [ AddressOutput.create(rng.randrange(1, 10 ** 8), address) ])
+            for i in range(500)
+        ]
+        for peer in range(4)
+    ]
+
+    async def ingest():
+        fakes = [ await FakePeer(txs).start() for txs in batches ]
+        pool  = PeerPool(queue_size = 100)
+
+        for fake in fakes:
+            await pool.connect('127.0.0.1', fake.port)
+
+        for i in range(2000):
+            await pool.get()
+
+        await pool.close()
+
+        for fake in fakes:
+            await fake.close()
+
+    def run():
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(ingest())
+        finally:
+            loop.close()
+
+    return [ run ]
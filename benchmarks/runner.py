@@ -0,0 +1,165 @@
+from __future__ import unicode_literals
+from timeit import default_timer as timer
+import collections
+import gc
+import itertools
+import json
+import platform
+import random
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None # Python < 3.4, peak memory is not reported
+
+
+DEFAULT_SEED     = 1337
+DEFAULT_MIN_TIME = 1.0  # seconds spent timing each benchmark
+DEFAULT_MIN_OPS  = 20
+MEMORY_SAMPLES   = 10   # operations traced to estimate peak memory
+
+BENCHMARKS = collections.OrderedDict() # name -> setup function, see @benchmark
+
+
+Result = collections.namedtuple('Result',
+    ['name', 'ops', 'ops_per_sec', 'p50', 'p90', 'p99', 'peak_memory']
+)
+
+Comparison = collections.namedtuple('Comparison',
+    ['name', 'baseline', 'current', 'change', 'regressed']
+)
+
+
+def benchmark(name):
+    """
+    Register a benchmark. The decorated function receives a seeded
+    random.Random and returns a list of zero-argument callables, each one a
+    single operation to time. Operations are cycled until the time budget ends.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def percentile(sorted_values, fraction):
+    index = int(round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def measure_peak_memory(operations):
+    if tracemalloc is None:
+        return None
+
+    peak = 0
+
+    for operation in operations[:MEMORY_SAMPLES]:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            operation()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        finally:
+            tracemalloc.stop()
+
+    return peak
+
+
+def run(name, seed = DEFAULT_SEED, min_time = DEFAULT_MIN_TIME, min_ops = DEFAULT_MIN_OPS):
+    operations = BENCHMARKS[name](random.Random(seed))
+
+    # Warm up caches and lazy imports before timing:
+    for operation in operations[:3]:
+        operation()
+
+    latencies = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        started = timer()
+
+        for operation in itertools.cycle(operations):
+            start = timer()
+            operation()
+            latencies.append(timer() - start)
+
+            if len(latencies) >= min_ops and timer() - started >= min_time:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    latencies.sort()
+
+    return Result(
+        name        = name,
+        ops         = len(latencies),
+        ops_per_sec = len(latencies) / sum(latencies),
+        p50         = percentile(latencies, 0.50),
+        p90         = percentile(latencies, 0.90),
+        p99         = percentile(latencies, 0.99),
+        peak_memory = measure_peak_memory(operations)
+    )
+
+
+def format_results(results):
+    lines = [ "%-32s %12s %10s %10s %10s %10s" % ('benchmark', 'ops/sec', 'p50 us', 'p90 us', 'p99 us', 'peak KiB') ]
+
+    for r in results:
+        memory = '-' if r.peak_memory is None else '%.1f' % (r.peak_memory / 1024.0)
+        lines.append("%-32s %12.1f %10.1f %10.1f %10.1f %10s" % (
+            r.name, r.ops_per_sec, r.p50 * 1e6, r.p90 * 1e6, r.p99 * 1e6, memory
+        ))
+
+    return '\n'.join(lines)
+
+
+def save_results(results, path):
+    document = {
+        'python'    : platform.python_version(),
+        'platform'  : platform.platform(),
+        'benchmarks': dict((r.name, r._asdict()) for r in results)
+    }
+
+    with open(path, 'w') as f:
+        json.dump(document, f, indent = 2, sort_keys = True)
+
+
+def load_results(path):
+    with open(path) as f:
+        document = json.load(f)
+
+    return [ Result(**fields) for fields in document['benchmarks'].values() ]
+
+
+def compare(baseline, results, threshold):
+    """
+    Compare throughput against a baseline. A benchmark regressed if its ops/sec
+    dropped by more than `threshold` (a fraction, 0.1 means 10%).
+    """
+    baseline = dict((r.name, r) for r in baseline)
+    comparisons = []
+
+    for r in results:
+        if r.name not in baseline:
+            continue
+
+        before = baseline[r.name].ops_per_sec
+        change = (r.ops_per_sec - before) / before
+
+        comparisons.append(Comparison(r.name, before, r.ops_per_sec, change, change < -threshold))
+
+    return comparisons
+
+
+def format_comparisons(comparisons):
+    lines = [ "%-32s %12s %12s %9s" % ('benchmark', 'baseline', 'current', 'change') ]
+
+    for c in comparisons:
+        lines.append("%-32s %12.1f %12.1f %+8.1f%%%s" % (
+            c.name, c.baseline, c.current, c.change * 100, '  REGRESSION' if c.regressed else ''
+        ))
+
+    return '\n'.join(lines)
@@ -0,0 +1,411 @@
+from __future__ import unicode_literals
+import functools
+import os
+import subprocess
+import sys
+
+from bitforge import PrivateKey, PublicKey, HDPrivateKey, Address, Script, Transaction
+from bitforge.encoding import encode_base58h, decode_base58h, encode_int, encode_hex, hash160, hash160_many
+from bitforge.script import Interpreter
+from bitforge.transaction import AddressInput, AddressOutput
+from bitforge.transaction.size import transaction_size
+from bitforge.utxo import UTXOSet
+from bitforge.merkle import MerkleTree, merkle_root
+from bitforge.block import BlockHeader, HeaderChain, NULL_HASH, REGTEST_POW_LIMIT
+from bitforge.coinselection import Coin, select_coins
+from bitforge.mempool import Mempool
+from bitforge.bloom import BloomFilter, BLOOM_UPDATE_NONE
+from bitforge.blockfilter import GCSFilter, basic_filter
+from bitforge.scriptindex import ScriptIndex
+
+from .corpus import load_tx_valid
+from .runner import benchmark
+
+
+ROOT    = os.path.join(os.path.dirname(__file__), '..')
+SAMPLES = 64 # distinct inputs prepared per benchmark, cycled while timing
+
+# secp256k1 group order, secrets are drawn from [1, ORDER):
+ORDER = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+
+_corpus = []
+
+def get_corpus():
+    # Parsed once and shared, tx_valid.json is large enough to matter:
+    if not _corpus:
+        _corpus.append(load_tx_valid())
+
+    return _corpus[0]
+
+
+def random_bytes(rng, length):
+    return encode_int(rng.getrandbits(8 * length), length = length)
+
+
+def random_privkeys(rng, count = SAMPLES):
+    return [ PrivateKey(rng.randrange(1, ORDER)) for i in range(count) ]
+
+
+def call(function, *args, **kwargs):
+    return functools.partial(function, *args, **kwargs)
+
+
+# Startup, in a fresh interpreter each time. Subtract `startup.python` to get
+# the cost of importing bitforge itself:
+
+def python_command(code):
+    return call(subprocess.check_call, [ sys.executable, '-c', code ], cwd = ROOT)
+
+@benchmark('startup.python')
+def startup_python(rng):
+    return [ python_command('pass') ]
+
+@benchmark('startup.import_bitforge')
+def startup_import_bitforge(rng):
+    return [ python_command('import bitforge') ]
+
+@benchmark('startup.import_bitforge_privkey')
+def startup_import_bitforge_privkey(rng):
+    return [ python_command('import bitforge; bitforge.PrivateKey') ]
+
+
+# Keys:
+
+@benchmark('privkey.create')
+def privkey_create(rng):
+    return [ call(PrivateKey, rng.randrange(1, ORDER)) for i in range(SAMPLES) ]
+
+@benchmark('privkey.to_public_key')
+def privkey_to_public_key(rng):
+    return [ privkey.to_public_key for privkey in random_privkeys(rng) ]
+
+@benchmark('privkey.sign')
+def privkey_sign(rng):
+    return [ call(privkey.sign, random_bytes(rng, 32)) for privkey in random_privkeys(rng) ]
+
+@benchmark('pubkey.to_address')
+def pubkey_to_address(rng):
+    return [ privkey.to_public_key().to_address for privkey in random_privkeys(rng) ]
+
+@benchmark('pubkey.from_bytes')
+def pubkey_from_bytes(rng):
+    # Decompression every time, as for keys seen once:
+    def decode(data):
+        PublicKey.clear_cache()
+        return PublicKey.from_bytes(data)
+
+    return [ call(decode, privkey.to_public_key().to_bytes()) for privkey in random_privkeys(rng) ]
+
+@benchmark('pubkey.from_bytes_cached')
+def pubkey_from_bytes_cached(rng):
+    return [ call(PublicKey.from_bytes, privkey.to_public_key().to_bytes()) for privkey in random_privkeys(rng) ]
+
+
+def random_address_strings(rng, count = 1000):
+    # Half valid, half with a corrupted checksum:
+    strings = []
+
+    for i in range(count):
+        string = Address(random_bytes(rng, 20)).to_string()
+        strings.append(string if i % 2 else string[:-1] + ('1' if string[-1] != '1' else '2'))
+
+    return strings
+
+@benchmark('address.from_string')
+def address_from_string(rng):
+    return [ call(Address.from_string, string) for string in random_address_strings(rng, SAMPLES)[1::2] ]
+
+@benchmark('address.decode_many')
+def address_decode_many(rng):
+    return [ call(Address.decode_many, random_address_strings(rng)) ]
+
+@benchmark('address.validate_many')
+def address_validate_many(rng):
+    return [ call(Address.validate_many, random_address_strings(rng)) ]
+
+
+# HD derivation:
+
+def random_hd_keys(rng, count = 8):
+    return [ HDPrivateKey.from_seed(random_bytes(rng, 32)) for i in range(count) ]
+
+@benchmark('hdprivkey.derive')
+def hdprivkey_derive(rng):
+    return [ call(key.derive, rng.randrange(2 ** 31)) for key in random_hd_keys(rng) ]
+
+@benchmark('hdprivkey.derive_hardened')
+def hdprivkey_derive_hardened(rng):
+    return [ call(key.derive, rng.randrange(2 ** 31), True) for key in random_hd_keys(rng) ]
+
+
+# Encoding:
+
+@benchmark('encoding.encode_base58h')
+def encoding_encode_base58h(rng):
+    return [ call(encode_base58h, random_bytes(rng, 21)) for i in range(SAMPLES) ]
+
+@benchmark('encoding.decode_base58h')
+def encoding_decode_base58h(rng):
+    return [ call(decode_base58h, encode_base58h(random_bytes(rng, 21))) for i in range(SAMPLES) ]
+
+@benchmark('encoding.hash160')
+def encoding_hash160(rng):
+    # 1000 compressed public keys, one call each:
+    pubkeys = [ random_bytes(rng, 33) for i in range(1000) ]
+
+    def run():
+        return [ hash160(pubkey) for pubkey in pubkeys ]
+
+    return [ run ]
+
+@benchmark('encoding.hash160_many')
+def encoding_hash160_many(rng):
+    # The same, as 33-byte records of one buffer:
+    return [ call(hash160_many, random_bytes(rng, 33 * 1000), size = 33) ]
+
+
+# Transactions:
+
+@benchmark('transaction.from_bytes')
+def transaction_from_bytes(rng):
+    return [ call(Transaction.from_bytes, tx.to_bytes()) for tx in get_corpus().transactions ]
+
+@benchmark('transaction.to_bytes')
+def transaction_to_bytes(rng):
+    return [ tx.to_bytes for tx in get_corpus().transactions ]
+
+@benchmark('transaction.size')
+def transaction_size_benchmark(rng):
+    return [ call(transaction_size, tx.inputs, tx.outputs) for tx in get_corpus().transactions ]
+
+@benchmark('transaction.sign')
+def transaction_sign(rng):
+    operations = []
+
+    for privkey in random_privkeys(rng, 16):
+        address = privkey.to_address()
+        tx = Transaction(
+            [ AddressInput.create(encode_hex(random_bytes(rng, 32)).decode("ascii"), 0, address) ],
+            [ AddressOutput.create(rng.randrange(1, 10 ** 8), address) ]
+        )
+
+        operations.append(call(tx.sign, [ privkey ], 0))
+
+    return operations
+
+
+@benchmark('utxo.apply_undo')
+def utxo_apply_undo(rng):
+    utxos = UTXOSet()
+    operations = []
+
+    def apply_undo(tx):
+        utxos.undo(tx, utxos.apply(tx))
+
+    # Transactions from the corpus, with every output they spend funded:
+    for tx in get_corpus().transactions:
+        for input in tx.inputs:
+            if (input.tx_id, input.txo_index) not in utxos:
+                utxos.add(input.tx_id, input.txo_index, tx.outputs[0])
+
+        operations.append(call(apply_undo, tx))
+
+    return operations
+
+
+@benchmark('coinselection.select_coins')
+def coinselection_select_coins(rng):
+    address = random_privkeys(rng, 1)[0].to_address()
+    change  = AddressOutput.create(0, address).script
+
+    coins = [
+        Coin(AddressInput.create('%064x' % i, 0, address), rng.randrange(1000, 10 ** 7))
+        for i in range(10000)
+    ]
+
+    return [
+        call(select_coins, coins, [ AddressOutput.create(rng.randrange(10 ** 5, 10 ** 8), address) ], 5, change, rng = rng)
+        for i in range(8)
+    ]
+
+
+# Merkle trees, over blocks of 3000 transactions:
+
+@benchmark('merkle.merkle_root')
+def merkle_merkle_root(rng):
+    return [ call(merkle_root, [ random_bytes(rng, 32) for i in range(3000) ]) for i in range(4) ]
+
+@benchmark('merkle.replace_coinbase')
+def merkle_replace_coinbase(rng):
+    tree = MerkleTree([ random_bytes(rng, 32) for i in range(3000) ])
+    return [ call(tree.replace, 0, random_bytes(rng, 32)) for i in range(SAMPLES) ]
+
+
+# Mempool, with 20000 transactions, some spending others:
+
+def random_mempool(rng, count = 20000):
+    address = random_privkeys(rng, 1)[0].to_address()
+    mempool = Mempool()
+    txs     = []
+
+    for i in range(count + SAMPLES):
+        if txs and rng.random() < 0.3:
+            # Made-up output indexes, so siblings don't conflict:
+            parent = rng.choice(txs)
+            outpoint = (encode_hex(parent.get_id_bytes()[::-1]).decode('ascii'), len(txs))
+        else:
+            outpoint = ('%064x' % i, 0)
+
+        txs.append(Transaction([ AddressInput.create(outpoint[0], outpoint[1], address) ], [ AddressOutput.create(1, address) ]))
+
+    for tx in txs[:count]:
+        try:
+            mempool.add(tx, rng.randrange(100, 100000))
+        except Mempool.Error:
+            pass # too long a chain
+
+    return mempool, txs[count:]
+
+@benchmark('mempool.add_remove')
+def mempool_add_remove(rng):
+    mempool, txs = random_mempool(rng)
+
+    def add_remove(tx):
+        try:
+            mempool.remove(mempool.add(tx, 1000).txid)
+        except Mempool.Error:
+            pass
+
+    return [ call(add_remove, tx) for tx in txs ]
+
+@benchmark('mempool.select')
+def mempool_select(rng):
+    mempool, txs = random_mempool(rng)
+    return [ call(mempool.select, 1000000) ]
+
+
+# Bloom filters:
+
+@benchmark('bloom.match_bytes')
+def bloom_match_bytes(rng):
+    # A wallet of 1000 addresses, screening transactions that mostly aren't theirs:
+    bloom = BloomFilter.create(1000, 0.0001, flags = BLOOM_UPDATE_NONE)
+
+    for i in range(1000):
+        bloom.add(random_bytes(rng, 20))
+
+    address = random_privkeys(rng, 1)[0].to_address()
+    raws = [
+        Transaction([ AddressInput.create(encode_hex(random_bytes(rng, 32)).decode('ascii'), 0, address) ],
+                    [ AddressOutput.create(1000, address), AddressOutput.create(2000, address) ]).to_bytes()
+        for i in range(SAMPLES)
+    ]
+
+    return [ call(bloom.match_bytes, raw) for raw in raws ]
+
+
+# Compact block filters:
+
+def random_block(rng, count = 2000):
+    # `count` transactions with one input and two outputs each, and the
+    # outputs they spend:
+    def random_output():
+        return AddressOutput.create(rng.randrange(1, 10 ** 8), Address(random_bytes(rng, 20)))
+
+    transactions = [
+        Transaction([ AddressInput.create(encode_hex(random_bytes(rng, 32)).decode('ascii'), 0, Address(random_bytes(rng, 20))) ],
+                    [ random_output(), random_output() ])
+        for i in range(count)
+    ]
+
+    return transactions, [ random_output() for i in range(count) ]
+
+@benchmark('blockfilter.basic_filter')
+def blockfilter_basic_filter(rng):
+    transactions, spent = random_block(rng)
+    return [ call(basic_filter, random_bytes(rng, 32), transactions, spent) ]
+
+@benchmark('blockfilter.match_any')
+def blockfilter_match_any(rng):
+    # A wallet of 10000 scripts, none of them in the block:
+    transactions, spent = random_block(rng)
+    filter  = basic_filter(random_bytes(rng, 32), transactions, spent)
+    scripts = [ b'\x76\xa9\x14' + random_bytes(rng, 20) + b'\x88\xac' for i in range(10000) ]
+
+    return [ call(filter.match_any, scripts) ]
+
+
+# Watch-only script index:
+
+@benchmark('scriptindex.match_transaction_bytes')
+def scriptindex_match_transaction_bytes(rng):
+    # 100000 watched addresses, transactions with 2 outputs, one of them ours:
+    watched = [ Address(random_bytes(rng, 20)) for i in range(100000) ]
+    index   = ScriptIndex()
+
+    for i, address in enumerate(watched):
+        index.add_address(address, i)
+
+    raws = [
+        Transaction([ AddressInput.create(encode_hex(random_bytes(rng, 32)).decode('ascii'), 0, watched[0]) ],
+                    [ AddressOutput.create(1000, rng.choice(watched)), AddressOutput.create(2000, Address(random_bytes(rng, 20))) ]).to_bytes()
+        for i in range(SAMPLES)
+    ]
+
+    return [ call(index.match_transaction_bytes, raw) for raw in raws ]
+
+
+# Block headers:
+
+@benchmark('block.add_headers')
+def block_add_headers(rng):
+    # A regtest chain, where about half of all hashes meet the target:
+    genesis = BlockHeader(1, NULL_HASH, NULL_HASH, 1296688602, 0x207fffff, 0)
+    headers = []
+    prev    = genesis.get_id_bytes()
+
+    for i in range(2000):
+        header = BlockHeader(1, prev, random_bytes(rng, 32), 1296688603 + i, 0x207fffff, 0)
+
+        while not header.check_pow():
+            header = header._replace(nonce = header.nonce + 1)
+
+        headers.append(header.to_bytes())
+        prev = header.get_id_bytes()
+
+    def sync():
+        HeaderChain(genesis, pow_limit = REGTEST_POW_LIMIT).add_headers(headers)
+
+    return [ sync ]
+
+
+# P2P:
+
+# async/await and asyncio.get_running_loop() need Python 3.7, this module
+# stays importable everywhere else:
+if sys.version_info >= (3, 7):
+    from .p2p import p2p_ingest
+
+
+# Scripts:
+
+@benchmark('script.from_bytes')
+def script_from_bytes(rng):
+    return [ call(Script.from_bytes, spend.script_pubkey.to_bytes()) for spend in get_corpus().spends ]
+
+@benchmark('interpreter.verify')
+def interpreter_verify(rng):
+    def verify(spend):
+        return Interpreter().verify(spend.script_sig, spend.script_pubkey, spend.tx, spend.nin, spend.flags)
+
+    # Spends the interpreter can't run yet (unimplemented opcodes) are left out:
+    spends = []
+    for spend in get_corpus().spends:
+        try:
+            verify(spend)
+        except Exception:
+            continue
+        spends.append(spend)
+
+    return [ call(verify, spend) for spend in spends ]
@@ -1,15 +1,61 @@
-import ecdsa
-from . import networks
+import importlib
+import sys
 
-from .privkey import PrivateKey
-from .pubkey import PublicKey
-from .hdprivkey import HDPrivateKey
-from .hdpubkey import HDPublicKey
+# Public names, mapped to the submodule that defines them. They're imported on
+# first access (PEP 562), so `import bitforge` stays cheap for short-lived
+# processes that only touch part of the library:
+_LAZY_ATTRIBUTES = {
+    'PrivateKey'    : '.privkey',
+    'PublicKey'     : '.pubkey',
+    'HDPrivateKey'  : '.hdprivkey',
+    'HDPublicKey'   : '.hdpubkey',
 
-from .address import Address
-from .script import Script, Opcode, Instruction
+    'Address'       : '.address',
+    'Script'        : '.script',
+    'Opcode'        : '.script',
+    'Instruction'   : '.script',
 
-from .transaction import *
+    'Input'         : '.transaction',
+    'AddressInput'  : '.transaction',
+    'ScriptInput'   : '.transaction',
+    'MultisigInput' : '.transaction',
+    'Output'        : '.transaction',
+    'AddressOutput' : '.transaction',
+    'ScriptOutput'  : '.transaction',
+    'MultisigOutput': '.transaction',
+    'DataOutput'    : '.transaction',
+    'Transaction'   : '.transaction',
 
-from .unit import Unit
-from .uri import URI
+    'Unit'          : '.unit',
+    'URI'           : '.uri',
+}
+
+_LAZY_MODULES = ('networks',)
+
+__all__ = sorted(_LAZY_ATTRIBUTES) + list(_LAZY_MODULES)
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        value = importlib.import_module('.' + name, __name__)
+
+    elif name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    globals()[name] = value # cache, next access won't go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    # No module __getattr__ before PEP 562, import everything upfront:
+    for _name in __all__:
+        __getattr__(_name)
+
+    del _name
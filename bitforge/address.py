@@ -12,6 +12,7 @@ from .compat import chr
 BaseAddress = collections.namedtuple('Address', ['phash', 'network', 'type'])
 
 class Address(BaseAddress):
+    __slots__ = ()
 
     class Type(Enum):
         PublicKey = 'pubkeyhash'
@@ -43,10 +44,11 @@ class Address(BaseAddress):
 
 
     def __new__(cls, phash, network = networks.default, type = Type.PublicKey):
-        try:
-            network = networks.find(network)
-        except networks.UnknownNetwork:
-            raise Address.UnknownNetwork('name', network)
+        if not isinstance(network, networks.Network):
+            try:
+                network = networks.find(network)
+            except networks.UnknownNetwork:
+                raise Address.UnknownNetwork('name', network)
 
         if not isinstance(type, Address.Type):
             raise Address.InvalidType(type)
@@ -86,7 +88,16 @@ class Address(BaseAddress):
     @staticmethod
     def classify_bytes(bytes):
         version = bytearray(bytes)[0]
+        classification = Address.classify_version(version)
+
+        if classification is None:
+            raise Address.InvalidVersion(version)
+
+        return classification
 
+    @staticmethod
+    def classify_version(version):
+        # Returns a (network, type) tuple, or None for unknown versions:
         network = networks.find(version, 'pubkeyhash', raises = False)
         if network is not None:
             return (network, Address.Type.PublicKey)
@@ -95,7 +106,58 @@ class Address(BaseAddress):
         if network is not None:
             return (network, Address.Type.Script)
 
-        raise Address.InvalidVersion(version)
+        return None
+
+    @staticmethod
+    def decode_many(strings):
+        """
+        Decode an iterable of Address strings without raising for invalid ones.
+        Returns an AddressBatch, with a valid flag, network, type and hash for
+        each string, in order.
+        """
+        valid  = bytearray()
+        nets   = []
+        types  = []
+        hashes = bytearray()
+
+        for string in strings:
+            bytes = try_decode_base58h(string)
+            classification = None
+
+            if bytes is not None and len(bytes) == 21:
+                classification = Address.classify_version(bytearray(bytes[:1])[0])
+
+            if classification is None:
+                valid.append(0)
+                nets.append(None)
+                types.append(None)
+                hashes += NULL_HASH
+            else:
+                valid.append(1)
+                nets.append(classification[0])
+                types.append(classification[1])
+                hashes += bytes[1:]
+
+        return AddressBatch(valid, nets, types, hashes)
+
+    @staticmethod
+    def validate_many(strings):
+        """
+        Validate an iterable of Address strings without raising. Returns a
+        bytearray with a 1 for each valid string and a 0 for each invalid one.
+        """
+        return bytearray(Address.is_valid(string) for string in strings)
+
+    @staticmethod
+    def is_valid(string):
+        # Same checks as from_string(), without raising errors:
+        bytes = try_decode_base58h(string)
+
+        return (
+            bytes is not None and
+            len(bytes) == 21 and
+            Address.classify_version(bytearray(bytes[:1])[0]) is not None
+        )
 
     @staticmethod
     def from_public_key(pubkey):
@@ -117,5 +179,35 @@ class Address(BaseAddress):
     def to_hex(self):
         return encode_hex(self.to_bytes()).decode('utf-8')
 
+    def __hash__(self):
+        # Networks hold a list of seeds and can't be hashed, use their unique name:
+        return hash((self.phash, self.network.name, self.type))
+
     def __repr__(self):
         return "<Address: %s, type: %s, network: %s>" % (self.to_string(), self.type.name, self.network.name)
+
+
+NULL_HASH = b'\0' * 20 # placeholder for invalid entries in an AddressBatch
+
+BaseAddressBatch = collections.namedtuple('AddressBatch',
+    ['valid', 'networks', 'types', 'hashes']
+)
+
+class AddressBatch(BaseAddressBatch):
+    """
+    Parallel arrays describing a sequence of decoded Address strings. `valid` is
+    a bytearray of flags, `networks` and `types` hold None for invalid entries,
+    and `hashes` packs every 20-byte hash back to back (zeros if invalid).
+    """
+
+    def size(self):
+        return len(self.valid)
+
+    def get_hash(self, index):
+        return bytes(self.hashes[20 * index : 20 * (index + 1)])
+
+    def get_address(self, index):
+        if not self.valid[index]:
+            return None
+
+        return Address(self.get_hash(index), self.networks[index], self.types[index])
@@ -0,0 +1,471 @@
+from __future__ import unicode_literals
+import collections
+import hashlib
+import mmap
+import os
+import struct
+
+from bitforge.encoding import *
+from bitforge.errors import *
+
+
+# Version, previous block hash, merkle root, time, bits and nonce (80 bytes):
+HEADER = struct.Struct(str('<I32s32sIII'))
+HEADER_SIZE = HEADER.size
+
+# Highest target allowed by mainnet and testnet (difficulty 1), and by regtest:
+POW_LIMIT         = 0x00000000FFFF << 208
+REGTEST_POW_LIMIT = 0x7FFFFF << 232
+
+NULL_HASH = b'\0' * 32
+
+
+class BlockError(BitforgeError):
+    pass
+
+class InvalidBits(BlockError, NumberError):
+    "The compact target {number} is negative, zero or overflows 256 bits"
+
+
+def bits_to_target(bits):
+    # Compact format: 1 byte of exponent (size in bytes), 3 bytes of mantissa,
+    # same rules as Bitcoin Core's arith_uint256::SetCompact:
+    exponent = bits >> 24
+    mantissa = bits & 0x007FFFFF
+
+    if exponent <= 3:
+        target = mantissa >> (8 * (3 - exponent))
+    else:
+        target = mantissa << (8 * (exponent - 3))
+
+    if target == 0 or bits & 0x00800000 or target >> 256:
+        raise InvalidBits(bits)
+
+    return target
+
+
+def target_to_bits(target):
+    size = (target.bit_length() + 7) // 8
+
+    if size <= 3:
+        mantissa = target << (8 * (3 - size))
+    else:
+        mantissa = target >> (8 * (size - 3))
+
+    # The mantissa's top bit is a sign, make room for it:
+    if mantissa & 0x00800000:
+        mantissa >>= 8
+        size += 1
+
+    return (size << 24) | mantissa
+
+
+def target_to_work(target):
+    # Expected number of hashes to find one below `target`:
+    return (1 << 256) // (target + 1)
+
+
+def target_to_difficulty(target):
+    return POW_LIMIT / float(target)
+
+
+BaseBlockHeader = collections.namedtuple('BlockHeader',
+    ['version', 'prev_hash', 'merkle_root', 'time', 'bits', 'nonce']
+)
+
+
+class BlockHeader(BaseBlockHeader):
+    """
+    An 80-byte block header. Hashes (`prev_hash`, `merkle_root` and the result
+    of get_id_bytes()) are bytes in internal order, get_id() is the reversed
+    hex string block explorers show.
+    """
+    __slots__ = ()
+
+    class Error(BitforgeError):
+        pass
+
+    class InvalidSize(Error, NumberError):
+        "Block headers are 80 bytes long, got {number}"
+
+
+    def to_bytes(self):
+        return HEADER.pack(self.version, self.prev_hash, self.merkle_root, self.time, self.bits, self.nonce)
+
+    def to_hex(self):
+        return encode_hex(self.to_bytes()).decode('utf-8')
+
+    def get_id_bytes(self):
+        return sha256(sha256(self.to_bytes()))
+
+    def get_id(self):
+        return encode_hex(self.get_id_bytes()[::-1]).decode('utf-8')
+
+    def get_target(self):
+        return bits_to_target(self.bits)
+
+    def get_difficulty(self):
+        return target_to_difficulty(self.get_target())
+
+    def get_work(self):
+        return target_to_work(self.get_target())
+
+    def check_pow(self):
+        # Hashes are little-endian numbers:
+        return decode_int(self.get_id_bytes(), big_endian = False) <= self.get_target()
+
+    @classmethod
+    def from_hex(cls, string):
+        return cls.from_bytes(decode_hex(string))
+
+    @classmethod
+    def from_bytes(cls, bytes):
+        if len(bytes) != HEADER_SIZE:
+            raise BlockHeader.InvalidSize(len(bytes))
+
+        return cls(*HEADER.unpack(bytes))
+
+
+# Genesis block headers:
+GENESIS_MERKLE_ROOT = decode_hex('4a5e1e4baab89f3a32518a88c31bc87f618f76673e2cc77ab2127b7afdeda33b')[::-1]
+
+GENESIS = {
+    'livenet': BlockHeader(1, NULL_HASH, GENESIS_MERKLE_ROOT, 1231006505, 0x1d00ffff, 2083236893),
+    'testnet': BlockHeader(1, NULL_HASH, GENESIS_MERKLE_ROOT, 1296688602, 0x1d00ffff, 414098458),
+}
+
+
+# Header chain store files: a fixed header, then one record per height with the
+# raw 80-byte header and its 32-byte hash, so loading doesn't rehash anything.
+STORE_MAGIC  = b'BFHDRS01'
+STORE_HEADER = struct.Struct(str('<8sQ')) # magic, header count
+RECORD_SIZE  = HEADER_SIZE + 32
+GROW_RECORDS = 16384 # the file grows by this many records at a time
+
+
+class HeaderChain(object):
+    """
+    The best chain of block headers, from `genesis` up, validating proof of work
+    and linkage as headers arrive. Difficulty adjustments are not checked, only
+    that each header's hash meets its own target and the target is within
+    `pow_limit`.
+
+    Headers are kept as flat records indexed by height, in memory or in a file
+    at `path` that's memory-mapped, plus a hash -> height dict. Headers of
+    other branches are kept in memory with their cumulative work, so a fork
+    that arrives over several batches replaces the tail of the chain as soon
+    as it carries more work. Only the best chain is stored in the file.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class UnknownParent(Error, StringError):
+        "The header following {string} can't be connected, its parent is unknown"
+
+    class BrokenLink(Error, NumberError):
+        "The header at position {number} of the batch doesn't follow the one before it"
+
+    class InvalidProofOfWork(Error, StringError):
+        "The hash of block {string} is above its target"
+
+    class TargetTooHigh(Error, StringError):
+        "The target of block {string} is above the proof-of-work limit"
+
+    class GenesisMismatch(Error, StringError):
+        "The store at {string} starts with a different genesis block"
+
+    class InvalidStore(Error, StringError):
+        "The file {string} is not a header chain store"
+
+
+    def __init__(self, genesis, path = None, pow_limit = POW_LIMIT):
+        self.path      = path
+        self.pow_limit = pow_limit
+        self.file      = None
+        self.data      = bytearray()
+        self.count     = 0
+        self.capacity  = 0
+        self.heights   = {} # hash -> height
+        self.branches  = {} # hash -> (raw header, bits, cumulative work), off the best chain
+        self.work      = 0  # cumulative work of the tip
+        self.targets   = {} # bits -> (32-byte big-endian target, work, allowed), few distinct
+
+        genesis_bytes = genesis.to_bytes()
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+            if self.get_header_bytes(0) != genesis_bytes:
+                self.close()
+                raise HeaderChain.GenesisMismatch(path)
+
+        else:
+            if path is not None:
+                self.file = open(path, 'w+b')
+
+            self.append_records([ (genesis_bytes, genesis.get_id_bytes(), genesis.bits) ])
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, hash):
+        return hash in self.heights
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.data.close()
+            self.file.close()
+            self.file = None
+
+    def flush(self):
+        if self.file is not None:
+            self.data.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_height(self):
+        return self.count - 1
+
+    def get_work(self):
+        return self.work
+
+    def get_height_of(self, hash):
+        return self.heights.get(hash)
+
+    def get_hash(self, height):
+        offset = STORE_HEADER.size + RECORD_SIZE * height + HEADER_SIZE
+        return bytes(self.data[offset : offset + 32])
+
+    def get_header_bytes(self, height):
+        offset = STORE_HEADER.size + RECORD_SIZE * height
+        return bytes(self.data[offset : offset + HEADER_SIZE])
+
+    def get(self, height):
+        if not 0 <= height < self.count:
+            return None
+
+        return BlockHeader.from_bytes(self.get_header_bytes(height))
+
+    def get_tip(self):
+        return self.get(self.get_height())
+
+    def get_locator(self):
+        # Hashes to ask peers for headers with (getheaders): the last 10, then
+        # exponentially sparser, always ending at genesis:
+        hashes = []
+        height = self.get_height()
+        step   = 1
+
+        while height > 0:
+            hashes.append(self.get_hash(height))
+
+            if len(hashes) >= 10:
+                step *= 2
+
+            height -= step
+
+        hashes.append(self.get_hash(0))
+        return hashes
+
+    def get_target(self, bits):
+        try:
+            return self.targets[bits]
+        except KeyError:
+            pass
+
+        target = bits_to_target(bits)
+        entry  = (encode_int(target, length = 32), target_to_work(target), target <= self.pow_limit)
+
+        self.targets[bits] = entry
+        return entry
+
+    def add(self, header):
+        return self.add_headers([ header ])
+
+    def add_headers(self, headers):
+        """
+        Validate and connect a batch of headers (BlockHeaders or raw 80-byte
+        strings), each following the one before it. Headers already in the
+        chain are skipped. The first may follow a header of the best chain or
+        of a side branch. Returns how many headers the best chain gained, which
+        is 0 for a branch that doesn't beat its work (yet).
+        """
+        raws = [ header if isinstance(header, (bytes, bytearray)) else header.to_bytes() for header in headers ]
+        if not raws:
+            return 0
+
+        for raw in raws:
+            if len(raw) != HEADER_SIZE:
+                raise BlockHeader.InvalidSize(len(raw))
+
+        parent = raws[0][4:36]
+        height = self.heights.get(parent)
+
+        if height is None and parent not in self.branches:
+            raise HeaderChain.UnknownParent(encode_hex(parent[::-1]).decode('utf-8'))
+
+        # Skip headers we already have:
+        start = 0
+        while height is not None and start < len(raws) and height + 1 < self.count and raws[start][4:36] == self.get_hash(height):
+            hash = sha256(sha256(raws[start]))
+
+            if self.heights.get(hash) != height + 1:
+                break
+
+            height += 1
+            start  += 1
+
+        records = []
+        work    = 0
+        sha     = hashlib.sha256
+        prev    = self.get_hash(height) if height is not None else parent
+
+        for i in range(start, len(raws)):
+            raw = raws[i]
+
+            if raw[4:36] != prev:
+                raise HeaderChain.BrokenLink(i)
+
+            hash = sha(sha(raw).digest()).digest()
+            bits = struct.unpack_from(str('<I'), raw, 72)[0]
+
+            target, header_work, allowed = self.get_target(bits)
+
+            # Compare as 32-byte big-endian numbers, no int conversion needed:
+            if hash[::-1] > target:
+                raise HeaderChain.InvalidProofOfWork(encode_hex(hash[::-1]).decode('utf-8'))
+
+            if not allowed:
+                raise HeaderChain.TargetTooHigh(encode_hex(hash[::-1]).decode('utf-8'))
+
+            records.append((bytes(raw), hash, bits))
+            work += header_work
+            prev  = hash
+
+        if not records:
+            return 0
+
+        if height == self.get_height():
+            self.append_records(records)
+            return len(records)
+
+        # A side branch, connected once it has more work than the best chain:
+        chain_work = self.get_chain_work(height) if height is not None else self.branches[parent][2]
+
+        for raw, hash, bits in records:
+            chain_work += self.get_target(bits)[1]
+            self.branches[hash] = (raw, bits, chain_work)
+
+        if chain_work <= self.work:
+            return 0
+
+        return self.reorganize(records[-1][1])
+
+    def reorganize(self, tip):
+        # Make the side branch ending at `tip` the best chain, and keep the
+        # headers it replaces as a side branch:
+        records = []
+        hash    = tip
+
+        while hash not in self.heights:
+            raw, bits, chain_work = self.branches.pop(hash)
+            records.append((raw, hash, bits))
+            hash = raw[4:36]
+
+        height     = self.heights[hash]
+        chain_work = self.get_chain_work(height)
+
+        for h in range(height + 1, self.count):
+            offset = STORE_HEADER.size + RECORD_SIZE * h
+            raw    = bytes(self.data[offset : offset + HEADER_SIZE])
+            bits   = struct.unpack_from(str('<I'), raw, 72)[0]
+
+            chain_work += self.get_target(bits)[1]
+            self.branches[self.get_hash(h)] = (raw, bits, chain_work)
+
+        records.reverse()
+
+        self.truncate(height + 1)
+        self.append_records(records)
+        return len(records)
+
+    def get_chain_work(self, height):
+        # Cumulative work of the best chain up to `height`:
+        return self.work - sum(self.get_header_work(h) for h in range(height + 1, self.count))
+
+    def get_header_work(self, height):
+        offset = STORE_HEADER.size + RECORD_SIZE * height + 72
+        return self.get_target(struct.unpack_from(str('<I'), self.data, offset)[0])[1]
+
+    def truncate(self, count):
+        for height in range(count, self.count):
+            del self.heights[self.get_hash(height)]
+            self.work -= self.get_header_work(height)
+
+        self.count = count
+        self.write_count()
+
+    def append_records(self, records):
+        self.reserve(self.count + len(records))
+
+        offset = STORE_HEADER.size + RECORD_SIZE * self.count
+        self.data[offset : offset + RECORD_SIZE * len(records)] = b''.join(raw + hash for raw, hash, bits in records)
+
+        for raw, hash, bits in records:
+            self.heights[hash] = self.count
+            self.work  += self.get_target(bits)[1]
+            self.count += 1
+
+        self.write_count()
+
+    def write_count(self):
+        self.data[:STORE_HEADER.size] = STORE_HEADER.pack(STORE_MAGIC, self.count)
+
+    def reserve(self, count):
+        if count <= self.capacity:
+            return
+
+        self.capacity = count + GROW_RECORDS
+        size = STORE_HEADER.size + RECORD_SIZE * self.capacity
+
+        if self.file is None:
+            self.data.extend(bytearray(size - len(self.data)))
+        else:
+            # Grow the file, then map it again:
+            if isinstance(self.data, mmap.mmap):
+                self.data.close()
+
+            self.file.truncate(size)
+            self.data = mmap.mmap(self.file.fileno(), size)
+
+    def load(self):
+        self.file = open(self.path, 'r+b')
+        size = os.path.getsize(self.path)
+
+        if size < STORE_HEADER.size:
+            self.file.close()
+            raise HeaderChain.InvalidStore(self.path)
+
+        self.data = mmap.mmap(self.file.fileno(), size)
+        magic, count = STORE_HEADER.unpack_from(self.data, 0)
+
+        if magic != STORE_MAGIC or STORE_HEADER.size + RECORD_SIZE * count > size or count == 0:
+            self.data.close()
+            self.file.close()
+            raise HeaderChain.InvalidStore(self.path)
+
+        self.count    = count
+        self.capacity = (size - STORE_HEADER.size) // RECORD_SIZE
+
+        # Hashes are stored, rebuilding the index and total work is cheap:
+        data = self.data
+        for height in range(count):
+            offset = STORE_HEADER.size + RECORD_SIZE * height
+            self.heights[data[offset + HEADER_SIZE : offset + RECORD_SIZE]] = height
+            self.work += self.get_target(struct.unpack_from(str('<I'), data, offset + 72)[0])[1]
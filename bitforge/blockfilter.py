@@ -0,0 +1,267 @@
+from __future__ import unicode_literals
+import struct
+
+from bitforge.encoding import *
+from bitforge.errors import *
+from bitforge.tools import Buffer
+
+
+# BIP158 basic filter parameters: 19-bit remainders, and 1 / 784931 false
+# positive rate for each item queried:
+BASIC_FILTER_TYPE = 0x00
+BASIC_FILTER_P    = 19
+BASIC_FILTER_M    = 784931
+
+NULL_HEADER = b'\0' * 32 # previous filter header of the genesis block
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def siphash(k0, k1, data):
+    # SipHash-2-4 of `data` with a 128-bit key, as two 64-bit integers. The
+    # rounds are written out inline, function calls would double the cost:
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+
+    length  = len(data)
+    nblocks = length // 8
+    blocks  = list(struct.unpack_from(str('<%dQ' % nblocks), data))
+
+    # The last block holds the remaining bytes, and the length in its top byte:
+    blocks.append(decode_int(data[8 * nblocks:], big_endian = False) | (length & 0xFF) << 56)
+
+    for m in blocks:
+        v3 ^= m
+
+        for i in (0, 1):
+            v0 = (v0 + v1) & MASK64
+            v1 = ((v1 << 13) | (v1 >> 51)) & MASK64 ^ v0
+            v0 = ((v0 << 32) | (v0 >> 32)) & MASK64
+            v2 = (v2 + v3) & MASK64
+            v3 = ((v3 << 16) | (v3 >> 48)) & MASK64 ^ v2
+            v0 = (v0 + v3) & MASK64
+            v3 = ((v3 << 21) | (v3 >> 43)) & MASK64 ^ v0
+            v2 = (v2 + v1) & MASK64
+            v1 = ((v1 << 17) | (v1 >> 47)) & MASK64 ^ v2
+            v2 = ((v2 << 32) | (v2 >> 32)) & MASK64
+
+        v0 ^= m
+
+    v2 ^= 0xFF
+
+    for i in (0, 1, 2, 3):
+        v0 = (v0 + v1) & MASK64
+        v1 = ((v1 << 13) | (v1 >> 51)) & MASK64 ^ v0
+        v0 = ((v0 << 32) | (v0 >> 32)) & MASK64
+        v2 = (v2 + v3) & MASK64
+        v3 = ((v3 << 16) | (v3 >> 48)) & MASK64 ^ v2
+        v0 = (v0 + v3) & MASK64
+        v3 = ((v3 << 21) | (v3 >> 43)) & MASK64 ^ v0
+        v2 = (v2 + v1) & MASK64
+        v1 = ((v1 << 17) | (v1 >> 47)) & MASK64 ^ v2
+        v2 = ((v2 << 32) | (v2 >> 32)) & MASK64
+
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+class GCSFilter(object):
+    """
+    A Golomb-coded set (BIP158): `n` items hashed to [0, n * m), sorted, and
+    stored as Golomb-Rice coded differences with `p`-bit remainders. The key
+    is the first 16 bytes of the block hash (internal byte order).
+
+    Decoding works on the whole bit stream at once, as a string of '0' and '1'
+    characters, so finding the next quotient is a str.find() rather than a
+    Python loop over bits. Queries are hashed, sorted and merged with the
+    decoded values in a single pass.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class InvalidKey(Error):
+        "GCSFilter keys must be at least 16 bytes"
+
+    class InvalidFilter(Error):
+        "The filter data ends before its last item"
+
+
+    def __init__(self, key, n, data, p = BASIC_FILTER_P, m = BASIC_FILTER_M):
+        if len(key) < 16:
+            raise GCSFilter.InvalidKey()
+
+        self.key  = bytes(key[:16])
+        self.n    = n
+        self.data = bytes(data)
+        self.p    = p
+        self.m    = m
+
+        self.k0 = decode_int(self.key[:8], big_endian = False)
+        self.k1 = decode_int(self.key[8:], big_endian = False)
+
+    def __len__(self):
+        return self.n
+
+    def __eq__(self, other):
+        return isinstance(other, GCSFilter) and (self.key, self.n, self.data, self.p, self.m) == (other.key, other.n, other.data, other.p, other.m)
+
+    def __ne__(self, other):
+        return not self == other
+
+    @classmethod
+    def create(cls, key, elements, p = BASIC_FILTER_P, m = BASIC_FILTER_M):
+        # Duplicate elements are included once:
+        elements = set(elements)
+        filter   = cls(key, len(elements), b'', p, m)
+
+        filter.data = filter.encode(sorted(filter.hash_elements(elements)))
+        return filter
+
+    def hash_elements(self, elements):
+        # Each element mapped to [0, n * m), with a multiply and shift instead of a modulo:
+        k0, k1 = self.k0, self.k1
+        f = self.n * self.m
+
+        return [ (siphash(k0, k1, element) * f) >> 64 for element in elements ]
+
+    def encode(self, values):
+        # Quotients in unary (that many 1s and a 0), then `p` bits of remainder:
+        p    = self.p
+        mask = (1 << p) - 1
+        form = '0%db' % p
+        bits = []
+        last = 0
+
+        for value in values:
+            delta = value - last
+            last  = value
+
+            bits.append('1' * (delta >> p) + '0' + format(delta & mask, form))
+
+        bits = ''.join(bits)
+
+        if not bits:
+            return b''
+
+        # Through hex, encode_int() is quadratic on integers this large:
+        bits += '0' * (-len(bits) % 8)
+        return decode_hex('%0*x' % (len(bits) // 4, int(bits, 2)))
+
+    def decode(self):
+        # Yield the sorted values in the filter:
+        if not self.n:
+            return
+
+        if not self.data:
+            raise GCSFilter.InvalidFilter()
+
+        p    = self.p
+        bits = format(int(encode_hex(self.data), 16), '0%db' % (8 * len(self.data)))
+        find = bits.find
+
+        value    = 0
+        position = 0
+
+        for i in range(self.n):
+            end = find('0', position)
+            start = end + 1
+
+            if end < 0 or start + p > len(bits):
+                raise GCSFilter.InvalidFilter()
+
+            value += (end - position) << p | int(bits[start : start + p], 2)
+            position = start + p
+
+            yield value
+
+    def match(self, element):
+        return self.match_any([ element ])
+
+    def match_any(self, elements):
+        for match in self.iter_matches(elements):
+            return True
+
+        return False
+
+    def get_matches(self, elements):
+        # The elements that (probably) are in the filter:
+        return list(self.iter_matches(elements))
+
+    def iter_matches(self, elements):
+        if not self.n:
+            return
+
+        elements = list(elements)
+        queries  = sorted(zip(self.hash_elements(elements), range(len(elements))))
+        values   = self.decode()
+        value    = next(values)
+        count    = 1
+
+        for query, index in queries:
+            while value < query:
+                if count == self.n:
+                    return
+
+                value  = next(values)
+                count += 1
+
+            if value == query:
+                yield elements[index]
+
+    def to_bytes(self):
+        # N as a varint, followed by the bit stream:
+        return encode_varint(self.n) + self.data
+
+    def to_hex(self):
+        return encode_hex(self.to_bytes()).decode('utf-8')
+
+    @classmethod
+    def from_hex(cls, key, string, p = BASIC_FILTER_P, m = BASIC_FILTER_M):
+        return cls.from_bytes(key, decode_hex(string), p, m)
+
+    @classmethod
+    def from_bytes(cls, key, bytes, p = BASIC_FILTER_P, m = BASIC_FILTER_M):
+        buffer = Buffer(bytes)
+        n = buffer.read_varint()
+
+        return cls(key, n, buffer.read(len(buffer)), p, m)
+
+    def get_hash(self):
+        return double_sha256(self.to_bytes())
+
+    def get_header(self, prev_header = NULL_HEADER):
+        # Filter headers chain filters, like block headers chain blocks:
+        return double_sha256(self.get_hash() + prev_header)
+
+
+def basic_filter_elements(transactions, spent_outputs):
+    """
+    The scripts a BIP158 basic filter covers: every output Script in the block
+    except empty and OP_RETURN ones, and the Scripts of the outputs it spends
+    (`spent_outputs`, such as what UTXOSet.apply() returns for each
+    transaction, concatenated; None entries are skipped).
+    """
+    elements = set()
+
+    for tx in transactions:
+        for output in tx.outputs:
+            script = output.script.to_bytes()
+
+            if script and script[:1] != b'\x6a':
+                elements.add(script)
+
+    for output in spent_outputs:
+        if output is not None:
+            script = output.script.to_bytes()
+
+            if script:
+                elements.add(script)
+
+    return elements
+
+
+def basic_filter(block_hash, transactions, spent_outputs):
+    # The basic filter of a block, keyed by its hash as get_id_bytes() returns it:
+    return GCSFilter.create(block_hash, basic_filter_elements(transactions, spent_outputs))
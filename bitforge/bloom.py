@@ -0,0 +1,304 @@
+from __future__ import unicode_literals
+import hashlib
+import math
+import struct
+
+from bitforge.encoding import *
+from bitforge.errors import *
+from bitforge.tools import Buffer
+
+
+# BIP37 limits, for filters sent to peers:
+MAX_FILTER_SIZE = 36000 # bytes
+MAX_HASH_FUNCS  = 50
+
+# Seeds for the hash functions are i * HASH_SEED_STEP + tweak:
+HASH_SEED_STEP = 0xFBA4C795
+
+# What to add to the filter when an output matches, so spends of it match too:
+BLOOM_UPDATE_NONE          = 0
+BLOOM_UPDATE_ALL           = 1
+BLOOM_UPDATE_P2PUBKEY_ONLY = 2
+BLOOM_UPDATE_MASK          = 3 # other bits of the flags byte are ignored
+
+LN2 = math.log(2)
+MASK32 = 0xFFFFFFFF
+
+
+def murmur3(data, seed):
+    # MurmurHash3 (x86, 32 bits), as BIP37 uses it:
+    length  = len(data)
+    nblocks = length // 4
+    h = seed
+
+    for k in struct.unpack_from(str('<%dI' % nblocks), data):
+        k = (k * 0xCC9E2D51) & MASK32
+        k = ((k << 15) | (k >> 17)) & MASK32
+        k = (k * 0x1B873593) & MASK32
+
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & MASK32
+        h = (h * 5 + 0xE6546B64) & MASK32
+
+    tail = bytearray(data[4 * nblocks:])
+    k = 0
+
+    if len(tail) == 3:
+        k ^= tail[2] << 16
+    if len(tail) >= 2:
+        k ^= tail[1] << 8
+    if len(tail) >= 1:
+        k ^= tail[0]
+        k = (k * 0xCC9E2D51) & MASK32
+        k = ((k << 15) | (k >> 17)) & MASK32
+        k = (k * 0x1B873593) & MASK32
+        h ^= k
+
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & MASK32
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & MASK32
+    h ^= h >> 16
+
+    return h
+
+
+def read_varint(data, offset):
+    # Read a variable-length integer from a bytearray. Returns it, and the
+    # offset of what follows:
+    first = data[offset]
+
+    if first < 253:
+        return first, offset + 1
+
+    size = { 253: 2, 254: 4, 255: 8 }[first]
+    return decode_int(data[offset + 1 : offset + 1 + size], big_endian = False), offset + 1 + size
+
+
+def iter_pushes(data, start, end):
+    """
+    Yield the data pushed by a raw script in data[start:end] (a bytearray),
+    without building a Script. Stops at the first truncated push, like
+    Bitcoin Core's GetOp().
+    """
+    i = start
+
+    while i < end:
+        opcode = data[i]
+        i += 1
+
+        if opcode > 78: # OP_PUSHDATA4
+            continue
+
+        if opcode < 76: # OP_PUSHDATA1
+            size = opcode
+        elif opcode == 76:
+            if i + 1 > end: return
+            size = data[i]
+            i += 1
+        elif opcode == 77:
+            if i + 2 > end: return
+            size = data[i] | data[i + 1] << 8
+            i += 2
+        else:
+            if i + 4 > end: return
+            size = decode_int(data[i : i + 4], big_endian = False)
+            i += 4
+
+        if i + size > end:
+            return
+
+        if size:
+            yield data[i : i + size]
+
+        i += size
+
+
+def is_pay_to_pubkey_or_multisig(data, start, end):
+    # <pubkey> OP_CHECKSIG, or OP_m <pubkeys> OP_n OP_CHECKMULTISIG:
+    size = end - start
+
+    if size in (35, 67) and data[start] == size - 2 and data[end - 1] == 0xAC:
+        return True
+
+    return size > 3 and data[end - 1] == 0xAE and 0x51 <= data[start] <= 0x60
+
+
+class BloomFilter(object):
+    """
+    A BIP37 bloom filter, to ask peers for the transactions we care about, or to
+    pre-screen transactions locally before looking things up.
+
+    Matching works on serialized transactions: match_bytes() walks the raw
+    scripts once, testing each data push, without building Scripts or decoding
+    Addresses. On a matching output, the outpoint is added to the filter
+    (depending on `flags`), so transactions spending it match too.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class InvalidFilter(Error):
+        "Bloom filters can take at most 36000 bytes and 50 hash functions"
+
+
+    def __init__(self, data, hash_funcs, tweak = 0, flags = BLOOM_UPDATE_ALL):
+        self.data       = bytearray(data)
+        self.hash_funcs = hash_funcs
+        self.tweak      = tweak
+        self.flags      = flags
+        self.seeds      = [ (i * HASH_SEED_STEP + tweak) & MASK32 for i in range(hash_funcs) ]
+
+    @classmethod
+    def create(cls, elements, fp_rate, tweak = 0, flags = BLOOM_UPDATE_ALL, max_size = MAX_FILTER_SIZE):
+        """
+        An empty filter sized for `elements` insertions with a false positive
+        rate of `fp_rate`, using the formulas from BIP37. Filters kept locally
+        can pass a larger `max_size`, or None.
+        """
+        size = int(-1.0 / LN2 ** 2 * max(elements, 1) * math.log(fp_rate) / 8)
+        size = max(1, size if max_size is None else min(size, max_size))
+
+        hash_funcs = int(size * 8 / float(max(elements, 1)) * LN2)
+        hash_funcs = max(1, min(hash_funcs, MAX_HASH_FUNCS))
+
+        return cls(bytearray(size), hash_funcs, tweak, flags)
+
+    def __contains__(self, element):
+        data = self.data
+        bits = 8 * len(data)
+
+        # Like Core, an empty filter (peers may send one) matches everything:
+        if not bits:
+            return True
+
+        for seed in self.seeds:
+            index = murmur3(element, seed) % bits
+
+            if not data[index >> 3] & (1 << (index & 7)):
+                return False
+
+        return True
+
+    def add(self, element):
+        data = self.data
+        bits = 8 * len(data)
+
+        if not bits:
+            return
+
+        for seed in self.seeds:
+            index = murmur3(element, seed) % bits
+            data[index >> 3] |= 1 << (index & 7)
+
+    def add_address(self, address):
+        # Outputs paying to an Address push its hash:
+        self.add(address.phash)
+
+    def add_public_key(self, pubkey):
+        # Pay-to-pubkey outputs and signed inputs push the key, others its hash:
+        self.add(pubkey.to_bytes())
+        self.add(pubkey.to_address().phash)
+
+    def add_script(self, script):
+        # Every push of the Script must appear somewhere for a match:
+        data = bytearray(script.to_bytes())
+
+        for push in iter_pushes(data, 0, len(data)):
+            self.add(push)
+
+    def add_outpoint(self, tx_id, index):
+        # Outpoints are 32 bytes of transaction ID (internal order) and a 4-byte index:
+        self.add(decode_hex(tx_id)[::-1] + encode_int(index, length = 4, big_endian = False))
+
+    def match(self, tx):
+        return self.match_bytes(tx.to_bytes())
+
+    def match_bytes(self, raw, txid = None):
+        """
+        Whether the serialized transaction `raw` is relevant: its ID, data
+        pushed by an output Script, an outpoint it spends, or data pushed by an
+        input Script is in the filter.
+        """
+        data = bytearray(raw)
+
+        if txid is None:
+            txid = hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+        matched = txid in self
+
+        # Inputs come first, remember where, outputs are checked before them:
+        count, i = read_varint(data, 4)
+        inputs = []
+
+        for n in range(count):
+            script_size, script_start = read_varint(data, i + 36)
+            inputs.append((i, script_start, script_start + script_size))
+            i = script_start + script_size + 4
+
+        count, i = read_varint(data, i)
+        update   = self.flags & BLOOM_UPDATE_MASK
+
+        for n in range(count):
+            script_size, start = read_varint(data, i + 8)
+            end = i = start + script_size
+
+            for push in iter_pushes(data, start, end):
+                if push in self:
+                    matched = True
+
+                    if update == BLOOM_UPDATE_ALL or (
+                       update == BLOOM_UPDATE_P2PUBKEY_ONLY and is_pay_to_pubkey_or_multisig(data, start, end)):
+                        self.add(txid + encode_int(n, length = 4, big_endian = False))
+
+                    break
+
+        if matched:
+            return True
+
+        for outpoint_start, start, end in inputs:
+            if data[outpoint_start : outpoint_start + 36] in self:
+                return True
+
+            for push in iter_pushes(data, start, end):
+                if push in self:
+                    return True
+
+        return False
+
+    def to_bytes(self):
+        # The filterload message payload:
+        buffer = Buffer()
+
+        buffer.write(encode_varint(len(self.data)))
+        buffer.write(self.data)
+        buffer.write(encode_int(self.hash_funcs, length = 4, big_endian = False))
+        buffer.write(encode_int(self.tweak, length = 4, big_endian = False))
+        buffer.write(chr(self.flags))
+
+        return bytes(buffer)
+
+    def to_hex(self):
+        return encode_hex(self.to_bytes()).decode('utf-8')
+
+    @classmethod
+    def from_hex(cls, string):
+        return cls.from_bytes(decode_hex(string))
+
+    @classmethod
+    def from_bytes(cls, bytes):
+        return cls.from_buffer(Buffer(bytes))
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # Inverse operation of BloomFilter.to_bytes(), check that out.
+        data       = buffer.read(buffer.read_varint())
+        hash_funcs = decode_int(buffer.read(4), big_endian = False)
+        tweak      = decode_int(buffer.read(4), big_endian = False)
+        flags      = decode_int(buffer.read(1))
+
+        if len(data) > MAX_FILTER_SIZE or hash_funcs > MAX_HASH_FUNCS:
+            raise BloomFilter.InvalidFilter()
+
+        return cls(data, hash_funcs, tweak, flags)
@@ -0,0 +1,310 @@
+from __future__ import unicode_literals
+from timeit import default_timer as timer
+import collections
+import random
+
+from bitforge.errors import *
+from bitforge.transaction import Output, Transaction
+from bitforge.transaction.size import TX_OVERHEAD, varint_size, input_size, output_size, fee_for_size
+
+
+class CoinSelectionError(BitforgeError):
+    pass
+
+class InsufficientFunds(CoinSelectionError, NumberError):
+    "The available coins can't pay for {number} satoshis plus fees"
+
+class NoOutputs(CoinSelectionError):
+    "Coin selection needs at least one Output to pay for"
+
+
+DUST_THRESHOLD = 546     # change below this (in satoshis) is left as fee
+BNB_MAX_TRIES  = 100000  # same bound as Bitcoin Core
+KNAPSACK_ITERATIONS = 1000
+DEADLINE_CHECK_EVERY = 1024  # iterations between clock checks, timer() isn't free
+
+
+# A spendable output: the Input that would spend it (AddressInput and friends,
+# with their placeholder Script) and the amount it holds, in satoshis:
+BaseCoin = collections.namedtuple('Coin', ['input', 'amount'])
+
+class Coin(BaseCoin):
+    __slots__ = ()
+
+
+BaseSelection = collections.namedtuple('Selection',
+    ['coins', 'outputs', 'fee', 'change', 'strategy']
+)
+
+class Selection(BaseSelection):
+    """
+    The result of select_coins(). `outputs` are the requested ones, plus a
+    change Output if `change` is not 0. `fee` is whatever the inputs don't
+    send to outputs.
+    """
+    __slots__ = ()
+
+    def to_transaction(self, lock_time = 0, version = 1):
+        return Transaction([ coin.input for coin in self.coins ], self.outputs, lock_time, version)
+
+
+def branch_and_bound(values, target, cost_of_change, deadline = None, max_tries = BNB_MAX_TRIES):
+    """
+    Search for a subset of `values` (sorted in descending order) adding up to
+    at least `target` but not more than `target + cost_of_change`, so no change
+    output is needed. Returns the list of selected indexes with the least excess
+    found before running out of tries or time, or None.
+
+    This is the depth-first search from Bitcoin Core's SelectCoinsBnB.
+    """
+    available = sum(values)
+    if available < target:
+        return None
+
+    value     = 0
+    selection = [] # selection[i] tells whether values[i] is in the current branch
+    best      = None
+    best_excess = cost_of_change + 1
+
+    for tries in range(max_tries):
+        if deadline is not None and tries % DEADLINE_CHECK_EVERY == 0 and timer() > deadline:
+            break
+
+        backtrack = False
+
+        if value + available < target or value > target + cost_of_change:
+            backtrack = True # can't reach the target, or went past the window
+
+        elif value >= target:
+            if value - target < best_excess:
+                best = [ i for i, included in enumerate(selection) if included ]
+                best_excess = value - target
+
+                if best_excess == 0:
+                    break # can't do better
+
+            backtrack = True
+
+        if backtrack:
+            # Drop trailing excluded values, then try excluding the last included one:
+            while selection and not selection[-1]:
+                selection.pop()
+                available += values[len(selection)]
+
+            if not selection:
+                break # the whole tree was explored
+
+            selection[-1] = False
+            value -= values[len(selection) - 1]
+
+        else:
+            i = len(selection)
+            available -= values[i]
+
+            # Including a value equal to the one just excluded repeats a branch:
+            if selection and not selection[-1] and values[i] == values[i - 1]:
+                selection.append(False)
+            else:
+                selection.append(True)
+                value += values[i]
+
+    return best
+
+
+def knapsack(values, target, rng = None, deadline = None, iterations = KNAPSACK_ITERATIONS):
+    """
+    Approximate the subset of `values` with the smallest sum reaching `target`,
+    using Bitcoin Core's randomized two-pass KnapsackSolver. Returns the list of
+    selected indexes, or None if `values` can't reach `target`.
+    """
+    rng = rng or random.Random()
+
+    smaller = []
+    smaller_total = 0
+    lowest_larger = None
+
+    for i, value in enumerate(values):
+        if value == target:
+            return [ i ]
+
+        elif value < target:
+            smaller.append(i)
+            smaller_total += value
+
+        elif lowest_larger is None or value < values[lowest_larger]:
+            lowest_larger = i
+
+    if smaller_total == target:
+        return smaller
+
+    if smaller_total < target:
+        return [ lowest_larger ] if lowest_larger is not None else None
+
+    smaller.sort(key = values.__getitem__, reverse = True)
+    candidates = [ values[i] for i in smaller ]
+
+    # The best subset is order[:length] + [last], see below. None means all:
+    best = None
+    best_total = smaller_total
+
+    for iteration in range(iterations):
+        if best_total == target:
+            break
+
+        # Iterations are O(n), checking the clock each time is cheap. The first
+        # one always runs, the starting point (every value) is a poor answer:
+        if deadline is not None and iteration > 0 and timer() > deadline:
+            break
+
+        included = [ False ] * len(candidates)
+        order = [] # included indexes, append-only, so the best can point into it
+        total = 0
+        reached = False
+
+        # First pass includes values at random, the second fills the gaps.
+        # Values that would reach the target are not kept, to look for a
+        # closer total with the next ones:
+        for npass in range(2):
+            if reached:
+                break
+
+            for i, value in enumerate(candidates):
+                if (rng.random() < 0.5) if npass == 0 else not included[i]:
+                    if total + value >= target:
+                        reached = True
+
+                        if total + value < best_total:
+                            best_total = total + value
+                            best = (order, len(order), i)
+                    else:
+                        total += value
+                        included[i] = True
+                        order.append(i)
+
+    if lowest_larger is not None and (best_total != target and values[lowest_larger] <= best_total):
+        return [ lowest_larger ]
+
+    if best is None:
+        return smaller
+
+    order, length, last = best
+    return [ smaller[i] for i in order[:length] + [ last ] ]
+
+
+def largest_first(values, target):
+    """
+    Take values from the largest down, until `target` is reached. Returns the
+    list of selected indexes, or None.
+    """
+    total = 0
+    selection = []
+
+    for i in sorted(range(len(values)), key = values.__getitem__, reverse = True):
+        selection.append(i)
+        total += values[i]
+
+        if total >= target:
+            return selection
+
+    return None
+
+
+STRATEGIES = ('branch_and_bound', 'knapsack', 'largest_first')
+
+
+def select_coins(coins, outputs, fee_rate, change_script, strategies = STRATEGIES,
+                 time_limit = 0.05, dust_threshold = DUST_THRESHOLD, rng = None):
+    """
+    Choose which Coins fund a Transaction paying `outputs` at `fee_rate`
+    (satoshis per byte), sending change (if any) to `change_script`.
+
+    Strategies run in order within `time_limit` seconds. A changeless solution
+    from branch-and-bound is taken as soon as it's found. Otherwise the knapsack
+    and largest-first results are compared, and the one paying the least fee
+    wins. Raises InsufficientFunds if no strategy can fund the outputs.
+    """
+    if not outputs:
+        raise NoOutputs()
+
+    deadline = timer() + time_limit
+    outputs  = list(outputs)
+
+    # Coins are compared by effective value, what's left after paying for the
+    # Input that spends them. Coins that cost more than they hold are useless:
+    sizes  = [ input_size(coin.input) for coin in coins ]
+    fees   = dict((size, fee_for_size(size, fee_rate)) for size in set(sizes)) # few distinct sizes
+    values = [ coin.amount - fees[size] for coin, size in zip(coins, sizes) ]
+    usable = [ i for i, value in enumerate(values) if value > 0 ]
+    values = [ values[i] for i in usable ]
+
+    change_output = Output.create(0, change_script)
+    change_size = output_size(change_output)
+    change_fee = fee_for_size(change_size, fee_rate)
+
+    # Everything but the inputs. The input count varint is sized for the worst
+    # case, so the estimate never falls short:
+    outputs_size = sum(output_size(o) for o in outputs)
+    base_size = TX_OVERHEAD + varint_size(len(usable)) + varint_size(len(outputs) + 1) + outputs_size
+
+    total_out = sum(o.amount for o in outputs)
+    target = total_out + fee_for_size(base_size, fee_rate)
+
+    candidates = []
+
+    for strategy in strategies:
+        if strategy == 'branch_and_bound':
+            order = sorted(range(len(values)), key = values.__getitem__, reverse = True)
+            found = branch_and_bound([ values[i] for i in order ], target, change_fee + dust_threshold, deadline)
+
+            if found is not None:
+                selected = [ usable[order[i]] for i in found ]
+                return build_selection(coins, sizes, selected, outputs, outputs_size, None, 0, fee_rate, dust_threshold, strategy)
+
+        else:
+            with_change = target + change_fee + dust_threshold
+
+            if strategy == 'knapsack':
+                found = knapsack(values, with_change, rng, deadline)
+            elif strategy == 'largest_first':
+                found = largest_first(values, with_change)
+            else:
+                raise ValueError("Unknown coin selection strategy %r" % strategy)
+
+            # Not enough for change, but maybe enough to pay without it:
+            if found is None:
+                found = largest_first(values, target)
+
+            if found is not None:
+                selected = [ usable[i] for i in found ]
+                candidates.append(build_selection(
+                    coins, sizes, selected, outputs, outputs_size, change_output, change_size, fee_rate, dust_threshold, strategy
+                ))
+
+    if not candidates:
+        raise InsufficientFunds(total_out)
+
+    return min(candidates, key = lambda s: s.fee)
+
+
+def build_selection(coins, sizes, selected, outputs, outputs_size, change_output, change_size, fee_rate, dust_threshold, strategy):
+    chosen    = [ coins[i] for i in selected ]
+    total_in  = sum(coin.amount for coin in chosen)
+    total_out = sum(o.amount for o in outputs)
+
+    if change_output is not None:
+        # Exact size, from the sizes computed for selection:
+        size = (
+            TX_OVERHEAD +
+            varint_size(len(chosen)) + sum(sizes[i] for i in selected) +
+            varint_size(len(outputs) + 1) + outputs_size + change_size
+        )
+
+        fee = fee_for_size(size, fee_rate)
+        change = total_in - total_out - fee
+
+        if change >= dust_threshold:
+            change_output = change_output._replace(amount = change)
+            return Selection(chosen, outputs + [ change_output ], fee, change, strategy)
+
+    # No change, any excess goes to the fee:
+    return Selection(chosen, outputs, total_in - total_out, 0, strategy)
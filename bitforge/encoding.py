@@ -3,6 +3,7 @@ import binascii
 import hashlib
 
 from . import utils
+from .compat import chr, string_types
 from .errors import StringError
 
 
@@ -31,12 +32,47 @@ def encode_base58h(bytes):
 
 
 def decode_base58h(string):
-    try:
-        return utils.encoding.a2b_hashed_base58(string)
+    bytes = try_decode_base58h(string)
 
-    except utils.encoding.EncodingError:
+    if bytes is None:
         raise InvalidBase58h(string)
 
+    return bytes
+
+
+BASE58_VALUES = dict((c, i) for i, c in enumerate('123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'))
+
+def try_decode_base58h(string):
+    """
+    Same as decode_base58h(), but returns None for invalid input instead of
+    raising. Use it to validate in bulk, where building errors dominates.
+    """
+    if not isinstance(string, string_types):
+        return None
+
+    value = 0
+
+    for c in string:
+        digit = BASE58_VALUES.get(c)
+        if digit is None:
+            return None
+
+        value = value * 58 + digit
+
+    # Each leading '1' encodes a leading zero byte:
+    zeros = len(string) - len(string.lstrip('1'))
+    data  = b'\0' * zeros + utils.intbytes.int_to_bytes(value)
+
+    if len(data) < 4:
+        return None
+
+    data, checksum = data[:-4], data[-4:]
+
+    if sha256(sha256(data))[:4] != checksum:
+        return None
+
+    return data
+
 
 def encode_int(integer, big_endian = True, length = None):
     if integer == 0:
@@ -129,7 +165,74 @@ def ripemd160(bytes):
 
 
 def hash160(bytes):
-    return ripemd160(sha256(bytes)).digest()
+    return ripemd160(sha256(bytes))
+
+
+def double_sha256(bytes):
+    return sha256(sha256(bytes))
+
+
+def hash160_many(data, offsets = None, size = None, workers = None):
+    """
+    hash160() of many items at once: `data` is a sequence of bytes, or a
+    buffer holding them back to back, either as `size`-byte records or
+    between consecutive `offsets`. Returns the list of digests.
+
+    Hash objects are bound once and slices are memoryviews, so the Python
+    overhead is a loop iteration per item. With `workers`, the items are
+    split across a thread pool. hashlib only releases the GIL for inputs over
+    2047 bytes, so that pays off for large items only.
+    """
+    new_sha256    = hashlib.sha256
+    new_ripemd160 = hashlib.new('ripemd160').copy
+
+    def run(items):
+        digests = []
+
+        for item in items:
+            ripemd = new_ripemd160()
+            ripemd.update(new_sha256(item).digest())
+            digests.append(ripemd.digest())
+
+        return digests
+
+    return hash_batch(run, batch_items(data, offsets, size), workers)
+
+
+def double_sha256_many(data, offsets = None, size = None, workers = None):
+    # double_sha256() of many items, see hash160_many():
+    new_sha256 = hashlib.sha256
+
+    def run(items):
+        return [ new_sha256(new_sha256(item).digest()).digest() for item in items ]
+
+    return hash_batch(run, batch_items(data, offsets, size), workers)
+
+
+def batch_items(data, offsets, size):
+    if size is not None:
+        view = memoryview(data)
+        return [ view[i : i + size] for i in range(0, len(view), size) ]
+
+    if offsets is not None:
+        view = memoryview(data)
+        return [ view[offsets[i] : offsets[i + 1]] for i in range(len(offsets) - 1) ]
+
+    return data
+
+
+def hash_batch(run, items, workers):
+    if not workers or workers < 2 or len(items) < 2 * workers:
+        return run(items)
+
+    # Loaded here, concurrent.futures isn't in Python 2's standard library:
+    from concurrent.futures import ThreadPoolExecutor
+
+    chunk  = -(-len(items) // workers)
+    chunks = [ items[i : i + chunk] for i in range(0, len(items), chunk) ]
+
+    with ThreadPoolExecutor(workers) as executor:
+        return [ digest for digests in executor.map(run, chunks) for digest in digests ]
 
 
 def decode_script_number(bytes, f_require_minimal = False, size = 4):
@@ -3,13 +3,26 @@ from __future__ import unicode_literals
 class BitforgeError(Exception):
     def __init__(self, *args, **kwargs):
         self.cause = kwargs.pop('cause', None)
+        self._message = None
         self.prepare(*args, **kwargs)
-        message = self.__doc__.format(**self.__dict__)
-        super(BitforgeError, self).__init__(message)
+        super(BitforgeError, self).__init__(*args)
 
     def prepare(self):
         pass
 
+    def get_fields(self):
+        # Values available to the message template (the class docstring):
+        return self.__dict__
+
+    @property
+    def message(self):
+        # Formatted on first use rather than on construction. Errors are often
+        # caught and discarded, and formatting may repr() large buffers:
+        if self._message is None:
+            self._message = self.__doc__.format(**self.get_fields())
+
+        return self._message
+
     def __str__(self):
         return self.message
 
@@ -21,8 +34,15 @@ class ObjectError(BitforgeError):
 
 class StringError(BitforgeError):
     def prepare(self, string):
-        self.string = repr(string)
-        self.length = len(string)
+        self.raw_string = string
+        self.length     = len(string)
+
+    @property
+    def string(self):
+        return repr(self.raw_string)
+
+    def get_fields(self):
+        return dict(self.__dict__, string = self.string)
 
 
 class NumberError(BitforgeError):
@@ -50,7 +50,7 @@ class HDPublicKey(BaseHDPublicKey):
 
     def to_string(self):
         # See BIP 32: https://github.com/bitcoin/bips/blob/master/bip-0032.mediawiki
-        bytes = (""
+        bytes = (b""
             + to_bytes(self.network.hd_public_key, length = 4)
             + to_bytes(self.depth, length = 1)
             + to_bytes(self.parent, length = 4)
@@ -68,6 +68,9 @@ class HDPublicKey(BaseHDPublicKey):
         if index < HARDENED_START and hardened:
             index += HARDENED_START
 
+        # Indexes from HARDENED_START up are hardened, however they're passed:
+        hardened = index >= HARDENED_START
+
         if hardened:
             raise ValueError("Hardened derivation is not posible on HDPublicKey")
         else:
@@ -75,14 +78,16 @@ class HDPublicKey(BaseHDPublicKey):
 
         signed64 = hmac.new(
             self.chain,
-            key + to_bytes(self.index, length = 4),
+            key + to_bytes(index, length = 4),
             hashlib.sha512
         ).digest()
 
+        # Our own pubkey was validated when it was created, and the sum of
+        # points on the curve is on the curve:
         x, y = self.pubkey.pair
         curve = utils.generator_secp256k1
-        point = int_from_bytes(signed64[:32]) * curve + utils.Point(curve.curve(), x, y, curve.order())
-        pubkey = PublicKey((point.x(), point.y()), self.network)
+        point = int_from_bytes(signed64[:32]) * curve + utils.Point.trusted(curve.curve(), x, y, curve.order())
+        pubkey = PublicKey.trusted((point.x(), point.y()), self.network)
 
         chain   = signed64[32:]
         depth   = self.depth + 1
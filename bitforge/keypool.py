@@ -0,0 +1,227 @@
+from __future__ import unicode_literals
+import collections
+import os
+import threading
+
+from bitforge import networks
+from bitforge.errors import *
+from bitforge.privkey import PrivateKey
+from bitforge.pubkey import PublicKey
+from bitforge.address import Address
+
+
+DEFAULT_SIZE = 100
+REFILL_BATCH = 10 # keys generated, then journaled with a single fsync
+
+NO_INDEX = -1 # journaled index of keys that weren't derived
+
+
+PooledKey = collections.namedtuple('PooledKey', ['privkey', 'pubkey', 'address', 'index'])
+
+
+def journal_line(key):
+    return 'key %s %s %s %d' % (key.privkey.to_wif(), key.pubkey.to_hex(), key.address.to_string(), key.index)
+
+
+class KeyPool(object):
+    """
+    Keys generated ahead of time, with their public keys and addresses, so
+    handing one out costs no elliptic curve arithmetic. Keys are random, or
+    children of `hd_key` (an HDPrivateKey) in index order.
+
+    When the pool drops below `low_watermark` keys, a background thread tops
+    it up to `size`. Pure Python arithmetic holds the GIL, so refilling still
+    competes for the CPU, but outside of get() calls. get() only computes a key
+    itself when the pool is empty.
+
+    With a `path`, keys are written to an append-only journal (and fsync'ed)
+    before they can be handed out, and get() marks keys as used (fsync'ed too)
+    before returning them, so no key is handed out twice, even after a crash.
+    The pool survives restarts and derivation resumes where it stopped. The
+    journal holds private keys, it's created readable by its owner only. It's
+    compacted when opened.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class InvalidJournal(Error, StringError):
+        "The key pool journal {string} is corrupt"
+
+    class InvalidWatermark(Error, NumberError):
+        "The low watermark must be between 1 and the pool size, not {number}"
+
+
+    def __init__(self, size = DEFAULT_SIZE, low_watermark = None, hd_key = None,
+                 network = networks.default, path = None, background = True):
+        if low_watermark is None:
+            low_watermark = max(1, size // 4)
+
+        # Above `size` the refill thread would spin, at 0 it would never run:
+        if not 0 < low_watermark <= size:
+            raise KeyPool.InvalidWatermark(low_watermark)
+
+        self.size          = size
+        self.low_watermark = low_watermark
+        self.hd_key        = hd_key
+        self.network       = hd_key.network if hd_key is not None else networks.find(network)
+        self.path          = path
+        self.journal       = None
+        self.keys          = collections.deque()
+        self.next_index    = 0 # next child of hd_key to derive
+
+        self.lock   = threading.Lock()
+        self.wakeup = threading.Condition(self.lock) # notified when the pool runs low, or closes
+        self.closed = False
+        self.worker = None
+
+        if path is not None:
+            if os.path.exists(path):
+                self.load()
+
+            self.compact()
+
+        if background:
+            self.worker = threading.Thread(target = self.run, name = 'KeyPool')
+            self.worker.daemon = True
+            self.worker.start()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self):
+        # The next pooled key, which is durably marked as used before it's returned:
+        with self.lock:
+            key = self.keys.popleft() if self.keys else None
+
+        if key is None:
+            key = self.generate(1)[0]
+
+        with self.lock:
+            self.write([ 'used %s' % key.address.to_string() ])
+
+            if len(self.keys) < self.low_watermark:
+                self.wakeup.notify()
+
+        return key
+
+    def fill(self):
+        # Top the pool up to `size` keys, in the calling thread:
+        while len(self.keys) < self.size and not self.closed:
+            self.generate(min(REFILL_BATCH, self.size - len(self.keys)), pooled = True)
+
+    def generate(self, count, pooled = False):
+        with self.lock:
+            start = self.next_index
+            self.next_index += count if self.hd_key is not None else 0
+
+        # The expensive part, done without holding the lock:
+        keys = [ self.create(start + i) for i in range(count) ]
+
+        with self.lock:
+            self.write([ journal_line(key) for key in keys ])
+
+            if pooled:
+                self.keys.extend(keys)
+
+        return keys
+
+    def create(self, index):
+        if self.hd_key is None:
+            privkey = PrivateKey(network = self.network)
+            index   = NO_INDEX
+        else:
+            privkey = self.hd_key.derive(index).to_private_key()
+
+        pubkey = privkey.to_public_key()
+        return PooledKey(privkey, pubkey, pubkey.to_address(), index)
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.closed and len(self.keys) >= self.low_watermark:
+                    self.wakeup.wait()
+
+                if self.closed:
+                    return
+
+            self.fill()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.wakeup.notify()
+
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def write(self, lines):
+        # Append to the journal, and fsync it. Called with the lock held:
+        if self.journal is None or not lines:
+            return
+
+        self.journal.write(''.join(line + '\n' for line in lines).encode('ascii'))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def load(self):
+        pooled = collections.OrderedDict() # address -> PooledKey
+
+        with open(self.path, 'rb') as journal:
+            lines = journal.read().decode('ascii').split('\n')
+
+        # A crash can leave the last line incomplete, it's never been used:
+        for line in lines[:-1]:
+            fields = line.split(' ')
+
+            try:
+                if fields[0] == 'key':
+                    privkey = PrivateKey.from_wif(fields[1])
+                    pubkey  = PublicKey.from_hex(fields[2], privkey.network)
+                    address = Address.from_string(fields[3])
+                    index   = int(fields[4])
+
+                    pooled[fields[3]] = PooledKey(privkey, pubkey, address, index)
+                    self.next_index = max(self.next_index, index + 1)
+
+                elif fields[0] == 'used':
+                    pooled.pop(fields[1], None)
+
+                elif fields[0] == 'next':
+                    self.next_index = max(self.next_index, int(fields[1]))
+
+                else:
+                    raise ValueError(fields[0])
+
+            except (BitforgeError, ValueError, IndexError) as e:
+                raise KeyPool.InvalidJournal(self.path, cause = e)
+
+        self.keys.extend(pooled.values())
+
+    def compact(self):
+        # Rewrite the journal with the unused keys only, then keep appending to it:
+        temporary = self.path + '.tmp'
+
+        # Private keys in plain text, not for other users to read:
+        if os.path.exists(temporary):
+            os.remove(temporary) # left by a crash, maybe with a laxer mode
+
+        self.journal = os.fdopen(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb')
+
+        self.write([ 'next %d' % self.next_index ] + [ journal_line(key) for key in self.keys ])
+
+        self.journal.close()
+        os.replace(temporary, self.path)
+
+        self.journal = open(self.path, 'ab')
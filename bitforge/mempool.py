@@ -0,0 +1,395 @@
+from __future__ import unicode_literals
+import heapq
+import itertools
+
+from bitforge.encoding import *
+from bitforge.errors import *
+from bitforge.transaction.size import transaction_size
+from bitforge.utxo import outpoint_key
+
+
+# Same defaults as Bitcoin Core's -limitancestorcount and -limitdescendantcount:
+MAX_ANCESTORS   = 25
+MAX_DESCENDANTS = 25
+
+# Stale heap items (left by entries that changed or left) allowed per live one,
+# before the heaps are rebuilt:
+MAX_STALE_RATIO = 2
+
+
+def display_id(txid):
+    return encode_hex(txid[::-1]).decode('utf-8')
+
+
+class MempoolEntry(object):
+    """
+    A transaction in the Mempool, with the size (in bytes) and fee (in satoshis)
+    of itself plus all its in-mempool ancestors, and of itself plus all its
+    in-mempool descendants.
+    """
+    __slots__ = (
+        'tx', 'txid', 'fee', 'size', 'parents', 'children',
+        'ancestor_count', 'ancestor_size', 'ancestor_fee',
+        'descendant_count', 'descendant_size', 'descendant_fee',
+    )
+
+    def __init__(self, tx, txid, fee, size):
+        self.tx       = tx
+        self.txid     = txid
+        self.fee      = fee
+        self.size     = size
+        self.parents  = set() # txids of in-mempool transactions this one spends from
+        self.children = set() # txids of in-mempool transactions spending this one
+
+        self.ancestor_count = self.descendant_count = 1
+        self.ancestor_size  = self.descendant_size  = size
+        self.ancestor_fee   = self.descendant_fee   = fee
+
+    def __repr__(self):
+        return '<MempoolEntry %s>' % display_id(self.txid)
+
+    def get_fee_rate(self):
+        return self.fee / float(self.size)
+
+    def get_ancestor_fee_rate(self):
+        return self.ancestor_fee / float(self.ancestor_size)
+
+    def get_descendant_score(self):
+        # Same as Bitcoin Core: a transaction is worth keeping if either it, or
+        # it with its descendants, pays well:
+        return max(self.get_fee_rate(), self.descendant_fee / float(self.descendant_size))
+
+
+class Mempool(object):
+    """
+    Unconfirmed transactions, keyed by transaction ID (as get_id_bytes()
+    returns it), with an outpoint -> spender index to detect conflicts.
+
+    Ancestor and descendant aggregates are updated incrementally as
+    transactions come and go, touching at most MAX_ANCESTORS + MAX_DESCENDANTS
+    entries. Two heaps order entries by ancestor fee rate (best first, to
+    build block templates) and by descendant score (worst first, to evict).
+    Heap items are not updated in place: a new one is pushed, and outdated
+    ones are skipped when popped.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class AlreadyInMempool(Error, StringError):
+        "Transaction {string} is already in the mempool"
+
+    class NotInMempool(Error, StringError):
+        "Transaction {string} is not in the mempool"
+
+    class Conflict(Error, KeyValueError):
+        "Output {value} of transaction {key} is already spent by a transaction in the mempool"
+
+    class TooManyAncestors(Error, NumberError):
+        "This transaction would have {number} ancestors in the mempool, more than allowed"
+
+    class TooManyDescendants(Error, StringError):
+        "Transaction {string} would have more descendants in the mempool than allowed"
+
+
+    def __init__(self, max_ancestors = MAX_ANCESTORS, max_descendants = MAX_DESCENDANTS):
+        self.max_ancestors   = max_ancestors
+        self.max_descendants = max_descendants
+
+        self.entries  = {} # txid -> MempoolEntry
+        self.spenders = {} # outpoint key (see utxo.outpoint_key) -> txid of the spender
+        self.size     = 0  # total bytes
+
+        self.mining_heap   = [] # (-ancestor fee rate, sequence, txid, entry)
+        self.eviction_heap = [] # (descendant score, sequence, txid, entry)
+        self.sequence      = itertools.count() # ties are broken by arrival
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, txid):
+        return txid in self.entries
+
+    def get(self, txid):
+        return self.entries.get(txid)
+
+    def get_spender(self, tx_id, index):
+        # The txid of the mempool transaction spending an output, or None:
+        return self.spenders.get(outpoint_key(tx_id, index))
+
+    def add(self, tx, fee, size = None):
+        """
+        Add a transaction that pays `fee` satoshis. Raises Conflict if another
+        transaction in the mempool spends one of the same outputs, or
+        TooManyAncestors/TooManyDescendants if it exceeds the chain limits.
+        """
+        txid = tx.get_id_bytes()
+
+        if txid in self.entries:
+            raise Mempool.AlreadyInMempool(display_id(txid))
+
+        keys    = []
+        parents = set()
+
+        for input in tx.inputs:
+            key = outpoint_key(input.tx_id, input.txo_index)
+
+            if key in self.spenders:
+                raise Mempool.Conflict(input.tx_id, input.txo_index)
+
+            if key[:32] in self.entries:
+                parents.add(key[:32])
+
+            keys.append(key)
+
+        ancestors = self.get_ancestors(parents)
+
+        if len(ancestors) + 1 > self.max_ancestors:
+            raise Mempool.TooManyAncestors(len(ancestors))
+
+        for ancestor in ancestors:
+            if ancestor.descendant_count + 1 > self.max_descendants:
+                raise Mempool.TooManyDescendants(display_id(ancestor.txid))
+
+        if size is None:
+            size = transaction_size(tx.inputs, tx.outputs)
+
+        entry = MempoolEntry(tx, txid, fee, size)
+        entry.parents = parents
+
+        entry.ancestor_count += len(ancestors)
+        entry.ancestor_size  += sum(a.size for a in ancestors)
+        entry.ancestor_fee   += sum(a.fee for a in ancestors)
+
+        for ancestor in ancestors:
+            ancestor.descendant_count += 1
+            ancestor.descendant_size  += size
+            ancestor.descendant_fee   += fee
+            self.push_eviction(ancestor)
+
+        for parent in parents:
+            self.entries[parent].children.add(txid)
+
+        for key in keys:
+            self.spenders[key] = txid
+
+        self.entries[txid] = entry
+        self.size += size
+
+        self.push_mining(entry)
+        self.push_eviction(entry)
+
+        return entry
+
+    def get_ancestors(self, txids):
+        # Entries of `txids` and everything they descend from, in the mempool:
+        return self.walk(txids, 'parents')
+
+    def get_descendants(self, txids):
+        return self.walk(txids, 'children')
+
+    def walk(self, txids, direction):
+        found   = {}
+        pending = list(txids)
+
+        while pending:
+            txid = pending.pop()
+
+            if txid not in found:
+                entry = found[txid] = self.entries[txid]
+                pending.extend(getattr(entry, direction))
+
+        return list(found.values())
+
+    def remove(self, txid):
+        """
+        Remove a transaction and everything that descends from it (which can't
+        be valid without it). Returns the removed entries.
+        """
+        if txid not in self.entries:
+            raise Mempool.NotInMempool(display_id(txid))
+
+        removed = self.get_descendants([ txid ])
+        removed_ids = set(entry.txid for entry in removed)
+        affected = {}
+
+        for entry in removed:
+            # Ancestors outside the removed set lose this descendant:
+            for ancestor in self.get_ancestors(entry.parents):
+                if ancestor.txid not in removed_ids:
+                    ancestor.descendant_count -= 1
+                    ancestor.descendant_size  -= entry.size
+                    ancestor.descendant_fee   -= entry.fee
+                    affected[ancestor.txid] = ancestor
+
+        for entry in removed:
+            self.unlink(entry)
+
+        for ancestor in affected.values():
+            self.push_eviction(ancestor)
+
+        self.maybe_rebuild()
+        return removed
+
+    def remove_block(self, transactions):
+        """
+        Remove transactions confirmed by a block, in block order, along with
+        mempool transactions that conflict with them. Descendants of confirmed
+        transactions stay, with their ancestor aggregates updated. Returns the
+        entries removed as conflicts.
+        """
+        conflicts = []
+
+        for tx in transactions:
+            txid = tx.get_id_bytes()
+            entry = self.entries.get(txid)
+
+            if entry is None:
+                # Not ours, but it may spend the same outputs as ours:
+                for input in tx.inputs:
+                    spender = self.spenders.get(outpoint_key(input.tx_id, input.txo_index))
+
+                    if spender is not None and spender in self.entries:
+                        conflicts.extend(self.remove(spender))
+
+                continue
+
+            # Block order puts parents first, so this one has no ancestors left:
+            for descendant in self.get_descendants(entry.children):
+                descendant.ancestor_count -= 1
+                descendant.ancestor_size  -= entry.size
+                descendant.ancestor_fee   -= entry.fee
+                self.push_mining(descendant)
+
+            self.unlink(entry)
+
+        self.maybe_rebuild()
+        return conflicts
+
+    def unlink(self, entry):
+        del self.entries[entry.txid]
+        self.size -= entry.size
+
+        for input in entry.tx.inputs:
+            self.spenders.pop(outpoint_key(input.tx_id, input.txo_index), None)
+
+        for parent in entry.parents:
+            if parent in self.entries:
+                self.entries[parent].children.discard(entry.txid)
+
+        for child in entry.children:
+            if child in self.entries:
+                self.entries[child].parents.discard(entry.txid)
+
+    def push_mining(self, entry):
+        heapq.heappush(self.mining_heap, (-entry.get_ancestor_fee_rate(), next(self.sequence), entry.txid, entry))
+
+    def push_eviction(self, entry):
+        heapq.heappush(self.eviction_heap, (entry.get_descendant_score(), next(self.sequence), entry.txid, entry))
+
+    def is_current(self, item, key):
+        # Heap items are current if the entry is still in and its key unchanged:
+        entry = item[3]
+        return self.entries.get(item[2]) is entry and item[0] == key(entry)
+
+    def maybe_rebuild(self):
+        live = len(self.entries)
+
+        if len(self.mining_heap) > (MAX_STALE_RATIO + 1) * live + 64:
+            self.mining_heap = [ item for item in self.mining_heap if self.is_current(item, mining_key) ]
+            heapq.heapify(self.mining_heap)
+
+        if len(self.eviction_heap) > (MAX_STALE_RATIO + 1) * live + 64:
+            self.eviction_heap = [ item for item in self.eviction_heap if self.is_current(item, eviction_key) ]
+            heapq.heapify(self.eviction_heap)
+
+    def peek_best(self):
+        # The entry with the highest ancestor fee rate, or None:
+        return self.peek(self.mining_heap, mining_key)
+
+    def peek_worst(self):
+        # The entry with the lowest descendant score, or None:
+        return self.peek(self.eviction_heap, eviction_key)
+
+    def peek(self, heap, key):
+        while heap:
+            if self.is_current(heap[0], key):
+                return heap[0][3]
+
+            heapq.heappop(heap) # stale
+
+        return None
+
+    def trim(self, max_size):
+        """
+        Evict the transactions with the lowest descendant score, along with
+        their descendants, until the mempool takes at most `max_size` bytes.
+        Returns the removed entries.
+        """
+        removed = []
+
+        while self.size > max_size:
+            removed.extend(self.remove(self.peek_worst().txid))
+
+        return removed
+
+    def select(self, max_size, min_fee_rate = 0):
+        """
+        Choose transactions for a block template of at most `max_size` bytes,
+        by ancestor fee rate, like Bitcoin Core's CreateNewBlock: each pick
+        brings its missing ancestors along, and the ancestor aggregates of
+        what's left are reduced by what was picked. Returns the entries in a
+        valid block order.
+        """
+        heap = [ item for item in self.mining_heap if self.is_current(item, mining_key) ]
+        heapq.heapify(heap)
+
+        selected = []
+        included = set()
+        modified = {} # txid -> (ancestor fee, ancestor size) net of included ancestors
+        total    = 0
+
+        while heap:
+            neg_rate, sequence, txid, entry = heapq.heappop(heap)
+
+            if txid in included:
+                continue
+
+            fee, size = modified.get(txid, (entry.ancestor_fee, entry.ancestor_size))
+
+            if -neg_rate != fee / float(size):
+                continue # superseded by an item pushed after an ancestor was picked
+
+            if -neg_rate < min_fee_rate:
+                break
+
+            if total + size > max_size:
+                continue
+
+            package = [ a for a in self.get_ancestors([ txid ]) if a.txid not in included ]
+            package.sort(key = lambda a: a.ancestor_count) # parents before children
+
+            for member in package:
+                selected.append(member)
+                included.add(member.txid)
+                total += member.size
+
+                for descendant in self.get_descendants(member.children):
+                    if descendant.txid in included:
+                        continue
+
+                    d_fee, d_size = modified.get(descendant.txid, (descendant.ancestor_fee, descendant.ancestor_size))
+                    d_fee, d_size = d_fee - member.fee, d_size - member.size
+
+                    modified[descendant.txid] = (d_fee, d_size)
+                    heapq.heappush(heap, (-d_fee / float(d_size), next(self.sequence), descendant.txid, descendant))
+
+        return selected
+
+
+def mining_key(entry):
+    return -entry.get_ancestor_fee_rate()
+
+
+def eviction_key(entry):
+    return entry.get_descendant_score()
@@ -0,0 +1,369 @@
+from __future__ import unicode_literals
+import collections
+import hashlib
+
+from bitforge.encoding import *
+from bitforge.errors import *
+from bitforge.tools import Buffer
+
+
+# Hashes are 32 bytes in internal byte order, as Transaction.get_id_bytes()
+# returns them. The merkle root of no hashes is all zeros, like Bitcoin Core's:
+HASH_SIZE = 32
+NULL_HASH = b'\0' * HASH_SIZE
+
+
+def hash_pair(pair):
+    # Double SHA256 of two concatenated hashes (64 bytes):
+    return hashlib.sha256(hashlib.sha256(pair).digest()).digest()
+
+
+def merkle_root(hashes):
+    """
+    The merkle root of a list of hashes. Each level is hashed over the one
+    below in a single preallocated buffer, as one double_sha256_many() batch
+    of 64-byte pairs.
+    """
+    count = len(hashes)
+
+    if count == 0:
+        return NULL_HASH
+
+    # One spare slot, for when the last hash of an odd level is duplicated:
+    level = bytearray(HASH_SIZE * (count + 1))
+    level[:HASH_SIZE * count] = b''.join(hashes)
+    view = memoryview(level)
+
+    while count > 1:
+        if count % 2:
+            level[HASH_SIZE * count : HASH_SIZE * (count + 1)] = view[HASH_SIZE * (count - 1) : HASH_SIZE * count]
+            count += 1
+
+        # Parents overwrite the start of the level, once all pairs are hashed:
+        digests = double_sha256_many(view[:HASH_SIZE * count], size = 2 * HASH_SIZE)
+        level[:HASH_SIZE * len(digests)] = b''.join(digests)
+
+        count //= 2
+
+    return bytes(level[:HASH_SIZE])
+
+
+def branch_root(leaf, branch, index):
+    # Inverse of MerkleTree.get_branch(), the root `leaf` proves to be under:
+    node = leaf
+
+    for sibling in branch:
+        node = hash_pair(sibling + node if index & 1 else node + sibling)
+        index >>= 1
+
+    return node
+
+
+class MerkleTree(object):
+    """
+    A merkle tree that keeps every level, as a flat buffer of hashes each.
+
+    Appending or replacing a leaf only rehashes its path to the root, so a block
+    template can add transactions or swap its coinbase in O(log n) hashes. The
+    stored levels also give branches and partial merkle trees without hashing.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class InvalidHash(Error, StringError):
+        "Merkle tree hashes must be 32 bytes long, got {string}"
+
+    class InvalidIndex(Error, NumberError):
+        "There is no leaf {number} in this merkle tree"
+
+
+    def __init__(self, hashes = ()):
+        self.levels = [ bytearray() ] # levels[0] holds the leaves, the last one the root
+
+        for hash in hashes:
+            self.check_hash(hash)
+
+        if hashes:
+            self.levels[0] += b''.join(hashes)
+            self.build()
+
+    def __len__(self):
+        return len(self.levels[0]) // HASH_SIZE
+
+    def build(self):
+        # Hash every level from the leaves up:
+        level = self.levels[0]
+        del self.levels[1:]
+
+        while len(level) > HASH_SIZE:
+            count  = len(level) // HASH_SIZE
+            parent = bytearray()
+
+            for i in range(0, count - 1, 2):
+                parent += hash_pair(level[HASH_SIZE * i : HASH_SIZE * (i + 2)])
+
+            if count % 2:
+                last = level[HASH_SIZE * (count - 1):]
+                parent += hash_pair(last + last)
+
+            self.levels.append(parent)
+            level = parent
+
+    def check_hash(self, hash):
+        if len(hash) != HASH_SIZE:
+            raise MerkleTree.InvalidHash(hash)
+
+    def append(self, hash):
+        self.check_hash(hash)
+
+        self.levels[0] += hash
+        self.update_path(len(self) - 1)
+
+    def replace(self, index, hash):
+        self.check_hash(hash)
+
+        if not 0 <= index < len(self):
+            raise MerkleTree.InvalidIndex(index)
+
+        self.levels[0][HASH_SIZE * index : HASH_SIZE * (index + 1)] = hash
+        self.update_path(index)
+
+    def update_path(self, index):
+        # Rehash the ancestors of leaf `index`, adding levels as the tree grows:
+        height = 0
+
+        while len(self.levels[height]) > HASH_SIZE:
+            level = self.levels[height]
+            left  = HASH_SIZE * (index & ~1)
+
+            if left + HASH_SIZE < len(level):
+                node = hash_pair(level[left : left + 2 * HASH_SIZE])
+            else:
+                node = hash_pair(level[left : left + HASH_SIZE] * 2) # odd one out, paired with itself
+
+            if height + 1 == len(self.levels):
+                self.levels.append(bytearray())
+
+            parent = self.levels[height + 1]
+            index >>= 1
+
+            parent[HASH_SIZE * index : HASH_SIZE * (index + 1)] = node
+            height += 1
+
+    def get_height(self):
+        return len(self.levels) - 1
+
+    def get_width(self, height):
+        return len(self.levels[height]) // HASH_SIZE
+
+    def get_hash(self, height, index):
+        return bytes(self.levels[height][HASH_SIZE * index : HASH_SIZE * (index + 1)])
+
+    def get_leaves(self):
+        return [ self.get_hash(0, i) for i in range(len(self)) ]
+
+    def get_root(self):
+        if len(self) == 0:
+            return NULL_HASH
+
+        return bytes(self.levels[-1])
+
+    def get_branch(self, index):
+        # Sibling hashes from leaf `index` up to the root, see branch_root():
+        if not 0 <= index < len(self):
+            raise MerkleTree.InvalidIndex(index)
+
+        branch = []
+
+        for height in range(self.get_height()):
+            sibling = index ^ 1
+
+            if sibling >= self.get_width(height):
+                sibling = index
+
+            branch.append(self.get_hash(height, sibling))
+            index >>= 1
+
+        return branch
+
+
+BasePartialMerkleTree = collections.namedtuple('PartialMerkleTree',
+    ['total', 'hashes', 'flags']
+)
+
+
+class PartialMerkleTree(BasePartialMerkleTree):
+    """
+    Proof that some leaves belong to a merkle tree of `total` leaves, as carried
+    by `merkleblock` messages (BIP37). Nodes are visited depth-first: `flags`
+    tells whether each one is an ancestor of a matched leaf, and `hashes` has
+    the ones that aren't expanded.
+    """
+    __slots__ = ()
+
+    class Error(BitforgeError):
+        pass
+
+    class InvalidTree(Error):
+        "This partial merkle tree is malformed: {reason}"
+
+        def prepare(self, reason):
+            self.reason = reason
+
+
+    def __new__(cls, total, hashes, flags):
+        return super(PartialMerkleTree, cls).__new__(cls, total, tuple(hashes), tuple(flags))
+
+    @classmethod
+    def create(cls, tree, matches):
+        """
+        Build the proof for the leaves of `tree` (a MerkleTree, or a list of
+        hashes) whose position in `matches` is truthy.
+        """
+        if not isinstance(tree, MerkleTree):
+            tree = MerkleTree(tree)
+
+        matches = [ bool(match) for match in matches ]
+        hashes  = []
+        flags   = []
+
+        def build(height, index):
+            is_parent = any(matches[index << height : (index + 1) << height])
+            flags.append(is_parent)
+
+            if height == 0 or not is_parent:
+                hashes.append(tree.get_hash(height, index))
+            else:
+                build(height - 1, 2 * index)
+
+                if 2 * index + 1 < tree.get_width(height - 1):
+                    build(height - 1, 2 * index + 1)
+
+        if len(tree) > 0:
+            build(tree.get_height(), 0)
+
+        return cls(len(tree), hashes, flags)
+
+    def get_height(self):
+        height = 0
+
+        while self.get_width(height) > 1:
+            height += 1
+
+        return height
+
+    def get_width(self, height):
+        return (self.total + (1 << height) - 1) >> height
+
+    def extract(self):
+        """
+        Recompute the merkle root from the proof. Returns the root and the
+        list of matched (index, hash) leaves, or raises InvalidTree.
+        """
+        if self.total == 0:
+            raise PartialMerkleTree.InvalidTree('it has no leaves')
+
+        if len(self.hashes) > self.total:
+            raise PartialMerkleTree.InvalidTree('it has more hashes than leaves')
+
+        if len(self.flags) < len(self.hashes):
+            raise PartialMerkleTree.InvalidTree('it has fewer flags than hashes')
+
+        hashes  = iter(self.hashes)
+        flags   = iter(self.flags)
+        matched = []
+
+        def extract(height, index):
+            try:
+                is_parent = next(flags)
+            except StopIteration:
+                raise PartialMerkleTree.InvalidTree('it ran out of flags')
+
+            if height == 0 or not is_parent:
+                try:
+                    hash = next(hashes)
+                except StopIteration:
+                    raise PartialMerkleTree.InvalidTree('it ran out of hashes')
+
+                if height == 0 and is_parent:
+                    matched.append((index, hash))
+
+                return hash
+
+            left = extract(height - 1, 2 * index)
+
+            if 2 * index + 1 < self.get_width(height - 1):
+                right = extract(height - 1, 2 * index + 1)
+
+                # Identical siblings allow forging trees (CVE-2012-2459):
+                if right == left:
+                    raise PartialMerkleTree.InvalidTree('it has two identical sibling nodes')
+            else:
+                right = left
+
+            return hash_pair(left + right)
+
+        root = extract(self.get_height(), 0)
+
+        # Every hash must be used, and every flag but the padding of the last byte:
+        if next(hashes, None) is not None:
+            raise PartialMerkleTree.InvalidTree('not all hashes were used')
+
+        used = len(self.flags) - sum(1 for flag in flags)
+        if (used + 7) // 8 != (len(self.flags) + 7) // 8:
+            raise PartialMerkleTree.InvalidTree('not all flags were used')
+
+        return root, matched
+
+    def verify(self, root):
+        try:
+            return self.extract()[0] == root
+        except PartialMerkleTree.InvalidTree:
+            return False
+
+    def to_bytes(self):
+        buffer = Buffer()
+
+        # Number of leaves in the full tree, as little-endian uint32 (4 bytes):
+        buffer.write(encode_int(self.total, length = 4, big_endian = False))
+
+        # Number of hashes, as variable-length integer, and the hashes (32 bytes each):
+        buffer.write(encode_varint(len(self.hashes)))
+        for hash in self.hashes:
+            buffer.write(hash)
+
+        # Flags, packed least significant bit first, and their byte count:
+        flag_bytes = bytearray((len(self.flags) + 7) // 8)
+        for i, flag in enumerate(self.flags):
+            if flag:
+                flag_bytes[i // 8] |= 1 << (i % 8)
+
+        buffer.write(encode_varint(len(flag_bytes)))
+        buffer.write(flag_bytes)
+
+        return bytes(buffer)
+
+    def to_hex(self):
+        return encode_hex(self.to_bytes()).decode('utf-8')
+
+    @classmethod
+    def from_hex(cls, string):
+        return cls.from_bytes(decode_hex(string))
+
+    @classmethod
+    def from_bytes(cls, bytes):
+        return cls.from_buffer(Buffer(bytes))
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # Inverse operation of PartialMerkleTree.to_bytes(), check that out.
+        total = decode_int(buffer.read(4), big_endian = False)
+
+        hash_count = buffer.read_varint()
+        hashes = [ bytes(buffer.read(HASH_SIZE)) for i in range(hash_count) ]
+
+        flag_bytes = buffer.read(buffer.read_varint())
+        flags = [ bool(flag_bytes[i // 8] & (1 << (i % 8))) for i in range(8 * len(flag_bytes)) ]
+
+        return cls(total, hashes, flags)
@@ -64,19 +64,56 @@ default = livenet = Network(
   ]
 )
 
-_networks = [livenet, testnet]
+class NetworkAlreadyRegistered(KeyValueError):
+    "A network with an attribute '{key}' of value {value} is already registered"
+
+
+# Attributes that can be looked up with find(), each with a value -> Network
+# index kept up to date by register(). Seeds are lists, they can't be keys:
+INDEXED_ATTRIBUTES = tuple(attr for attr in Network._fields if attr != 'seeds')
+
+_networks = []
+_indexes  = dict((attr, {}) for attr in INDEXED_ATTRIBUTES)
+
+
+def register(network):
+    """
+    Make a Network (an altcoin, a regtest setup) known to find(), and to every
+    constructor or parser that looks networks up by name or version bytes.
+    Names must be unique. Other attributes may be shared, lookups by a shared
+    value return the network registered first.
+    """
+    if network.name in _indexes['name']:
+        raise NetworkAlreadyRegistered('name', network.name)
+
+    _networks.append(network)
+
+    for attr in INDEXED_ATTRIBUTES:
+        _indexes[attr].setdefault(getattr(network, attr), network)
+
+    return network
+
 
 def find(value, attr = 'name', raises = True):
     if isinstance(value, Network):
         return value
 
+    index = _indexes.get(attr)
+
     try:
-      for network in _networks:
-        if getattr(network, attr) == value:
-          return network
+        if index is not None:
+            return index[value]
 
-    except AttributeError:
-      pass # networks don't have this attribute!
+        for network in _networks:
+            if getattr(network, attr) == value:
+                return network
+
+    except (KeyError, TypeError, AttributeError):
+        pass # unknown (or unhashable) value, or networks don't have this attribute!
 
     if raises:
-      raise UnknownNetwork(attr, value)
+        raise UnknownNetwork(attr, value)
+
+
+register(livenet)
+register(testnet)
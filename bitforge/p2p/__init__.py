@@ -0,0 +1,5 @@
+# Message encoding works everywhere. Connections (bitforge.p2p.peer) need asyncio,
+# and are imported on their own:
+from .messages import encode_message, decode_message, decode_header, decode_payload
+from .messages import NetAddress, InvItem, Version, Verack, Ping, Pong, Inv, GetData, NotFound
+from .messages import TxMessage, GetHeaders, Headers, BlockMessage, FilterLoad, MerkleBlock, UnknownMessage
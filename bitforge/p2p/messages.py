@@ -0,0 +1,414 @@
+from __future__ import unicode_literals
+import collections
+import struct
+
+from bitforge import networks
+from bitforge.encoding import *
+from bitforge.errors import *
+from bitforge.tools import Buffer
+from bitforge.block import BlockHeader, HEADER_SIZE, NULL_HASH
+from bitforge.bloom import BloomFilter
+from bitforge.merkle import PartialMerkleTree
+from bitforge.transaction import Transaction
+
+
+PROTOCOL_VERSION = 70015
+USER_AGENT       = b'/bitforge:0.3/'
+
+# Magic, command (NUL-padded), payload length and checksum (24 bytes):
+MESSAGE_HEADER = struct.Struct(str('<4s12sI4s'))
+
+# Same limit as Bitcoin Core, larger payloads aren't even read:
+MAX_PAYLOAD = 32 * 1024 * 1024
+
+# Largest number of inventory items in inv, getdata and notfound messages:
+MAX_INV_ITEMS = 50000
+
+# Inventory types:
+MSG_TX             = 1
+MSG_BLOCK          = 2
+MSG_FILTERED_BLOCK = 3
+
+NODE_NETWORK = 1
+
+
+class MessageError(BitforgeError):
+    pass
+
+class InvalidMagic(MessageError, StringError):
+    "Message starts with {string}, which isn't the network magic"
+
+class InvalidChecksum(MessageError, StringError):
+    "The checksum of the {string} message doesn't match its payload"
+
+class PayloadTooLarge(MessageError, NumberError):
+    "Message payloads are at most 32 MiB long, got {number} bytes"
+
+class MalformedPayload(MessageError, StringError):
+    "The payload of the {string} message can't be decoded"
+
+
+def checksum(payload):
+    return sha256(sha256(payload))[:4]
+
+
+def get_magic(network):
+    # Magic numbers are written big-endian, f9 be b4 d9 for livenet:
+    return encode_int(networks.find(network).magic, length = 4)
+
+
+def encode_message(message, network = networks.default):
+    payload = message.to_payload()
+    command = message.command.encode('ascii')
+
+    header = MESSAGE_HEADER.pack(get_magic(network), command, len(payload), checksum(payload))
+    return header + payload
+
+
+def decode_header(data, network = networks.default):
+    """
+    Parse the 24-byte header of a message. Returns its command (as a string),
+    payload length and checksum.
+    """
+    magic, command, length, expected = MESSAGE_HEADER.unpack(bytes(data))
+
+    if magic != get_magic(network):
+        raise InvalidMagic(magic)
+
+    if length > MAX_PAYLOAD:
+        raise PayloadTooLarge(length)
+
+    return command.rstrip(b'\0').decode('ascii', 'replace'), length, expected
+
+
+def decode_payload(command, payload, expected_checksum = None):
+    if expected_checksum is not None and checksum(payload) != expected_checksum:
+        raise InvalidChecksum(command)
+
+    message_class = MESSAGE_TYPES.get(command)
+
+    if message_class is None:
+        return UnknownMessage(command, bytes(payload))
+
+    try:
+        return message_class.from_buffer(Buffer(payload))
+    except BitforgeError as e:
+        raise MalformedPayload(command, cause = e)
+
+
+def decode_message(data, network = networks.default):
+    # Decode a whole message, as returned by encode_message():
+    command, length, expected = decode_header(data[:MESSAGE_HEADER.size], network)
+    payload = data[MESSAGE_HEADER.size:]
+
+    if len(payload) != length:
+        raise MalformedPayload(command)
+
+    return decode_payload(command, payload, expected)
+
+
+def read_var_bytes(buffer):
+    return bytes(buffer.read(buffer.read_varint()))
+
+
+def write_var_bytes(buffer, data):
+    buffer.write(encode_varint(len(data)))
+    buffer.write(data)
+
+
+def encode_uint(integer, length):
+    return encode_int(integer, length = length, big_endian = False)
+
+
+def decode_uint(buffer, length):
+    return decode_int(buffer.read(length), big_endian = False)
+
+
+BaseNetAddress = collections.namedtuple('NetAddress', ['services', 'ip', 'port'])
+
+class NetAddress(BaseNetAddress):
+    """
+    A node address as carried in version messages. `ip` is 16 bytes, IPv4
+    addresses are mapped into IPv6 (::ffff:a.b.c.d).
+    """
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, ipv4 = '0.0.0.0', port = 0, services = 0):
+        ip = b'\0' * 10 + b'\xff\xff' + bytes(bytearray(int(part) for part in ipv4.split('.')))
+        return cls(services, ip, port)
+
+    def to_bytes(self):
+        # Services (8 bytes), IP (16 bytes) and port, big-endian (2 bytes):
+        return encode_uint(self.services, 8) + self.ip + encode_int(self.port, length = 2)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        services = decode_uint(buffer, 8)
+        ip       = bytes(buffer.read(16))
+        port     = decode_int(buffer.read(2))
+
+        return cls(services, ip, port)
+
+
+BaseInvItem = collections.namedtuple('InvItem', ['type', 'hash'])
+
+class InvItem(BaseInvItem):
+    # `hash` is a transaction or block ID, in internal byte order:
+    __slots__ = ()
+
+    def to_bytes(self):
+        return encode_uint(self.type, 4) + self.hash
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        return cls(decode_uint(buffer, 4), bytes(buffer.read(32)))
+
+
+# Messages. Each has a `command`, to_payload() and from_buffer(), which reads
+# the payload from a Buffer:
+
+BaseVersion = collections.namedtuple('Version',
+    ['version', 'services', 'timestamp', 'receiver', 'sender', 'nonce', 'user_agent', 'start_height', 'relay']
+)
+
+class Version(BaseVersion):
+    __slots__ = ()
+    command = 'version'
+
+    @classmethod
+    def create(cls, timestamp, nonce, start_height = 0, receiver = None, sender = None,
+               services = 0, user_agent = USER_AGENT, relay = True, version = PROTOCOL_VERSION):
+        receiver = receiver or NetAddress.create()
+        sender   = sender or NetAddress.create()
+
+        return cls(version, services, timestamp, receiver, sender, nonce, user_agent, start_height, relay)
+
+    def to_payload(self):
+        buffer = Buffer()
+
+        buffer.write(encode_uint(self.version, 4))
+        buffer.write(encode_uint(self.services, 8))
+        buffer.write(encode_uint(self.timestamp, 8))
+        buffer.write(self.receiver.to_bytes())
+        buffer.write(self.sender.to_bytes())
+        buffer.write(encode_uint(self.nonce, 8))
+        write_var_bytes(buffer, self.user_agent)
+        buffer.write(encode_uint(self.start_height, 4))
+        buffer.write(chr(1 if self.relay else 0))
+
+        return bytes(buffer)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        version   = decode_uint(buffer, 4)
+        services  = decode_uint(buffer, 8)
+        timestamp = decode_uint(buffer, 8)
+        receiver  = NetAddress.from_buffer(buffer)
+        sender    = NetAddress.from_buffer(buffer)
+        nonce     = decode_uint(buffer, 8)
+        user_agent   = read_var_bytes(buffer)
+        start_height = decode_uint(buffer, 4)
+
+        # Peers older than BIP37 don't send the relay flag:
+        relay = bool(decode_uint(buffer, 1)) if len(buffer) else True
+
+        return cls(version, services, timestamp, receiver, sender, nonce, user_agent, start_height, relay)
+
+
+class EmptyMessage(tuple):
+    __slots__ = ()
+
+    def __new__(cls):
+        return super(EmptyMessage, cls).__new__(cls)
+
+    def __repr__(self):
+        return '%s()' % type(self).__name__
+
+    def to_payload(self):
+        return b''
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        return cls()
+
+
+class Verack(EmptyMessage):
+    __slots__ = ()
+    command = 'verack'
+
+
+class Ping(collections.namedtuple('Ping', ['nonce'])):
+    __slots__ = ()
+    command = 'ping'
+
+    def to_payload(self):
+        return encode_uint(self.nonce, 8)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        return cls(decode_uint(buffer, 8))
+
+
+class Pong(Ping):
+    __slots__ = ()
+    command = 'pong'
+
+
+class Inv(collections.namedtuple('Inv', ['items'])):
+    __slots__ = ()
+    command = 'inv'
+
+    class Error(BitforgeError):
+        pass
+
+    class TooManyItems(Error, NumberError):
+        "Inventory messages carry at most 50000 items, got {number}"
+
+    def __new__(cls, items):
+        items = tuple(items)
+
+        if len(items) > MAX_INV_ITEMS:
+            raise cls.TooManyItems(len(items))
+
+        return super(Inv, cls).__new__(cls, items)
+
+    def to_payload(self):
+        return encode_varint(len(self.items)) + b''.join(item.to_bytes() for item in self.items)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        count = buffer.read_varint()
+
+        if count > MAX_INV_ITEMS:
+            raise cls.TooManyItems(count)
+
+        return cls(InvItem.from_buffer(buffer) for i in range(count))
+
+
+class GetData(Inv):
+    __slots__ = ()
+    command = 'getdata'
+
+
+class NotFound(Inv):
+    __slots__ = ()
+    command = 'notfound'
+
+
+class TxMessage(collections.namedtuple('TxMessage', ['transaction'])):
+    __slots__ = ()
+    command = 'tx'
+
+    def to_payload(self):
+        return self.transaction.to_bytes()
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        return cls(Transaction.from_buffer(buffer))
+
+
+class GetHeaders(collections.namedtuple('GetHeaders', ['version', 'locator', 'stop_hash'])):
+    __slots__ = ()
+    command = 'getheaders'
+
+    def __new__(cls, locator, stop_hash = NULL_HASH, version = PROTOCOL_VERSION):
+        return super(GetHeaders, cls).__new__(cls, version, tuple(locator), stop_hash)
+
+    def to_payload(self):
+        return (
+            encode_uint(self.version, 4) +
+            encode_varint(len(self.locator)) + b''.join(self.locator) +
+            self.stop_hash
+        )
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        version = decode_uint(buffer, 4)
+        locator = [ bytes(buffer.read(32)) for i in range(buffer.read_varint()) ]
+
+        return cls(locator, bytes(buffer.read(32)), version)
+
+
+class Headers(collections.namedtuple('Headers', ['headers'])):
+    __slots__ = ()
+    command = 'headers'
+
+    def __new__(cls, headers):
+        return super(Headers, cls).__new__(cls, tuple(headers))
+
+    def to_payload(self):
+        # Each header is followed by a transaction count, always 0:
+        return encode_varint(len(self.headers)) + b''.join(h.to_bytes() + b'\0' for h in self.headers)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        headers = []
+
+        for i in range(buffer.read_varint()):
+            headers.append(BlockHeader.from_bytes(bytes(buffer.read(HEADER_SIZE))))
+            buffer.read_varint()
+
+        return cls(headers)
+
+
+class BlockMessage(collections.namedtuple('BlockMessage', ['header', 'transactions'])):
+    __slots__ = ()
+    command = 'block'
+
+    def __new__(cls, header, transactions):
+        return super(BlockMessage, cls).__new__(cls, header, tuple(transactions))
+
+    def to_payload(self):
+        return (
+            self.header.to_bytes() +
+            encode_varint(len(self.transactions)) + b''.join(tx.to_bytes() for tx in self.transactions)
+        )
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        header = BlockHeader.from_bytes(bytes(buffer.read(HEADER_SIZE)))
+        transactions = [ Transaction.from_buffer(buffer) for i in range(buffer.read_varint()) ]
+
+        return cls(header, transactions)
+
+
+class FilterLoad(collections.namedtuple('FilterLoad', ['filter'])):
+    __slots__ = ()
+    command = 'filterload'
+
+    def to_payload(self):
+        return self.filter.to_bytes()
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        return cls(BloomFilter.from_buffer(buffer))
+
+
+class MerkleBlock(collections.namedtuple('MerkleBlock', ['header', 'tree'])):
+    # A block header, with a PartialMerkleTree of the transactions that
+    # matched our filter:
+    __slots__ = ()
+    command = 'merkleblock'
+
+    def to_payload(self):
+        return self.header.to_bytes() + self.tree.to_bytes()
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        header = BlockHeader.from_bytes(bytes(buffer.read(HEADER_SIZE)))
+        return cls(header, PartialMerkleTree.from_buffer(buffer))
+
+
+class UnknownMessage(collections.namedtuple('UnknownMessage', ['command', 'payload'])):
+    # Messages we don't decode, kept raw so they can be inspected or ignored:
+    __slots__ = ()
+
+    def to_payload(self):
+        return self.payload
+
+
+MESSAGE_TYPES = dict((cls.command, cls) for cls in [
+    Version, Verack, Ping, Pong, Inv, GetData, NotFound, TxMessage, GetHeaders, Headers, BlockMessage,
+    FilterLoad, MerkleBlock
+])
@@ -0,0 +1,377 @@
+"""
+Peer connections over asyncio (Python 3.7+). A Peer wraps one stream after the
+version handshake, a PeerPool ingests transactions announced by many of them.
+"""
+from __future__ import unicode_literals
+import asyncio
+import random
+import time
+
+from bitforge import networks
+from bitforge.errors import *
+from bitforge.tools import LRUCache
+
+from .messages import *
+
+
+HANDSHAKE_TIMEOUT = 10  # seconds
+REQUEST_TIMEOUT   = 60  # seconds for a peer to answer a getdata, before asking another
+STREAM_LIMIT  = 4 * 1024 * 1024 # bytes buffered per connection before reading pauses
+MAX_IN_FLIGHT = 1000    # getdata items requested from a peer and not yet received
+SEEN_CAPACITY = 200000  # transaction IDs remembered, so each is fetched once
+
+
+class Peer(object):
+    """
+    A connection to a node that completed the version handshake. Messages are
+    read by run(), which answers pings, resolves get_data() requests and hands
+    everything else to a handler. Reading waits for the handler, so a slow
+    consumer stops reading from the socket instead of buffering.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class HandshakeFailed(Error, StringError):
+        "The handshake with {string} failed"
+
+    class Disconnected(Error, StringError):
+        "The connection to {string} was closed"
+
+    class RequestTimeout(Error, StringError):
+        "The peer {string} didn't answer a getdata in time"
+
+
+    def __init__(self, reader, writer, network = networks.default):
+        self.reader  = reader
+        self.writer  = writer
+        self.network = networks.find(network)
+        self.version = None # their Version message
+        self.pending = {}   # InvItem -> Future, for get_data()
+        self.closed  = False
+
+        peername  = writer.get_extra_info('peername')
+        self.name = '%s:%s' % peername[:2] if peername else 'peer'
+
+    def __repr__(self):
+        return '<Peer %s>' % self.name
+
+    async def send(self, message):
+        if self.closed:
+            raise Peer.Disconnected(self.name)
+
+        self.writer.write(encode_message(message, self.network))
+
+        # Wait while the transport's write buffer is full:
+        await self.writer.drain()
+
+    async def receive(self):
+        try:
+            header = await self.reader.readexactly(MESSAGE_HEADER.size)
+            command, length, expected = decode_header(header, self.network)
+            payload = await self.reader.readexactly(length)
+
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            self.close()
+            raise Peer.Disconnected(self.name, cause = e)
+
+        return decode_payload(command, payload, expected)
+
+    async def handshake(self, start_height = 0, services = 0, timeout = HANDSHAKE_TIMEOUT):
+        """
+        Exchange version and verack messages. Both ends send their version
+        right away, so the same method works for outgoing and incoming peers.
+        """
+        try:
+            await asyncio.wait_for(self.exchange_versions(start_height, services), timeout)
+        except (asyncio.TimeoutError, Peer.Disconnected, MessageError) as e:
+            self.close()
+            raise Peer.HandshakeFailed(self.name, cause = e)
+
+    async def exchange_versions(self, start_height, services):
+        await self.send(Version.create(
+            timestamp    = int(time.time()),
+            nonce        = random.getrandbits(64),
+            start_height = start_height,
+            services     = services
+        ))
+
+        verack = False
+
+        while self.version is None or not verack:
+            message = await self.receive()
+
+            if isinstance(message, Version) and self.version is None:
+                self.version = message
+                await self.send(Verack())
+
+            elif isinstance(message, Verack):
+                verack = True
+
+    async def get_data(self, items, timeout = REQUEST_TIMEOUT):
+        """
+        Request `items` (InvItems) in a single getdata, and wait for them. Must
+        be called while run() is reading. Returns the TxMessages and
+        BlockMessages received, in the order of `items`, with None for the
+        ones the peer didn't have. Raises RequestTimeout if they don't all
+        arrive within `timeout` seconds.
+        """
+        loop    = asyncio.get_running_loop()
+        futures = []
+
+        for item in items:
+            future = self.pending.get(item)
+
+            if future is None:
+                future = self.pending[item] = loop.create_future()
+
+            futures.append(future)
+
+        await self.send(GetData(items))
+
+        if not futures:
+            return []
+
+        done, waiting = await asyncio.wait(futures, timeout = timeout)
+
+        # Items still missing are given up, for every caller waiting on them:
+        for item, future in zip(items, futures):
+            if future in waiting and self.pending.get(item) is future:
+                del self.pending[item]
+                future.set_exception(Peer.RequestTimeout(self.name))
+
+        return [ future.result() for future in futures ]
+
+    async def run(self, handler = None):
+        """
+        Read messages until the connection closes. Messages not answering
+        get_data() and pings are passed to `await handler(peer, message)`.
+        """
+        try:
+            while True:
+                message = await self.receive()
+
+                if isinstance(message, Ping):
+                    await self.send(Pong(message.nonce))
+                    continue
+
+                if self.pending and self.resolve(message):
+                    continue
+
+                if handler is not None:
+                    await handler(self, message)
+
+        except Peer.Disconnected:
+            pass
+
+        finally:
+            self.close()
+
+    def resolve(self, message):
+        # Complete pending get_data() futures. True if the message was consumed:
+        if isinstance(message, TxMessage):
+            future = self.pending.pop(InvItem(MSG_TX, message.transaction.get_id_bytes()), None)
+
+        elif isinstance(message, BlockMessage):
+            future = self.pending.pop(InvItem(MSG_BLOCK, message.header.get_id_bytes()), None)
+
+        elif isinstance(message, NotFound):
+            missing = [ item for item in message.items if item in self.pending ]
+
+            for item in missing:
+                self.pending.pop(item).set_result(None)
+
+            return len(missing) == len(message.items)
+
+        else:
+            return False
+
+        if future is None:
+            return False
+
+        future.set_result(message)
+        return True
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+        self.writer.close()
+
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(Peer.Disconnected(self.name))
+
+        self.pending.clear()
+
+
+async def connect(host, port = None, network = networks.default, start_height = 0, limit = STREAM_LIMIT):
+    network = networks.find(network)
+    reader, writer = await asyncio.open_connection(host, port or network.port, limit = limit)
+
+    peer = Peer(reader, writer, network)
+    await peer.handshake(start_height)
+
+    return peer
+
+
+class PeerPool(object):
+    """
+    Connections to several peers, fetching every transaction they announce
+    into a single queue, which get() reads from.
+
+    Requests are pipelined: each peer gets getdata messages for up to
+    `max_in_flight` announced transactions, topped up as they arrive rather
+    than after each batch completes. When the queue holds `queue_size`
+    transactions, peers wait to put theirs and stop reading, so the kernel
+    applies TCP backpressure instead of memory filling up.
+
+    Transactions not delivered within `request_timeout` seconds of their
+    getdata are requested from the least busy other peer instead. A late
+    delivery from the first peer is then ignored, so nothing is queued twice.
+    """
+
+    def __init__(self, network = networks.default, queue_size = 10000, max_in_flight = MAX_IN_FLIGHT,
+                 request_timeout = REQUEST_TIMEOUT):
+        self.network         = networks.find(network)
+        self.max_in_flight   = max_in_flight
+        self.request_timeout = request_timeout
+        self.transactions    = asyncio.Queue(queue_size)
+        self.seen            = LRUCache(SEEN_CAPACITY)
+        self.peers           = {} # Peer -> running task
+        self.wanted          = {} # Peer -> announced transaction IDs, not requested yet
+        self.in_flight       = {} # Peer -> requested transaction IDs -> deadline, in request order
+        self.expiry          = None # task running expire()
+
+    def __len__(self):
+        return len(self.peers)
+
+    async def connect(self, host, port = None):
+        peer = await connect(host, port, self.network)
+        self.add(peer)
+        return peer
+
+    def add(self, peer):
+        self.wanted[peer]    = []
+        self.in_flight[peer] = {}
+        self.peers[peer]     = asyncio.ensure_future(self.run(peer))
+
+        if self.expiry is None:
+            self.expiry = asyncio.ensure_future(self.expire())
+
+    async def run(self, peer):
+        try:
+            await peer.run(self.handle)
+        except MessageError:
+            pass # a misbehaving peer is dropped, like a disconnected one
+        finally:
+            # Transactions this peer didn't deliver can be fetched from others:
+            for hash in self.wanted.pop(peer, []) + list(self.in_flight.pop(peer, ())):
+                self.seen.pop(hash)
+
+            self.peers.pop(peer, None)
+
+    async def handle(self, peer, message):
+        if isinstance(message, Inv):
+            wanted = self.wanted[peer]
+
+            for item in message.items:
+                if item.type == MSG_TX and item.hash not in self.seen:
+                    self.seen.put(item.hash, True)
+                    wanted.append(item.hash)
+
+            await self.request_more(peer)
+
+        elif isinstance(message, TxMessage):
+            # Unrequested, or requested again from another peer after a timeout:
+            if self.in_flight[peer].pop(message.transaction.get_id_bytes(), None) is None:
+                return
+
+            # Blocks this peer's reading while the queue is full:
+            await self.transactions.put(message.transaction)
+            await self.request_more(peer)
+
+        elif isinstance(message, NotFound):
+            for item in message.items:
+                self.in_flight[peer].pop(item.hash, None)
+
+            await self.request_more(peer)
+
+    async def request_more(self, peer):
+        wanted    = self.wanted[peer]
+        in_flight = self.in_flight[peer]
+        count     = min(len(wanted), self.max_in_flight - len(in_flight))
+
+        if count <= 0:
+            return
+
+        hashes = wanted[:count]
+        del wanted[:count]
+
+        deadline = asyncio.get_running_loop().time() + self.request_timeout
+
+        for hash in hashes:
+            in_flight[hash] = deadline
+
+        await peer.send(GetData(InvItem(MSG_TX, hash) for hash in hashes))
+
+    async def expire(self):
+        # Move overdue requests to other peers, checking a few times per timeout:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await asyncio.sleep(self.request_timeout / 4)
+            now = loop.time()
+
+            for peer, in_flight in list(self.in_flight.items()):
+                # Deadlines grow in request order, so the overdue ones come first:
+                overdue = []
+
+                for hash, deadline in in_flight.items():
+                    if deadline > now:
+                        break
+
+                    overdue.append(hash)
+
+                for hash in overdue:
+                    del in_flight[hash]
+
+                if overdue:
+                    await self.reassign(peer, overdue)
+
+    async def reassign(self, peer, hashes):
+        others = [ other for other in self.in_flight if other is not peer and not other.closed ]
+        topped = [ peer ] # its window has room again, for the rest of what it announced
+
+        if others:
+            other = min(others, key = lambda other: len(self.wanted[other]) + len(self.in_flight[other]))
+            self.wanted[other].extend(hashes)
+            topped.append(other)
+        else:
+            # Nobody else to ask, a later announcement can fetch them again:
+            for hash in hashes:
+                self.seen.pop(hash)
+
+        for target in topped:
+            if target not in self.wanted:
+                continue # disconnected while we were busy
+
+            try:
+                await self.request_more(target)
+            except (Peer.Disconnected, ConnectionError):
+                pass # run() hands its transactions back to `seen`
+
+    async def get(self):
+        return await self.transactions.get()
+
+    async def close(self):
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+
+        for peer in list(self.peers):
+            peer.close()
+
+        if self.peers:
+            await asyncio.wait(list(self.peers.values()))
@@ -0,0 +1,93 @@
+"""
+An in-process node for tests and benchmarks, listening on localhost. It
+completes the handshake, announces its transactions and serves getdata (unless
+it's told not to `respond`, to test timeouts).
+"""
+from __future__ import unicode_literals
+import asyncio
+import collections
+
+from bitforge import networks
+
+from .messages import *
+from .peer import Peer
+
+
+class FakePeer(object):
+
+    def __init__(self, transactions = (), network = networks.default, announce = True, respond = True):
+        self.network      = networks.find(network)
+        self.transactions = collections.OrderedDict((tx.get_id_bytes(), tx) for tx in transactions)
+        self.announce     = announce
+        self.respond      = respond
+        self.server       = None
+        self.peers        = []
+        self.finished     = [] # a Future per connection, done when it's closed
+        self.requests     = [] # GetData messages received, to check pipelining
+        self.received     = [] # other messages received
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def start(self, host = '127.0.0.1', port = 0):
+        self.server = await asyncio.start_server(self.accept, host, port)
+        return self
+
+    async def accept(self, reader, writer):
+        peer = Peer(reader, writer, self.network)
+        finished = asyncio.get_running_loop().create_future()
+
+        self.peers.append(peer)
+        self.finished.append(finished)
+
+        try:
+            await self.serve(peer)
+        except (Peer.HandshakeFailed, Peer.Disconnected):
+            pass
+        finally:
+            finished.set_result(None)
+
+    async def serve(self, peer):
+        await peer.handshake()
+
+        if self.announce:
+            hashes = list(self.transactions)
+
+            for i in range(0, len(hashes), MAX_INV_ITEMS):
+                await peer.send(Inv(InvItem(MSG_TX, hash) for hash in hashes[i : i + MAX_INV_ITEMS]))
+
+        await peer.run(self.handle)
+
+    async def handle(self, peer, message):
+        if isinstance(message, GetData):
+            self.requests.append(message)
+            missing = []
+
+            if not self.respond:
+                return
+
+            for item in message.items:
+                tx = self.transactions.get(item.hash) if item.type == MSG_TX else None
+
+                if tx is None:
+                    missing.append(item)
+                else:
+                    await peer.send(TxMessage(tx))
+
+            if missing:
+                await peer.send(NotFound(missing))
+
+        else:
+            self.received.append(message)
+
+    async def close(self):
+        for peer in self.peers:
+            peer.close()
+
+        if self.finished:
+            await asyncio.wait(self.finished)
+
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
@@ -2,7 +2,7 @@ from __future__ import unicode_literals
 import collections
 import random
 
-from . import networks, utils, ecdsa
+from . import networks, utils
 from .errors import *
 from .pubkey import PublicKey
 from .address import Address
@@ -17,6 +17,13 @@ def random_secret():
     return rng.randint(1, KEY_MAX - 1)
 
 
+def load_ecdsa():
+    # The ecdsa package is slow to import and only needed to sign and verify,
+    # so it's loaded on first use rather than with bitforge:
+    import ecdsa
+    return ecdsa
+
+
 def find_network(value, attr = 'name'):
     try:
         return networks.find(value, attr)
@@ -29,6 +36,7 @@ BasePrivateKey = collections.namedtuple('PrivateKey',
 )
 
 class PrivateKey(BasePrivateKey):
+    __slots__ = () # no per-instance __dict__, the namedtuple fields are all there is
 
     class Error(BitforgeError):
         pass
@@ -56,7 +64,8 @@ class PrivateKey(BasePrivateKey):
 
 
     def __new__(cls, secret = None, network = networks.default, compressed = True):
-        network = find_network(network)
+        if not isinstance(network, networks.Network):
+            network = find_network(network)
 
         if secret is None:
             secret = random_secret()
@@ -128,14 +137,20 @@ class PrivateKey(BasePrivateKey):
         return Address.from_public_key(self.to_public_key())
 
     def sign(self, message):
+        ecdsa       = load_ecdsa()
         signing_key = ecdsa.SigningKey.from_secret_exponent(self.secret, curve = ecdsa.SECP256k1)
         return signing_key.sign_digest(message, sigencode = ecdsa.util.sigencode_der_canonize)
 
     def verify(self, signature, message):
+        ecdsa         = load_ecdsa()
         signing_key   = ecdsa.SigningKey.from_secret_exponent(self.secret, curve = ecdsa.SECP256k1)
         verifying_key = signing_key.get_verifying_key()
 
         return verifying_key.verify(signature, message, sigdecode = ecdsa.util.sigdecode_der)
 
+    def __hash__(self):
+        # Networks hold a list of seeds and can't be hashed, use their unique name:
+        return hash((self.secret, self.network.name, self.compressed))
+
     def __repr__(self):
         return "<PrivateKey: %s, network: %s>" % (self.to_hex(), self.network.name)
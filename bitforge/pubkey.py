@@ -5,9 +5,18 @@ from . import networks, utils
 from .address import Address
 from .encoding import *
 from .errors import *
+from .tools import LRUCache
 from .utils.secp256k1 import generator_secp256k1
 
 
+# Decoded points, keyed by SEC bytes. Keys are decoded again and again when
+# they're reused (multisig scripts, the Interpreter checking signatures), and
+# decompressing one costs a modular exponentiation:
+CACHE_SIZE = 10000
+
+_cache = LRUCache(CACHE_SIZE)
+
+
 def find_network(value, attr = 'name'):
     try:
         return networks.find(value, attr)
@@ -20,6 +29,7 @@ BasePublicKey = collections.namedtuple('PublicKey',
 )
 
 class PublicKey(BasePublicKey):
+    __slots__ = ()
 
     class Error(BitforgeError):
         pass
@@ -38,31 +48,55 @@ class PublicKey(BasePublicKey):
 
 
     def __new__(cls, pair, network = networks.default, compressed = True):
-        network = find_network(network) # may raise UnknownNetwork
+        if not isinstance(network, networks.Network):
+            network = find_network(network) # may raise UnknownNetwork
 
         if not utils.ecdsa.is_public_pair_valid(generator_secp256k1, pair):
             raise PublicKey.InvalidPair(pair)
 
         return super(PublicKey, cls).__new__(cls, pair, network, compressed)
 
+    @staticmethod
+    def trusted(pair, network = networks.default, compressed = True):
+        # For pairs known to be on the curve, computed from valid points or
+        # validated before. Anything else must go through the constructor:
+        if not isinstance(network, networks.Network):
+            network = find_network(network)
+
+        return BasePublicKey.__new__(PublicKey, pair, network, compressed)
+
     @staticmethod
     def from_private_key(privkey):
         pair = utils.public_pair_for_secret_exponent(
             utils.generator_secp256k1, privkey.secret
         )
 
-        # The constructor will validate the pair
-        return PublicKey(pair, privkey.network, privkey.compressed)
+        # A multiple of the generator is on the curve:
+        return PublicKey.trusted(pair, privkey.network, privkey.compressed)
 
     @staticmethod
     def from_bytes(bytes, network = networks.default):
+        key  = b'' + bytes # hashable, even from a bytearray
+        pair = _cache.get(key)
+        compressed = utils.encoding.is_sec_compressed(key)
+
+        if pair is not None:
+            return PublicKey.trusted(pair, network, compressed)
+
         try:
-            pair       = utils.encoding.sec_to_public_pair(bytes)
-            compressed = utils.encoding.is_sec_compressed(bytes)
+            pair = utils.encoding.sec_to_public_pair(key)
         except (utils.encoding.EncodingError, ValueError):
             raise PublicKey.InvalidBinary(bytes)
 
-        return PublicKey(pair, network, compressed)
+        # Only pairs the constructor accepted are cached:
+        pubkey = PublicKey(pair, network, compressed)
+        _cache.put(key, pair)
+
+        return pubkey
+
+    @staticmethod
+    def clear_cache():
+        _cache.clear()
 
     @staticmethod
     def from_hex(string, network = networks.default):
@@ -83,5 +117,9 @@ class PublicKey(BasePublicKey):
     def to_address(self):
         return Address.from_public_key(self)
 
+    def __hash__(self):
+        # Networks hold a list of seeds and can't be hashed, use their unique name:
+        return hash((self.pair, self.network.name, self.compressed))
+
     def __repr__(self):
         return "<PublicKey: %s, network: %s>" % (self.to_hex(), self.network.name)
@@ -1,4 +1,5 @@
 from .script import Script, PayToPubkeyIn, PayToPubkeyOut, PayToScriptIn, PayToScriptOut, RedeemMultisig, OpReturnOut
 from .opcode import Opcode
 from .instruction import Instruction
+from .bytecode import Bytecode
 from .interpreter import Interpreter
@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+import array
+import collections
+
+from bitforge.errors import *
+from bitforge.tools import Buffer, LRUCache
+
+from .opcode import *
+
+
+# Compiled scripts are shared by every Interpreter in the process, keyed by the
+# serialized script. Output scripts are reused across many spends, so most
+# lookups hit:
+CACHE_SIZE = 10000
+
+_cache = LRUCache(CACHE_SIZE)
+
+
+BaseBytecode = collections.namedtuple('Bytecode',
+    ['bytes', 'opcodes', 'positions', 'offsets', 'lengths']
+)
+
+
+class Bytecode(BaseBytecode):
+    """
+    A Script decoded once into flat arrays, ready for the Interpreter to run.
+
+    For the instruction at index `pc`, `opcodes[pc]` is the opcode number,
+    `positions[pc]` is the offset of the opcode byte in `bytes`, and the data it
+    pushes (if any) is `bytes[offsets[pc] : offsets[pc] + lengths[pc]]`.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    @staticmethod
+    def for_script(script):
+        return Bytecode.for_bytes(script.to_bytes())
+
+    @staticmethod
+    def for_bytes(raw):
+        code = _cache.get(bytes(raw))
+
+        if code is None:
+            code = Bytecode.from_bytes(raw)
+            _cache.put(code.bytes, code)
+
+        return code
+
+    @staticmethod
+    def from_bytes(raw):
+        raw  = bytes(raw)
+        view = bytearray(raw)
+        end  = len(view)
+
+        opcodes   = array.array('B')
+        positions = array.array('L')
+        offsets   = array.array('L')
+        lengths   = array.array('L')
+
+        i = 0
+        while i < end:
+            number = view[i]
+            positions.append(i)
+            i += 1
+
+            if 1 <= number <= 75:
+                length = number
+
+            elif number == 76: # OP_PUSHDATA1
+                Bytecode.ensure_available(end - i, 1)
+                length = view[i]
+                i += 1
+
+            elif number == 77: # OP_PUSHDATA2
+                Bytecode.ensure_available(end - i, 2)
+                length = view[i] | view[i + 1] << 8
+                i += 2
+
+            elif number == 78: # OP_PUSHDATA4
+                Bytecode.ensure_available(end - i, 4)
+                length = view[i] | view[i + 1] << 8 | view[i + 2] << 16 | view[i + 3] << 24
+                i += 4
+
+            else:
+                length = 0
+
+            Bytecode.ensure_available(end - i, length)
+
+            opcodes.append(number)
+            offsets.append(i)
+            lengths.append(length)
+            i += length
+
+        return Bytecode(raw, opcodes, positions, offsets, lengths)
+
+    @staticmethod
+    def ensure_available(remaining, requested):
+        # Same failure Script.from_bytes() reports for a truncated push:
+        if remaining < requested:
+            raise Buffer.InsufficientData(remaining, requested)
+
+    @staticmethod
+    def clear_cache():
+        _cache.clear()
+
+    def size(self):
+        return len(self.opcodes)
+
+    def get_opcode(self, pc):
+        return Opcode(self.opcodes[pc])
+
+    def get_data(self, pc):
+        offset = self.offsets[pc]
+        return self.bytes[offset : offset + self.lengths[pc]]
+
+    def get_subscript_bytes(self, pc):
+        # Serialized script from instruction `pc` (inclusive) to the end:
+        if pc >= len(self.positions):
+            return b''
+
+        return self.bytes[self.positions[pc]:]
+
+    def is_minimal_push(self, pc):
+        """
+        Comes from bitcoind's script interpreter CheckMinimalPush function.
+        Returns if the instruction is the smallest way to push that particular data.
+        """
+        number = self.opcodes[pc]
+        length = self.lengths[pc]
+
+        if length == 0:
+            # Could have used OP_0.
+            return number == OP_0.number
+
+        first = bytearray(self.get_data(pc))[0]
+
+        if length == 1 and 1 <= first <= 16:
+            # Could have used OP_1 .. OP_16
+            return number == OP_1.number + first - 1
+        elif length == 1 and first == 0x81:
+            # Could have used OP_1NEGATE
+            return number == OP_1NEGATE.number
+        elif length <= 75:
+            # Could have used a direct push.
+            return number == length
+        elif length <= 255:
+            # Could have used OP_PUSHDATA1.
+            return number == OP_PUSHDATA1.number
+        elif length <= 65535:
+            # Could have used OP_PUSHDATA2.
+            return number == OP_PUSHDATA2.number
+
+        return True
+
+    def __repr__(self):
+        return "<Bytecode: %d instructions, %d bytes>" % (self.size(), len(self.bytes))
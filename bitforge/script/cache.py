@@ -0,0 +1,45 @@
+from __future__ import unicode_literals
+
+from bitforge.encoding import encode_int, sha256
+from bitforge.tools import LRUCache
+
+
+class VerificationCache(object):
+    """
+    A bounded record of successful script verifications, so replayed validation
+    of the same spend (after a reorg, re-accepting mempool transactions, repeated
+    API checks) can skip execution.
+
+    Entries are keyed by (txid, input index, scriptSig hash, prevout script
+    hash, flags), folded into a single 32-byte digest. The scriptSig is part
+    of the key because verify() runs the one it's given, which needn't be the
+    one in the transaction. At most `capacity` entries are kept, least
+    recently used ones are evicted first. Failures are never cached.
+    """
+
+    def __init__(self, capacity = 100000):
+        self.entries = LRUCache(capacity)
+
+    @staticmethod
+    def key_for(tx_id, nin, script_sig, script_pubkey, flags):
+        # `tx_id` as get_id_bytes() returns it, callers verifying several inputs
+        # compute it once, it serializes the whole transaction:
+        return sha256(
+            tx_id +
+            encode_int(nin, length = 4, big_endian = False) +
+            sha256(script_sig.to_bytes()) +
+            sha256(script_pubkey.to_bytes()) +
+            encode_int(flags, length = 4, big_endian = False)
+        )
+
+    def contains(self, key):
+        return self.entries.get(key) is not None
+
+    def add(self, key):
+        self.entries.put(key, True)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -11,6 +11,7 @@ BaseInstruction = collections.namedtuple('BaseInstruction', ['opcode', 'data'])
 
 
 class Instruction(BaseInstruction):
+    __slots__ = ()
 
     class Error(BitforgeError):
         pass
@@ -95,14 +96,26 @@ class Instruction(BaseInstruction):
 
             length_bytes = encode_int(
                 len(self.data),
+                length = length_nbytes,
                 big_endian = False
-            ).rjust(length_nbytes, '\0')
+            )
 
             return opcode_byte + length_bytes + self.data
 
         else:
             return opcode_byte
 
+    def size(self):
+        # Same as len(self.to_bytes()), without building the bytes:
+        number = self.opcode.number
+
+        if 1 <= number <= 75:
+            return 1 + number
+        elif 76 <= number <= 78: # OP_PUSHDATA1, OP_PUSHDATA2, OP_PUSHDATA4
+            return 1 + (1, 2, 4)[number - 76] + len(self.data)
+        else:
+            return 1
+
     def to_hex(self):
         return encode_hex(self.to_bytes()).decode('utf-8')
 
@@ -119,12 +132,6 @@ class Instruction(BaseInstruction):
         else:
             return self.opcode.name
 
-    def __eq__(self, other):
-        return self.opcode == other.opcode and self.data == other.data
-
-    def __hash__(self):
-        return hash((self.opcode, self.data))
-
     def __repr__(self):
         if self.opcode.is_push():
             return "<Instruction: %s '%s'>" % (self.opcode.name, encode_hex(self.data))
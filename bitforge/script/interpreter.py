@@ -1,9 +1,10 @@
 from __future__ import unicode_literals
+from timeit import default_timer as timer
 
 from bitforge.errors import BitforgeError
-from bitforge.transaction import Transaction, Input, Output
 from bitforge.tools import Buffer
 from bitforge.script import Script
+from bitforge.script.cache import VerificationCache
 
 from bitforge.encoding import encode_script_number, decode_script_number
 from bitforge.encoding import sha1, ripemd160, sha256, hash160
@@ -11,9 +12,23 @@ from bitforge.encoding import sha1, ripemd160, sha256, hash160
 from .opcode import *
 
 
+def placeholder_transaction():
+    # Imported here, since bitforge.transaction depends on this package:
+    from bitforge.transaction import Transaction, Input, Output
+    return Transaction([ Input('', 0, Script()) ], [ Output(0, Script()) ])
+
+
 class Interpreter(object):
 
-    def __init__(self):
+    def __init__(self, tracer = None, cache = None):
+        # Optional callable invoked after every step, with the signature
+        # tracer(pc, opcode, stack_depth, elapsed_seconds). See script.tracer.
+        self.tracer = tracer
+
+        # Optional VerificationCache (see script.cache), consulted by verify()
+        # when a transaction is given. May be shared by many Interpreters.
+        self.cache = cache
+
         self.initialize()
 
     def initialize(self):
@@ -25,6 +40,7 @@ class Interpreter(object):
         self.vf_exec = []
         self.errstr = ''
         self.flags = 0
+        self.code = None
 
     def verify(self, script_sig, script_pubkey, tx = None, nin = 0, flags = 0):
         """
@@ -41,9 +57,58 @@ class Interpreter(object):
 
         Translated from bitcoind's VerifyScript
         """
+        tx_id = tx.get_id_bytes() if self.cache is not None and tx is not None else None
+        return self.verify_input(script_sig, script_pubkey, tx, tx_id, nin, flags)
+
+    def verify_input(self, script_sig, script_pubkey, tx, tx_id, nin, flags):
+        # verify(), given the ID of `tx` when there's a cache to look it up in:
+        if tx is not None and not 0 <= nin < len(tx.inputs):
+            raise ValueError("Input index %d out of range, the transaction has %d inputs" % (nin, len(tx.inputs)))
+
+        # Without a real transaction there's no txid to identify the spend:
+        if self.cache is None or tx is None:
+            return self.execute(script_sig, script_pubkey, tx, nin, flags)
+
+        key = VerificationCache.key_for(tx_id, nin, script_sig, script_pubkey, flags)
+
+        if self.cache.contains(key):
+            self.initialize() # nothing left over from the previous run
+            return True
+
+        verified = self.execute(script_sig, script_pubkey, tx, nin, flags)
+
+        if verified:
+            self.cache.add(key)
+
+        return verified
+
+    def verify_transaction(self, tx, script_pubkeys, flags = 0):
+        """
+        Verifies every Input of a Transaction, returning true if all are valid.
+
+        :param tx: the transaction whose inputs are verified
+        :param script_pubkeys: the scriptPubkey of the output spent by each input, in order
+        :param flags: evaluation flags. See Interpreter.SCRIPT_* constants
+        """
+        if len(script_pubkeys) != len(tx.inputs):
+            raise ValueError("Expected %d scriptPubkeys, got %d" % (len(tx.inputs), len(script_pubkeys)))
+
+        # Serializing the transaction for its ID once, not for every input:
+        tx_id = tx.get_id_bytes() if self.cache is not None else None
+
+        for nin, (input, script_pubkey) in enumerate(zip(tx.inputs, script_pubkeys)):
+            if not self.verify_input(input.script, script_pubkey, tx, tx_id, nin, flags):
+                return False
+
+        return True
+
+    def execute(self, script_sig, script_pubkey, tx = None, nin = 0, flags = 0):
+        """
+        Same as verify(), bypassing the cache.
+        """
         self.initialize()
         self.script = script_sig
-        self.tx = tx or Transaction([ Input('', 0, Script()) ], [ Output(0, Script()) ])
+        self.tx = tx or placeholder_transaction()
         self.nin = nin
         self.flags = flags
 
@@ -62,7 +127,7 @@ class Interpreter(object):
         self.initialize()
         self.script = script_pubkey
         self.stack = stack
-        self.tx = tx or Transaction([ Input('', 0, Script()) ], [ Output(0, Script()) ])
+        self.tx = tx or placeholder_transaction()
         self.nin = nin or 0
         self.flags = flags or 0
 
@@ -99,7 +164,7 @@ class Interpreter(object):
             self.initialize()
             self.script = redeem_script
             self.stack = stack_copy
-            self.tx = tx or Transaction([ Input('', 0, Script()) ], [ Output(0, Script()) ])
+            self.tx = tx or placeholder_transaction()
             self.nin = nin or 0
             self.flags = flags or 0
 
@@ -123,13 +188,18 @@ class Interpreter(object):
         Interpreter.step()
         bitcoind commit: b5d1b1092998bc95313856d535c632ea5a8f9104
         """
-        if len(self.script.to_bytes()) > 10000:
+        self.code = self.script.to_bytecode()
+
+        if len(self.code.bytes) > 10000:
             self.errstr = 'SCRIPT_ERR_SCRIPT_SIZE'
             return False
 
         try:
-            while self.pc < len(self.script.instructions):
-                if not self.step():
+            end = self.code.size()
+            step = self.step if self.tracer is None else self.traced_step
+
+            while self.pc < end:
+                if not step():
                     return False
 
             if len(self.stack) + len(self.altstack) > 1000:
@@ -146,6 +216,17 @@ class Interpreter(object):
 
         return True
 
+    def traced_step(self):
+        pc = self.pc
+        opcode = self.code.get_opcode(pc)
+
+        start = timer()
+        result = self.step()
+        elapsed = timer() - start
+
+        self.tracer(pc, opcode, len(self.stack), elapsed)
+        return result
+
     def step(self):
         """
         Based on the inner loop of bitcoind's EvalScript function
@@ -154,61 +235,63 @@ class Interpreter(object):
         f_required_minimal = self.flags & Interpreter.SCRIPT_VERIFY_MINIMALDATA
 
         f_exec = False not in self.vf_exec
-        instruction = self.script.instructions[self.pc]
+        pc = self.pc
+        opcode = self.code.get_opcode(pc)
+        data_length = self.code.lengths[pc]
         self.pc += 1
 
-        if instruction.data and len(instruction.data) > Interpreter.MAX_SCRIPT_ELEMENT_SIZE:
+        if data_length > Interpreter.MAX_SCRIPT_ELEMENT_SIZE:
             self.errstr = 'SCRIPT_ERR_PUSH_SIZE'
             return False
 
         # Note how Opcode.OP_RESERVED does not count towards the opcode limit.
-        if instruction.opcode > OP_16:
+        if opcode > OP_16:
             self.nop_count += 1  # TODO: use itertools.count
             if self.nop_count > 201:
                 self.errstr = 'SCRIPT_ERR_OP_COUNT'
                 return False
 
-        if (instruction.opcode == OP_CAT or
-            instruction.opcode == OP_SUBSTR or
-            instruction.opcode == OP_LEFT or
-            instruction.opcode == OP_RIGHT or
-            instruction.opcode == OP_INVERT or
-            instruction.opcode == OP_AND or
-            instruction.opcode == OP_OR or
-            instruction.opcode == OP_XOR or
-            instruction.opcode == OP_2MUL or
-            instruction.opcode == OP_2DIV or
-            instruction.opcode == OP_MUL or
-            instruction.opcode == OP_DIV or
-            instruction.opcode == OP_MOD or
-            instruction.opcode == OP_LSHIFT or
-            instruction.opcode == OP_RSHIFT):
+        if (opcode == OP_CAT or
+            opcode == OP_SUBSTR or
+            opcode == OP_LEFT or
+            opcode == OP_RIGHT or
+            opcode == OP_INVERT or
+            opcode == OP_AND or
+            opcode == OP_OR or
+            opcode == OP_XOR or
+            opcode == OP_2MUL or
+            opcode == OP_2DIV or
+            opcode == OP_MUL or
+            opcode == OP_DIV or
+            opcode == OP_MOD or
+            opcode == OP_LSHIFT or
+            opcode == OP_RSHIFT):
 
             self.errstr = 'SCRIPT_ERR_DISABLED_OPCODE'
             return False
 
-        if f_exec and instruction.opcode <= OP_PUSHDATA4:
-            if f_required_minimal and not instruction.is_minimal_push():
+        if f_exec and opcode <= OP_PUSHDATA4:
+            if f_required_minimal and not self.code.is_minimal_push(pc):
                 self.errstr = 'SCRIPT_ERR_MINIMALDATA'
                 return False
 
-            if not instruction.data:
+            if not data_length:
                 self.stack += [Interpreter.false]
             else:
-                self.stack += [instruction.data]
+                self.stack += [self.code.get_data(pc)]
 
-        elif f_exec or OP_IF <= instruction.opcode <= OP_ENDIF:
-            if instruction.opcode in [OP_1NEGATE, OP_1, OP_2, OP_3, OP_4, OP_5, OP_6, OP_7, OP_8, OP_9, OP_10, OP_11, OP_12, OP_13, OP_14, OP_15, OP_16]:
-                number = instruction.opcode.number - (OP_1.number - 1)
+        elif f_exec or OP_IF <= opcode <= OP_ENDIF:
+            if opcode in [OP_1NEGATE, OP_1, OP_2, OP_3, OP_4, OP_5, OP_6, OP_7, OP_8, OP_9, OP_10, OP_11, OP_12, OP_13, OP_14, OP_15, OP_16]:
+                number = opcode.number - (OP_1.number - 1)
                 bytes = encode_script_number(number)
                 self.stack += [bytes]
                 # The result of these opcodes should always be the minimal way to
                 # push data, so no need to Check MinimalPush here.
 
-            elif instruction.opcode == OP_NOP:
+            elif opcode == OP_NOP:
                 pass
 
-            elif instruction.opcode == OP_CHECKLOCKTIMEVERIFY:
+            elif opcode == OP_CHECKLOCKTIMEVERIFY:
                 if self.flags & Interpreter.SCRIPT_VERIFY_CHECKLOCKTIMEVERIFY:
                     if self.flags & Interpreter.SCRIPT_VERIFY_DISCOURAGE_UPGRADABLE_NOPS:
                         self.errstr = 'SCRIPT_ERR_DISCOURAGE_UPGRADABLE_NOPS'
@@ -248,12 +331,12 @@ class Interpreter(object):
                     self.errstr = 'SCRIPT_ERR_UNSATISFIED_LOCKTIME'
                     return False
 
-            elif instruction.opcode in [OP_NOP1, OP_NOP3, OP_NOP4, OP_NOP5, OP_NOP6, OP_NOP7, OP_NOP8, OP_NOP9, OP_NOP10]:
+            elif opcode in [OP_NOP1, OP_NOP3, OP_NOP4, OP_NOP5, OP_NOP6, OP_NOP7, OP_NOP8, OP_NOP9, OP_NOP10]:
                 if self.flags & Interpreter.SCRIPT_VERIFY_DISCOURAGE_UPGRADABLE_NOPS:
                     self.errstr = 'SCRIPT_ERR_DISCOURAGE_UPGRADABLE_NOPS'
                     return False
 
-            elif instruction.opcode in [OP_IF, OP_NOTIF]:
+            elif opcode in [OP_IF, OP_NOTIF]:
                 # <expression> if [statements] [else  [statements]] endif
                 f_value = False
                 if f_exec:
@@ -264,26 +347,26 @@ class Interpreter(object):
                     bytes = self.stack.pop()
                     f_value = Interpreter.cast_to_bool(bytes)
 
-                    if instruction.opcode == OP_NOTIF:
+                    if opcode == OP_NOTIF:
                         f_value = not f_value
 
                 self.vf_exec += [f_value]
 
-            elif instruction.opcode == OP_ELSE:
+            elif opcode == OP_ELSE:
                 if len(self.vf_exec) == 0:
                     self.errstr = 'SCRIPT_ERR_UNBALANCED_CONDITIONAL'
                     return False
 
                 self.vf_exec[-1] = not self.vf_exec[-1]
 
-            elif instruction.opcode == OP_ENDIF:
+            elif opcode == OP_ENDIF:
                 if len(self.vf_exec) == 0:
                     self.errstr = 'SCRIPT_ERR_UNBALANCED_CONDITIONAL'
                     return False
 
                 self.vf_exec.pop()
 
-            elif instruction.opcode == OP_VERIFY:
+            elif opcode == OP_VERIFY:
                 # (true -- ) or
                 # (false -- false) and return
                 if len(self.stack) < 1:
@@ -298,11 +381,11 @@ class Interpreter(object):
                     self.errstr = 'SCRIPT_ERR_VERIFY'
                     return False
 
-            elif instruction.opcode == OP_RETURN:
+            elif opcode == OP_RETURN:
                 self.errstr = 'SCRIPT_ERR_OP_RETURN'
                 return False
 
-            elif instruction.opcode == OP_TOALTSTACK:
+            elif opcode == OP_TOALTSTACK:
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
                     return False
@@ -310,7 +393,7 @@ class Interpreter(object):
                 self.altstack += self.stack[-1:]
                 self.stack = self.stack[:-1]
 
-            elif instruction.opcode == OP_FROMALTSTACK:
+            elif opcode == OP_FROMALTSTACK:
                 if len(self.altstack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_ALTSTACK_OPERATION'
                     return False
@@ -318,7 +401,7 @@ class Interpreter(object):
                 self.stack += self.altstack[-1:]
                 self.altstack = self.altstack[:-1]
 
-            elif instruction.opcode == OP_2DROP:
+            elif opcode == OP_2DROP:
                 # (x1, x2 -- )
                 if len(self.stack) < 2:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -326,7 +409,7 @@ class Interpreter(object):
 
                 self.stack = self.stack[:-2]
 
-            elif instruction.opcode == OP_2DUP:
+            elif opcode == OP_2DUP:
                 # (x1, x2 -- x1 x2 x1 x2)
                 if len(self.stack) < 2:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -335,7 +418,7 @@ class Interpreter(object):
                 x1, x2 = self.stack[-2:]
                 self.stack += [x1, x2]
 
-            elif instruction.opcode == OP_3DUP:
+            elif opcode == OP_3DUP:
                 # (x1, x2, x3 -- x1 x2 x3 x1 x2 x3)
                 if len(self.stack) < 3:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -344,7 +427,7 @@ class Interpreter(object):
                 x1, x2, x3 = self.stack[-3:]
                 self.stack += [x1, x2, x3]
 
-            elif instruction.opcode == OP_2OVER:
+            elif opcode == OP_2OVER:
                 # (x1 x2 x3 x4 -- x1 x2 x3 x4 x1 x2)
                 if len(self.stack) < 4:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -353,7 +436,7 @@ class Interpreter(object):
                 x1, x2, x3, x4 = self.stack[-4:]
                 self.stack += [x1, x2]
 
-            elif instruction.opcode == OP_2ROT:
+            elif opcode == OP_2ROT:
                 # (x1 x2 x3 x4 x5 x6 -- x3 x4 x5 x6 x1 x2)
                 if len(self.stack) < 6:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -362,7 +445,7 @@ class Interpreter(object):
                 x1, x2, x3, x4, x5, x6 = self.stack[-6:]
                 self.stack = self.stack[:-6] + [x3, x4, x5, x6, x1, x2]
 
-            elif instruction.opcode == OP_2SWAP:
+            elif opcode == OP_2SWAP:
                 # (x1 x2 x3 x4 -- x3 x4 x1 x2)
                 if len(self.stack) < 4:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -371,7 +454,7 @@ class Interpreter(object):
                 x1, x2, x3, x4 = self.stack[-4:]
                 self.stack = self.stack[:-4] + [x3, x4, x1, x2]
 
-            elif instruction.opcode == OP_IFDUP:
+            elif opcode == OP_IFDUP:
                 # (x - 0 | x x)
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -382,11 +465,11 @@ class Interpreter(object):
                 if f_value:
                     self.stack += [bytes]
 
-            elif instruction.opcode == OP_DEPTH:
+            elif opcode == OP_DEPTH:
                 bytes = encode_script_number(len(self.stack))
                 self.stack += [bytes]
 
-            elif instruction.opcode == OP_DROP:
+            elif opcode == OP_DROP:
                 # ( x -- )
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -395,7 +478,7 @@ class Interpreter(object):
                 self.stack.pop()
                 self.stack = self.stack[:-1]
 
-            elif instruction.opcode == OP_DUP:
+            elif opcode == OP_DUP:
                 # ( x -- x x )
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -403,7 +486,7 @@ class Interpreter(object):
 
                 self.stack += self.stack[-1:]
 
-            elif instruction.opcode == OP_NIP:
+            elif opcode == OP_NIP:
                 # (x1 x2 -- x2)
                 if len(self.stack) < 2:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -412,7 +495,7 @@ class Interpreter(object):
                 x1, x2 = self.stack[-2:]
                 self.stack = self.stack[:-2] + [x2]
 
-            elif instruction.opcode == OP_OVER:
+            elif opcode == OP_OVER:
                 # (x1 x2 -- x1 x2 x1)
                 if len(self.stack) < 2:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -420,7 +503,7 @@ class Interpreter(object):
 
                 self.stack += [self.stack[-2]]
 
-            elif instruction.opcode in [OP_PICK, OP_ROLL]:
+            elif opcode in [OP_PICK, OP_ROLL]:
                 # (xn ... x2 x1 x0 n - xn ... x2 x1 x0 xn)
                 # (xn ... x2 x1 x0 n - ... x2 x1 x0 xn)
                 if len(self.stack) < 2:
@@ -434,12 +517,12 @@ class Interpreter(object):
                     return False
 
                 bytes = self.stack[-n-1]
-                if instruction.opcode == OP_ROLL:
+                if opcode == OP_ROLL:
                     self.stack.pop(-n-1)
 
                 self.stack += [bytes]
 
-            elif instruction.opcode == OP_ROT:
+            elif opcode == OP_ROT:
                 # (x1 x2 x3 -- x2 x3 x1)
                 # x2 x1 x3  after first swap
                 # x2 x3 x1  after second swap
@@ -450,7 +533,7 @@ class Interpreter(object):
                 x1, x2, x3 = self.stack[-3:]
                 self.stack = self.stack[:-3] + [x2, x3, x1]
 
-            elif instruction.opcode == OP_SWAP:
+            elif opcode == OP_SWAP:
                 # (x1 x2 -- x2 x1)
                 if len(self.stack) < 2:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -459,7 +542,7 @@ class Interpreter(object):
                 x1, x2 = self.stack[-2:]
                 self.stack = self.stack[:-2] + [x2, x1]
 
-            elif instruction.opcode == OP_TUCK:
+            elif opcode == OP_TUCK:
                 # (x1 x2 -- x2 x1 x2)
                 if len(self.stack) < 2:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -468,7 +551,7 @@ class Interpreter(object):
                 x1, x2 = self.stack[-2:]
                 self.stack = self.stack[:-2] + [x2, x1, x2]
 
-            elif instruction.opcode == OP_SIZE:
+            elif opcode == OP_SIZE:
                 # (in -- in size)
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -477,7 +560,7 @@ class Interpreter(object):
                 size = len(self.stack[-1])
                 self.stack += [encode_script_number(size)]
 
-            elif instruction.opcode in [OP_EQUAL, OP_EQUALVERIFY]:
+            elif opcode in [OP_EQUAL, OP_EQUALVERIFY]:
                 # case Opcode.OP_NOTEQUAL # use Opcode.OP_NUMNOTEQUAL
                 # (x1 x2 - bool)
                 if len(self.stack) < 2:
@@ -488,14 +571,14 @@ class Interpreter(object):
                 f_equal = x1 == x2
                 self.stack = self.stack[:-2] + [Interpreter.bool_bytes[f_equal]]
 
-                if instruction.opcode == OP_EQUALVERIFY:
+                if opcode == OP_EQUALVERIFY:
                     if f_equal:
                         self.stack.pop()
                     else:
                         self.errstr = 'SCRIPT_ERR_EQUALVERIFY'
                         return False
 
-            elif instruction.opcode in [OP_1ADD, OP_1SUB, OP_NEGATE, OP_ABS, OP_NOT, OP_0NOTEQUAL]:
+            elif opcode in [OP_1ADD, OP_1SUB, OP_NEGATE, OP_ABS, OP_NOT, OP_0NOTEQUAL]:
                 # (in -- out)
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -504,27 +587,27 @@ class Interpreter(object):
                 bytes = self.stack[-1]
                 number = decode_script_number(bytes, f_required_minimal)
 
-                if instruction.opcode == OP_1ADD:
+                if opcode == OP_1ADD:
                     number += 1
 
-                elif instruction.opcode == OP_1SUB:
+                elif opcode == OP_1SUB:
                     number -= 1
 
-                elif instruction.opcode == OP_NEGATE:
+                elif opcode == OP_NEGATE:
                     number = -number
 
-                elif instruction.opcode == OP_ABS:
+                elif opcode == OP_ABS:
                     number = abs(-1)
 
-                elif instruction.opcode == OP_NOT:
+                elif opcode == OP_NOT:
                     number = int(number == 0)
 
-                elif instruction.opcode == OP_0NOTEQUAL:
+                elif opcode == OP_0NOTEQUAL:
                     number = int(number != 0)
 
                 self.stack = self.stack[:-1] + [encode_script_number(number)]
 
-            elif instruction.opcode in [
+            elif opcode in [
                 OP_ADD, OP_SUB, OP_BOOLAND,
                 OP_BOOLOR, OP_NUMEQUAL,
                 OP_NUMEQUALVERIFY, OP_NUMNOTEQUAL,
@@ -541,52 +624,52 @@ class Interpreter(object):
                 number1 = decode_script_number(self.stack[-2], f_required_minimal)
                 number2 = decode_script_number(self.stack[-1], f_required_minimal)
 
-                if instruction.opcode == OP_ADD:
+                if opcode == OP_ADD:
                     result = number1 + number2
 
-                elif instruction.opcode == OP_SUB:
+                elif opcode == OP_SUB:
                     result = number1 - number2
 
-                elif instruction.opcode == OP_BOOLAND:
+                elif opcode == OP_BOOLAND:
                     result = all([number1, number2])
 
-                elif instruction.opcode == OP_BOOLOR:
+                elif opcode == OP_BOOLOR:
                     result = any([number1, number2])
 
-                elif instruction.opcode in [OP_NUMEQUAL, OP_NUMEQUALVERIFY]:
+                elif opcode in [OP_NUMEQUAL, OP_NUMEQUALVERIFY]:
                     result = int(number1 == number2)
 
-                elif instruction.opcode == OP_NUMNOTEQUAL:
+                elif opcode == OP_NUMNOTEQUAL:
                     result = int(number1 != number2)
 
-                elif instruction.opcode == OP_LESSTHAN:
+                elif opcode == OP_LESSTHAN:
                     result = number1 < number2
 
-                elif instruction.opcode == OP_GREATERTHAN:
+                elif opcode == OP_GREATERTHAN:
                     result = number1 > number2
 
-                elif instruction.opcode == OP_LESSTHANOREQUAL:
+                elif opcode == OP_LESSTHANOREQUAL:
                     result = number1 <= number2
 
-                elif instruction.opcode == OP_GREATERTHANOREQUAL:
+                elif opcode == OP_GREATERTHANOREQUAL:
                     result = number1 >= number2
 
-                elif instruction.opcode == OP_MIN:
+                elif opcode == OP_MIN:
                     result = min(number1, number2)
 
-                elif instruction.opcode == OP_MAX:
+                elif opcode == OP_MAX:
                     result = max(number1, number2)
 
                 self.stack = self.stack[:-2] + [encode_script_number(result)]
 
-                if instruction.opcode == OP_NUMEQUALVERIFY:
+                if opcode == OP_NUMEQUALVERIFY:
                     if Interpreter.cast_to_bool(self.stack[-1]):
                         self.stack = self.stack[:-1]
                     else:
                         self.errstr = 'SCRIPT_ERR_NUMEQUALVERIFY'
                         return False
 
-            elif instruction.opcode == OP_WITHIN:
+            elif opcode == OP_WITHIN:
                 # (x min max -- out)
                 if len(self.stack) < 3:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -597,31 +680,31 @@ class Interpreter(object):
 
                 self.stack = self.stack[:-3] + [Interpreter.bool_bytes[f_value]]
 
-            elif instruction.opcode in [OP_RIPEMD160, OP_SHA1, OP_SHA256, OP_HASH160, OP_HASH256]:
+            elif opcode in [OP_RIPEMD160, OP_SHA1, OP_SHA256, OP_HASH160, OP_HASH256]:
                 # (x min max -- out)
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
                     return False
 
                 bytes = self.stack[-1]
-                if instruction.opcode == OP_RIPEMD160:
+                if opcode == OP_RIPEMD160:
                     result = ripemd160(bytes)
-                elif instruction.opcode == OP_SHA1:
+                elif opcode == OP_SHA1:
                     result = sha1(bytes)
-                elif instruction.opcode == OP_SHA256:
+                elif opcode == OP_SHA256:
                     result = sha256(bytes)
-                elif instruction.opcode == OP_HASH160:
+                elif opcode == OP_HASH160:
                     result = hash160(bytes)
-                elif instruction.opcode == OP_HASH256:
+                elif opcode == OP_HASH256:
                     result = sha256(sha256(bytes))
 
                 self.stack = self.stack[:-1] + [result]
 
-            elif instruction.opcode == OP_CODESEPARATOR:
+            elif opcode == OP_CODESEPARATOR:
                 # hash starts after the code separator
                 self.pbegincodehash = self.pc
 
-            elif instruction.opcode in [OP_CHECKSIG, OP_CHECKSIGVERIFY]:
+            elif opcode in [OP_CHECKSIG, OP_CHECKSIGVERIFY]:
                 # (sig pubkey -- bool)
                 if len(self.stack) < 2:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -632,7 +715,7 @@ class Interpreter(object):
                 # Subset of script starting at the most recent codeseparator
                 # CScript scriptCode(pbegincodehash, pend);
                 from_instruction = self.pbegincodehash
-                subscript = Script(self.script.instructions[from_instruction:])
+                subscript = Script.from_bytes(self.code.get_subscript_bytes(from_instruction))
 
                 # Drop the signature, since there's no way for a signature to sign itself
                 subscript.remove_opcode_by_data(sig_bytes)
@@ -648,14 +731,14 @@ class Interpreter(object):
                     f_success = False
 
                 self.stack = self.stack[:-2] + [Interpreter.bool_bytes[f_success]]
-                if instruction.opcode == OP_CHECKSIGVERIFY:
+                if opcode == OP_CHECKSIGVERIFY:
                     if f_success:
                         self.stack = self.stack[:-1]
                     else:
                         self.errstr = 'SCRIPT_ERR_CHECKSIGVERIFY'
                         return False
 
-            elif instruction.opcode in [OP_CHECKMULTISIG, OP_CHECKMULTISIGVERIFY]:
+            elif opcode in [OP_CHECKMULTISIG, OP_CHECKMULTISIGVERIFY]:
                 # ([sig ...] num_of_signatures [pubkey ...] num_of_pubkeys -- bool)
                 if len(self.stack) < 1:
                     self.errstr = 'SCRIPT_ERR_INVALID_STACK_OPERATION'
@@ -688,7 +771,7 @@ class Interpreter(object):
 
                 # Subset of script starting at the most recent codeseparator
                 from_instruction = self.pbegincodehash
-                subscript = Script(self.script.instructions[from_instruction:])
+                subscript = Script.from_bytes(self.code.get_subscript_bytes(from_instruction))
 
                 for i in range(sigs_count):
                     sig_bytes = self.stack[-isig-i]
@@ -741,7 +824,7 @@ class Interpreter(object):
 
                 self.stack = self.stack[:-1] + [Interpreter.bool_bytes[f_success]]
 
-                if instruction.opcode == OP_CHECKMULTISIGVERIFY:
+                if opcode == OP_CHECKMULTISIGVERIFY:
                     if f_success:
                         self.stack = self.stack[:-1]
                     else:
@@ -1,7 +1,5 @@
 from __future__ import unicode_literals
 from functools import total_ordering
-import inspect
-import sys
 
 from bitforge.errors import *
 
@@ -179,13 +177,21 @@ class Opcode(object):
         "Opcode {object.name} does not support this operation"
 
     opcode_number_to_name = {}  # Filled after class definition
+    opcode_name_to_opcode = {}  # Filled after class definition
+    opcode_table = ()           # Filled after class definition
 
+    __slots__ = ('number',)
 
-    def __init__(self, number):
+    def __new__(cls, number):
+        # Opcodes are flyweights: there is a single, shared instance for each
+        # number, so construction is a table lookup and equality is identity.
         if not (0 <= number <= 255):
             raise Opcode.UnknownOpcodeNumber(number)
 
-        self.number = number
+        return Opcode.opcode_table[number]
+
+    def __reduce__(self):
+        return (Opcode, (self.number,))
 
     @property
     def name(self):
@@ -222,21 +228,12 @@ class Opcode(object):
         else:
             return "<Opcode %d: %s>" % (self.number, self.name)
 
-    def __eq__(self, other):
-        if not isinstance(other, Opcode):
-            return False
-
-        return self.number == other.number
-
     def __lt__(self, other):
         if not isinstance(other, Opcode):
             return False
 
         return self.number < other.number
 
-    def __hash__(self):
-        return hash(self.number)
-
     @property
     def bytes(self):
         return bytes(bytearray([self.number]))
@@ -250,20 +247,11 @@ class Opcode(object):
 
     @staticmethod
     def from_name(name):
-        if not name.startswith('OP_'):
-            raise Opcode.UnknownOpcodeName(name)
-
-        # Get element from module
-        _module = sys.modules[__name__]
-        members = inspect.getmembers(_module)
-        # Cast iterable to list for python 3 compatibility
-        results = list(filter(lambda member: member[0] == name, members))
-
-        if not results:
+        try:
+            return Opcode.opcode_name_to_opcode[name]
+        except KeyError:
             raise Opcode.UnknownOpcodeName(name)
 
-        return results[0][1]
-
     @staticmethod
     def const_push_for(length):
         if not (1 <= length <= 75):
@@ -317,18 +305,28 @@ class Opcode(object):
 
 
 
-# Walk the OP_* variables, mapping them to their names and creating Opcode objs:
-_module = sys.modules[__name__]
+# Allocate the shared Opcode instance for every possible number:
+def _allocate(number):
+    opcode = object.__new__(Opcode)
+    opcode.number = number
+    return opcode
+
+Opcode.opcode_table = tuple(_allocate(number) for number in range(256))
 
-for name, number in inspect.getmembers(_module):
+del _allocate
+
+# Map the OP_* variables listed above to their names, and replace their
+# integer values with the shared Opcode instances. The listing is the static
+# opcode table, a single pass over the module namespace is all it takes:
+for name, number in list(globals().items()):
     if name.startswith('OP_'):
-        # Populate the reverse opcode-number-to-name map:
+        opcode = Opcode.opcode_table[number]
+
         Opcode.opcode_number_to_name[number] = name
+        Opcode.opcode_name_to_opcode[name]   = opcode
+        globals()[name] = opcode
 
-        # Replace integer values with actual Opcode instances:
-        setattr(_module, name, Opcode(number))
+del name, number, opcode
 
 Opcode.opcode_number_to_name[0] = 'OP_0'  # shares number with OP_FALSE
 Opcode.opcode_number_to_name[81] = 'OP_1'  # shares number with OP_TRUE
-
-del _module # the expected use for this module is to import *
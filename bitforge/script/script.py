@@ -9,6 +9,8 @@ from bitforge import PublicKey
 
 from .opcode import *
 from .instruction import Instruction
+from .bytecode import Bytecode
+from .template import TemplateIndex, PUSH, PUSHES, NUMBER
 
 
 BaseScript = collections.namedtuple('Script',
@@ -41,21 +43,41 @@ class Script(BaseScript):
         return super(Script, cls).__new__(cls, instructions)
 
     def get_structure(self):
-        return tuple(i.opcode if not i.is_push() else 'PUSH' for i in self.instructions)
+        # Scripts are immutable, so the structure is computed once per instance:
+        try:
+            return self._structure
+        except AttributeError:
+            self._structure = tuple(i.opcode if not i.is_push() else PUSH for i in self.instructions)
+            return self._structure
+
+    @classmethod
+    def is_valid(cls, script):
+        return cls in SCRIPT_TEMPLATES.match_all(script.get_structure())
 
     @staticmethod
     def create(instructions):
         generic = Script(instructions)
         subcls = Script.classify(generic)
-        return subcls(instructions) if subcls else generic
+
+        if subcls is None:
+            return generic
+
+        special = subcls(generic.instructions)
+        special._structure = generic.get_structure()
+        return special
 
     @staticmethod
     def classify(script):
-        for subcls in SCRIPT_SUBCLASSES:
-            if subcls.is_valid(script):
-                return subcls
+        return SCRIPT_TEMPLATES.match(script.get_structure())
 
-        return None
+    @staticmethod
+    def register_template(pattern, subcls):
+        """
+        Make Script.create() and Script.classify() recognize `pattern`, a
+        sequence of Opcodes and the PUSH, PUSHES and NUMBER atoms, as `subcls`.
+        Templates registered earlier take precedence.
+        """
+        SCRIPT_TEMPLATES.register(pattern, subcls)
 
     @staticmethod
     def from_bytes(bytes):
@@ -161,12 +183,20 @@ class Script(BaseScript):
         for i in self.instructions: data += i.to_bytes()
         return bytes(data)
 
+    def size(self):
+        # Same as len(self.to_bytes()), without building the bytes:
+        return sum(i.size() for i in self.instructions)
+
     def to_hex(self):
         return encode_hex(self.to_bytes()).decode('utf-8')
 
     def to_hash(self):
         return ripemd160(sha256(self.to_bytes()))
 
+    def to_bytecode(self):
+        # Compiled form used by the Interpreter, shared across equal scripts:
+        return Bytecode.for_script(self)
+
     def to_string(self):
         return ' '.join(i.to_string() for i in self.instructions)
 
@@ -178,9 +208,7 @@ class PayToPubkeyIn(Script):
         schematic = [ signature, pubkey.to_bytes() ]
         return cls(to_instructions(schematic))
 
-    @staticmethod
-    def is_valid(script):
-        return script.get_structure() == ('PUSH', 'PUSH')
+    templates = [ (PUSH, PUSH) ]
 
     def get_public_key(self):
         return PublicKey.from_bytes(self.instructions[1].data)
@@ -196,9 +224,7 @@ class PayToPubkeyOut(Script):
         schematic = [ OP_DUP, OP_HASH160, address.phash, OP_EQUALVERIFY, OP_CHECKSIG ]
         return cls(to_instructions(schematic))
 
-    @staticmethod
-    def is_valid(script):
-        return script.get_structure() == (OP_DUP, OP_HASH160, 'PUSH', OP_EQUALVERIFY, OP_CHECKSIG)
+    templates = [ (OP_DUP, OP_HASH160, PUSH, OP_EQUALVERIFY, OP_CHECKSIG) ]
 
     def get_address_hash(self):
         return self.instructions[2].data
@@ -212,14 +238,7 @@ class PayToScriptIn(Script):
         schematic = [OP_0] + signatures + [script.to_bytes()]
         return cls(to_instructions(schematic))
 
-    @staticmethod
-    def is_valid(script):
-        structure = script.get_structure()
-        return (
-            len(structure) > 2 and
-            structure[0] == OP_0 and
-            all(op == 'PUSH' for op in structure[1:])
-        )
+    templates = [ (OP_0, PUSH, PUSHES) ]
 
     def get_script(self):
         return Script.from_bytes(self.instructions[-1].data)
@@ -236,9 +255,7 @@ class PayToScriptOut(Script):
         schematic = [ OP_HASH160, script.to_hash(), OP_EQUAL ]
         return cls(to_instructions(schematic))
 
-    @staticmethod
-    def is_valid(script):
-        return script.get_structure() == (OP_HASH160, 'PUSH', OP_EQUAL)
+    templates = [ (OP_HASH160, PUSH, OP_EQUAL) ]
 
     def get_script_hash(self):
         return self.instructions[1].data
@@ -251,9 +268,7 @@ class OpReturnOut(Script):
         schematic = [ OP_RETURN, data ]
         return cls(to_instructions(schematic))
 
-    @staticmethod
-    def is_valid(script):
-        return script.get_structure() == (OP_RETURN, 'PUSH')
+    templates = [ (OP_RETURN, PUSH) ]
 
     def get_data(self):
         return self.instructions[1].data
@@ -272,17 +287,7 @@ class RedeemMultisig(Script):
 
         return cls(to_instructions(schematic))
 
-    @staticmethod
-    def is_valid(script):
-        structure = script.get_structure()
-
-        return (
-            len(structure) >= 4 and
-            structure[0].is_number() and
-            structure[-2].is_number() and
-            structure[-1] == OP_CHECKMULTISIG and
-            all(op == 'PUSH' for op in structure[1:-2])
-        )
+    templates = [ (NUMBER, PUSHES, NUMBER, OP_CHECKMULTISIG) ]
 
     def get_min_signatures(self):
         return self.instructions[0].opcode.number_value()
@@ -300,6 +305,14 @@ SCRIPT_SUBCLASSES = [
     RedeemMultisig,
 ]
 
+SCRIPT_TEMPLATES = TemplateIndex()
+
+for subcls in SCRIPT_SUBCLASSES:
+    for pattern in subcls.templates:
+        Script.register_template(pattern, subcls)
+
+del subcls, pattern
+
 
 def to_instructions(schematic):
     instructions = []
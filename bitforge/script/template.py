@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+from .opcode import *
+
+
+# Atoms that can appear in a template pattern, besides specific Opcodes:
+PUSH   = 'PUSH'   # exactly one data push (same marker as Script.get_structure())
+PUSHES = 'PUSHES' # one or more consecutive data pushes
+NUMBER = 'NUMBER' # one of OP_0, OP_1 ... OP_16
+
+NUMBER_OPCODES = frozenset([ OP_0 ] + [ Opcode.for_number(n) for n in range(1, 17) ])
+
+_MATCH = None # trie node key holding the templates that end at that node
+
+
+class TemplateIndex(object):
+    """
+    A trie of Script templates, walked once with a Script structure to find
+    every template it matches.
+
+    Patterns are sequences of Opcodes and the PUSH, PUSHES and NUMBER atoms. When
+    several templates match the same structure, the one registered first wins.
+    """
+
+    def __init__(self):
+        self.root  = {}
+        self.count = 0
+
+    def register(self, pattern, value):
+        node = self.root
+
+        for atom in pattern:
+            child = node.get(atom)
+
+            if child is None:
+                child = node[atom] = {}
+
+                if atom == PUSHES:
+                    child[PUSHES] = child # loop back to consume further pushes
+
+            node = child
+
+        node.setdefault(_MATCH, []).append((self.count, value))
+        self.count += 1
+
+    def match_all(self, structure):
+        states = [ self.root ]
+
+        for element in structure:
+            if element == PUSH:
+                atoms = (PUSH, PUSHES)
+            elif element in NUMBER_OPCODES:
+                atoms = (element, NUMBER)
+            else:
+                atoms = (element,)
+
+            next_states = []
+
+            for node in states:
+                for atom in atoms:
+                    child = node.get(atom)
+
+                    if child is not None and not any(child is s for s in next_states):
+                        next_states.append(child)
+
+            if not next_states:
+                return []
+
+            states = next_states
+
+        matches = []
+        for node in states:
+            matches.extend(node.get(_MATCH, ()))
+
+        return [ value for priority, value in sorted(matches, key = lambda m: m[0]) ]
+
+    def match(self, structure):
+        matches = self.match_all(structure)
+        return matches[0] if matches else None
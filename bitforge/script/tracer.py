@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+import collections
+import sys
+
+
+class StreamTracer(object):
+    """
+    Interpreter tracer that writes one line per executed instruction to
+    `stream` (stderr by default). Useful to follow a failing spend step by step.
+    """
+
+    def __init__(self, stream = None):
+        self.stream = stream if stream is not None else sys.stderr
+
+    def __call__(self, pc, opcode, depth, elapsed):
+        self.stream.write("%4d %-24s depth %-4d %8.1fus\n" % (pc, opcode.name, depth, elapsed * 1e6))
+
+
+class Profiler(object):
+    """
+    Interpreter tracer that counts executions and accumulates time per opcode.
+    Install the same Profiler on every Interpreter run over a corpus, then look
+    at get_stats() or report() to find which opcodes dominate validation time.
+    """
+
+    OpcodeStats = collections.namedtuple('OpcodeStats', ['opcode', 'count', 'total', 'mean'])
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts  = collections.defaultdict(int)
+        self.timings = collections.defaultdict(float)
+
+    def __call__(self, pc, opcode, depth, elapsed):
+        self.counts[opcode] += 1
+        self.timings[opcode] += elapsed
+
+    def get_stats(self):
+        # Sorted by cumulative time, most expensive opcode first:
+        stats = [
+            Profiler.OpcodeStats(opcode, count, self.timings[opcode], self.timings[opcode] / count)
+            for opcode, count in self.counts.items()
+        ]
+
+        return sorted(stats, key = lambda s: s.total, reverse = True)
+
+    def report(self):
+        lines = [ "%-24s %10s %12s %12s" % ('opcode', 'count', 'total ms', 'mean us') ]
+
+        for s in self.get_stats():
+            lines.append("%-24s %10d %12.3f %12.2f" % (s.opcode.name, s.count, s.total * 1e3, s.mean * 1e6))
+
+        return '\n'.join(lines)
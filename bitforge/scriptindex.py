@@ -0,0 +1,274 @@
+from __future__ import unicode_literals
+import mmap
+import os
+import struct
+
+from bitforge.encoding import *
+from bitforge.errors import *
+from bitforge.compat import chr
+from bitforge.address import Address
+from bitforge.bloom import read_varint
+
+
+# Kinds of watched scripts. 0 marks an empty slot of the table:
+PAY_TO_PUBKEY_HASH = 1 # OP_DUP OP_HASH160 <20 bytes> OP_EQUALVERIFY OP_CHECKSIG
+PAY_TO_SCRIPT_HASH = 2 # OP_HASH160 <20 bytes> OP_EQUAL
+
+KEY_SIZE    = 21 # kind, hash160
+RECORD_SIZE = 25 # kind, hash160, 4-byte value
+
+STORE_MAGIC  = b'BFSIDX01'
+STORE_HEADER = struct.Struct(str('<8sQ')) # magic, record count
+
+MIN_CAPACITY = 1024 # slots, always a power of 2
+MAX_LOAD     = 0.5  # the table doubles when more than this fraction of slots is used
+
+SLOT = struct.Struct(str('<I'))
+
+
+def script_key(data, start, end):
+    # The kind and hash of a Pay-to-Pubkey-Hash or Pay-to-Script-Hash script
+    # in data[start:end], or None:
+    size = end - start
+
+    if size == 25 and data[start : start + 3] == b'\x76\xa9\x14' and data[end - 2 : end] == b'\x88\xac':
+        return chr(PAY_TO_PUBKEY_HASH) + bytes(data[start + 3 : start + 23])
+
+    if size == 23 and data[start : start + 2] == b'\xa9\x14' and data[end - 1] == 0x87:
+        return chr(PAY_TO_SCRIPT_HASH) + bytes(data[start + 2 : start + 22])
+
+    return None
+
+
+class ScriptIndex(object):
+    """
+    A set of watched Pay-to-Pubkey-Hash and Pay-to-Script-Hash scripts, each
+    with a 32-bit value of the caller's choosing (a derivation index, an
+    account number).
+
+    Scripts are stored as 25-byte records in an open-addressing table with
+    linear probing, in a bytearray or a memory-mapped file at `path`. Hashes
+    are uniformly distributed already, so their first bytes pick the slot.
+    A loaded file is ready to query as soon as it's mapped, nothing is rebuilt.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class UnsupportedScript(Error, ObjectError):
+        "Only Pay-to-Pubkey-Hash and Pay-to-Script-Hash scripts can be indexed, not {object}"
+
+    class InvalidStore(Error, StringError):
+        "The file {string} is not a script index"
+
+
+    def __init__(self, path = None, capacity = MIN_CAPACITY):
+        self.path  = path
+        self.file  = None
+        self.count = 0
+
+        if path is not None and os.path.exists(path):
+            self.load()
+        else:
+            if path is not None:
+                self.file = open(path, 'w+b')
+
+            self.capacity = MIN_CAPACITY
+
+            while self.capacity < capacity:
+                self.capacity *= 2
+
+            self.data = self.allocate(self.capacity)
+
+        self.mask = self.capacity - 1
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, script):
+        return self.get(script) is not None
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.data.close()
+            self.file.close()
+            self.file = None
+
+    def flush(self):
+        if self.file is not None:
+            self.data.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def find(self, key):
+        # Offset of the record for `key`, or of the empty slot where it goes:
+        data   = self.data
+        mask   = self.mask
+        slot   = SLOT.unpack_from(key, 1)[0] & mask
+        offset = STORE_HEADER.size + RECORD_SIZE * slot
+
+        while data[offset] and data[offset : offset + KEY_SIZE] != key:
+            slot   = (slot + 1) & mask
+            offset = STORE_HEADER.size + RECORD_SIZE * slot
+
+        return offset
+
+    def get_key(self, script):
+        data = bytearray(script.to_bytes())
+        key  = script_key(data, 0, len(data))
+
+        if key is None:
+            raise ScriptIndex.UnsupportedScript(script)
+
+        return key
+
+    def get(self, script):
+        # The value of a watched Script, or None:
+        return self.get_by_key(self.get_key(script))
+
+    def get_by_key(self, key):
+        offset = self.find(key)
+
+        if not self.data[offset]:
+            return None
+
+        return SLOT.unpack_from(self.data, offset + KEY_SIZE)[0]
+
+    def add(self, script, value = 0):
+        self.add_keys([ (self.get_key(script), value) ])
+
+    def add_address(self, address, value = 0):
+        kind = PAY_TO_PUBKEY_HASH if address.type is Address.Type.PublicKey else PAY_TO_SCRIPT_HASH
+        self.add_keys([ (chr(kind) + address.phash, value) ])
+
+    def add_xpub(self, xpub, start, end):
+        """
+        Watch the addresses of children `start` to `end` (exclusive) of an
+        HDPublicKey, with the child index as value. Derivation dominates the
+        cost, the table is grown once for the whole range.
+        """
+        self.add_keys(
+            (chr(PAY_TO_PUBKEY_HASH) + xpub.derive(index).to_public_key().to_address().phash, index)
+            for index in range(start, end)
+        )
+
+    def add_keys(self, items):
+        # Insert (key, value) pairs, replacing the value of keys already present:
+        items = list(items)
+        self.reserve(self.count + len(items))
+
+        data = self.data
+
+        for key, value in items:
+            offset = self.find(key)
+
+            if not data[offset]:
+                self.count += 1
+
+            data[offset : offset + RECORD_SIZE] = key + SLOT.pack(value)
+
+        self.write_count()
+
+    def match_transaction(self, tx):
+        return self.match_transaction_bytes(tx.to_bytes())
+
+    def match_transaction_bytes(self, raw):
+        """
+        The outputs of a serialized transaction paying to watched scripts, as
+        (output index, value) pairs. Hashes are sliced out of the raw output
+        scripts, no Scripts or Addresses are built.
+        """
+        data = bytearray(raw)
+
+        count, i = read_varint(data, 4)
+
+        for n in range(count):
+            script_size, script_start = read_varint(data, i + 36)
+            i = script_start + script_size + 4
+
+        count, i = read_varint(data, i)
+        matches  = []
+
+        for n in range(count):
+            script_size, start = read_varint(data, i + 8)
+            i = start + script_size
+
+            key = script_key(data, start, i)
+
+            if key is not None:
+                value = self.get_by_key(key)
+
+                if value is not None:
+                    matches.append((n, value))
+
+        return matches
+
+    def allocate(self, capacity):
+        size = STORE_HEADER.size + RECORD_SIZE * capacity
+
+        if self.file is None:
+            return bytearray(size)
+
+        # Emptied first, so the records of a smaller table don't linger:
+        self.file.truncate(0)
+        self.file.truncate(size)
+        return mmap.mmap(self.file.fileno(), size)
+
+    def reserve(self, count):
+        if count <= self.capacity * MAX_LOAD:
+            return
+
+        capacity = self.capacity
+
+        while count > capacity * MAX_LOAD:
+            capacity *= 2
+
+        # Copy the records out, then insert them again into the larger table:
+        old  = self.data
+        keys = []
+
+        for offset in range(STORE_HEADER.size, len(old), RECORD_SIZE):
+            if old[offset]:
+                keys.append(bytes(old[offset : offset + RECORD_SIZE]))
+
+        if self.file is not None:
+            old.close()
+
+        self.data     = self.allocate(capacity)
+        self.capacity = capacity
+        self.mask     = capacity - 1
+
+        data = self.data
+
+        for record in keys:
+            offset = self.find(record[:KEY_SIZE])
+            data[offset : offset + RECORD_SIZE] = record
+
+    def write_count(self):
+        self.data[:STORE_HEADER.size] = STORE_HEADER.pack(STORE_MAGIC, self.count)
+
+    def load(self):
+        self.file = open(self.path, 'r+b')
+        size = os.path.getsize(self.path)
+        capacity = (size - STORE_HEADER.size) // RECORD_SIZE
+
+        # The table size must be a power of 2, and not overfull:
+        if size != STORE_HEADER.size + RECORD_SIZE * capacity or capacity < 1 or capacity & (capacity - 1):
+            self.file.close()
+            raise ScriptIndex.InvalidStore(self.path)
+
+        self.data = mmap.mmap(self.file.fileno(), size)
+        magic, count = STORE_HEADER.unpack_from(self.data, 0)
+
+        if magic != STORE_MAGIC or count > capacity * MAX_LOAD:
+            self.data.close()
+            self.file.close()
+            raise ScriptIndex.InvalidStore(self.path)
+
+        self.count    = count
+        self.capacity = capacity
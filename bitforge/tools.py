@@ -1,4 +1,5 @@
 from __future__ import unicode_literals
+import collections
 
 from .errors import *
 from .encoding import *
@@ -43,6 +44,45 @@ class Buffer(bytearray):
         self.extend(data)
 
 
+class LRUCache(object):
+    """
+    A bounded mapping that keeps at most `capacity` entries, evicting the least
+    recently used one when full.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries  = collections.OrderedDict()
+
+    def get(self, key, default = None):
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            return default
+
+        self.entries[key] = value # re-insert as most recently used
+        return value
+
+    def put(self, key, value):
+        self.entries.pop(key, None)
+        self.entries[key] = value
+
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
+
+    def pop(self, key, default = None):
+        return self.entries.pop(key, default)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
 def enforce(object, predicate, ExceptionClass):
     if not predicate(object):
         raise ExceptionClass(object)
@@ -17,6 +17,7 @@ BaseInput = collections.namedtuple('Input',
 
 
 class Input(BaseInput):
+    __slots__ = ()
 
     class Error(BitforgeError):
         pass
@@ -72,7 +73,7 @@ class Input(BaseInput):
         # Sequence number, as little-endian uint32 (4 bytes):
         buffer.write(encode_int(self.seq_number, length = 4, big_endian = False))
 
-        return str(buffer)
+        return bytes(buffer)
 
     def to_hex(self):
         return encode_hex(self.to_bytes()).decode('utf-8')
@@ -119,6 +120,7 @@ class Input(BaseInput):
 
 
 class AddressInput(Input):
+    __slots__ = ()
 
     @classmethod
     def create(cls, tx_id, txo_index, address, seq_number = FINAL_SEQ_NUMBER):
@@ -149,6 +151,7 @@ class AddressInput(Input):
 
 
 class ScriptInput(Input):
+    __slots__ = ()
 
     @classmethod
     def create(cls, tx_id, txo_index, script, seq_number = FINAL_SEQ_NUMBER):
@@ -170,6 +173,7 @@ class ScriptInput(Input):
 
 
 class MultisigInput(ScriptInput):
+    __slots__ = ()
 
     @classmethod
     def create(cls, tx_id, txo_index, pubkeys, min_signatures, seq_number = FINAL_SEQ_NUMBER):
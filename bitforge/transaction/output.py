@@ -13,6 +13,7 @@ BaseOutput = collections.namedtuple('Output',
 
 
 class Output(BaseOutput):
+    __slots__ = ()
 
     class Error(BitforgeError):
         pass
@@ -50,7 +51,7 @@ class Output(BaseOutput):
         # Script body (? bytes):
         buffer.write(script)
 
-        return str(buffer)
+        return bytes(buffer)
 
     def to_hex(self):
         return encode_hex(self.to_bytes()).decode('utf-8')
@@ -75,6 +76,7 @@ class Output(BaseOutput):
 
 
 class AddressOutput(Output):
+    __slots__ = ()
 
     @classmethod
     def create(cls, amount, address):
@@ -83,6 +85,7 @@ class AddressOutput(Output):
 
 
 class ScriptOutput(Output):
+    __slots__ = ()
 
     @classmethod
     def create(cls, amount, redeem_script):
@@ -91,6 +94,7 @@ class ScriptOutput(Output):
 
 
 class MultisigOutput(ScriptOutput):
+    __slots__ = ()
 
     @classmethod
     def create(cls, amount, pubkeys, min_signatures):
@@ -99,6 +103,7 @@ class MultisigOutput(ScriptOutput):
 
 
 class DataOutput(Output):
+    __slots__ = ()
 
     class TooMuchData(Output.Error, NumberError):
         "DataOutputs can carry at most 80 bytes, but {number} were passed in"
@@ -0,0 +1,125 @@
+from __future__ import unicode_literals
+import math
+
+from bitforge.errors import *
+from bitforge.script import RedeemMultisig
+from .input import AddressInput, ScriptInput
+
+
+class SizeError(BitforgeError):
+    pass
+
+class UnknownInputType(SizeError, ObjectError):
+    "Can't estimate the signed size of {object}, pass the number of signatures it will carry"
+
+
+# Sizes are computed from Input types and Script instructions, without signing
+# or serializing anything. Output sizes are exact. Sizes of unsigned Inputs are
+# upper bounds, since signatures vary in length, except for AddressInputs
+# signed by uncompressed keys: an unsigned AddressInput only holds the pubkey
+# hash, so the key is assumed compressed unless the caller says otherwise.
+
+# Version and lock_time, as uint32 (4 bytes each):
+TX_OVERHEAD = 4 + 4
+
+# Previous tx ID (32 bytes), output index (4 bytes) and sequence number (4 bytes):
+INPUT_OVERHEAD = 32 + 4 + 4
+
+# Amount, as uint64 (8 bytes):
+OUTPUT_OVERHEAD = 8
+
+# Low-S DER signatures (which PrivateKey.sign produces) take at most 71 bytes,
+# plus the sighash type byte:
+MAX_SIGNATURE_SIZE = 71 + 1
+
+COMPRESSED_PUBKEY_SIZE   = 33
+UNCOMPRESSED_PUBKEY_SIZE = 65
+
+
+def varint_size(integer):
+    if integer < 253:
+        return 1
+    elif integer <= 0xFFFF:
+        return 3
+    elif integer <= 0xFFFFFFFF:
+        return 5
+    else:
+        return 9
+
+
+def push_size(length):
+    # Size of the smallest instruction that pushes `length` bytes:
+    if length < 76:
+        return 1 + length
+    elif length <= 0xFF:
+        return 2 + length
+    elif length <= 0xFFFF:
+        return 3 + length
+    else:
+        return 5 + length
+
+
+def script_field_size(script_size):
+    return varint_size(script_size) + script_size
+
+
+# <signature> <pubkey>
+ADDRESS_INPUT_SIZE = INPUT_OVERHEAD + script_field_size(push_size(MAX_SIGNATURE_SIZE) + push_size(COMPRESSED_PUBKEY_SIZE))
+UNCOMPRESSED_ADDRESS_INPUT_SIZE = INPUT_OVERHEAD + script_field_size(push_size(MAX_SIGNATURE_SIZE) + push_size(UNCOMPRESSED_PUBKEY_SIZE))
+
+# OP_DUP OP_HASH160 <20 bytes> OP_EQUALVERIFY OP_CHECKSIG
+ADDRESS_OUTPUT_SIZE = OUTPUT_OVERHEAD + script_field_size(25)
+
+# OP_HASH160 <20 bytes> OP_EQUAL
+SCRIPT_OUTPUT_SIZE = OUTPUT_OVERHEAD + script_field_size(23)
+
+
+def output_size(output):
+    # Output types don't pin down their Script (MultisigOutput carries the
+    # bare redeem Script), so it's always measured:
+    return OUTPUT_OVERHEAD + script_field_size(output.script.size())
+
+
+def input_size(input, signatures = None, compressed = True):
+    """
+    Estimated serialized size of `input` once signed, an upper bound when the
+    assumptions below hold.
+
+    AddressInputs are assumed to be signed by a compressed key, as PrivateKeys
+    are by default. Pass `compressed = False` for uncompressed keys, which take
+    32 more bytes (the estimate would fall short otherwise). ScriptInputs need the number of `signatures` they'll
+    carry, unless their Script is a RedeemMultisig. Inputs of other types are
+    taken as already signed, and measured exactly.
+    """
+    if isinstance(input, AddressInput):
+        return ADDRESS_INPUT_SIZE if compressed else UNCOMPRESSED_ADDRESS_INPUT_SIZE
+
+    if isinstance(input, ScriptInput):
+        if signatures is None:
+            if not isinstance(input.script, RedeemMultisig):
+                raise UnknownInputType(input)
+
+            signatures = input.script.get_min_signatures()
+
+        # OP_0 <signature> ... <redeem script>
+        script_size = 1 + signatures * push_size(MAX_SIGNATURE_SIZE) + push_size(input.script.size())
+        return INPUT_OVERHEAD + script_field_size(script_size)
+
+    return INPUT_OVERHEAD + script_field_size(input.script.size())
+
+
+def transaction_size(inputs, outputs):
+    return (
+        TX_OVERHEAD +
+        varint_size(len(inputs)) + sum(input_size(i) for i in inputs) +
+        varint_size(len(outputs)) + sum(output_size(o) for o in outputs)
+    )
+
+
+def fee_for_size(size, fee_rate):
+    # Fee rates are in satoshis per byte, fees are rounded up:
+    return int(math.ceil(size * fee_rate))
+
+
+def estimate_fee(inputs, outputs, fee_rate):
+    return fee_for_size(transaction_size(inputs, outputs), fee_rate)
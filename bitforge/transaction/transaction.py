@@ -72,7 +72,7 @@ class Transaction(BaseTransaction):
         # Transaction lock time, as little-endian uint32 (4 bytes):
         buffer.write(encode_int(self.lock_time, length = 4, big_endian = False))
 
-        return str(buffer)
+        return bytes(buffer)
 
     def to_hex(self):
         return encode_hex(self.to_bytes()).decode('utf-8')
@@ -134,8 +134,11 @@ class Transaction(BaseTransaction):
 
     @staticmethod
     def from_bytes(bytes):
-        buffer = Buffer(bytes)
+        return Transaction.from_buffer(Buffer(bytes))
 
+    @staticmethod
+    def from_buffer(buffer):
+        # Inverse operation of Transaction.to_bytes(), check that out.
         version = decode_int(buffer.read(4), big_endian = False)
 
         ninputs = buffer.read_varint()
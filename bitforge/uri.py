@@ -16,6 +16,10 @@ class URI(object):
     @staticmethod
     def is_valid(uri):
         try:
+            # Rule out bad addresses first, without raising (and catching) an error:
+            if isinstance(uri, string_types) and not Address.is_valid(URI.parse(uri)['address']):
+                return False
+
             URI(uri)
             return True
         except (ValueError, BitforgeError):
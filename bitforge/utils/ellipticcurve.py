@@ -78,6 +78,17 @@ class Point( object ):
     if self.__curve and not self.__curve.contains_point( x, y ):
       raise NoSuchPointError('({},{}) is not on the curve {}'.format(x, y, curve))
     if order: assert self * order == INFINITY
+
+  @classmethod
+  def trusted( cls, curve, x, y, order = None ):
+    """A Point known to be valid, because it comes from our own arithmetic
+       on valid points: the checks done by the constructor are skipped."""
+    point = cls.__new__( cls )
+    point.__curve = curve
+    point.__x = x
+    point.__y = y
+    point.__order = order
+    return point
  
   def __eq__( self, other ):
     """Return 1 if the points are identical, 0 otherwise."""
@@ -110,7 +121,7 @@ class Point( object ):
     x3 = ( l * l - self.__x - other.__x ) % p
     y3 = ( l * ( self.__x - x3 ) - self.__y ) % p
     
-    return Point( self.__curve, x3, y3 )
+    return Point.trusted( self.__curve, x3, y3 )
 
   def __mul__( self, other ):
     """Multiply a point by an integer."""
@@ -130,7 +141,7 @@ class Point( object ):
     # From X9.62 D.3.2:
 
     e3 = 3 * e
-    negative_self = Point( self.__curve, self.__x, -self.__y, self.__order )
+    negative_self = Point.trusted( self.__curve, self.__x, -self.__y, self.__order )
     i = leftmost_bit( e3 ) // 2
     result = self
     # print "Multiplying %s by %d (e3 = %d):" % ( self, other, e3 )
@@ -172,7 +183,7 @@ class Point( object ):
     x3 = ( l * l - 2 * self.__x ) % p
     y3 = ( l * ( self.__x - x3 ) - self.__y ) % p
     
-    return Point( self.__curve, x3, y3 )
+    return Point.trusted( self.__curve, x3, y3 )
 
   def x( self ):
     return self.__x
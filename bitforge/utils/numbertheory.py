@@ -39,6 +39,14 @@ def modular_sqrt(a, p):
     runs in polynomial time (unless the
     generalized Riemann hypothesis is false).
     """
+    # When p = 3 (mod 4), as for secp256k1, the root is a single exponentiation.
+    # Squaring it back tells whether one exists, cheaper than the Legendre
+    # symbol (another exponentiation):
+    #
+    if p % 4 == 3:
+        x = pow(a, (p + 1) // 4, p)
+        return x if (x * x - a) % p == 0 else 0
+
     # Simple cases
     #
     if legendre_symbol(a, p) != 1:
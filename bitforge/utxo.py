@@ -0,0 +1,326 @@
+from __future__ import unicode_literals
+import array
+import mmap
+import struct
+import sys
+
+from bitforge.encoding import *
+from bitforge.errors import *
+from bitforge.tools import Buffer
+from bitforge.script import Script
+from bitforge.transaction import Output
+
+
+# Compressed script formats, same as Bitcoin Core's ScriptCompression:
+#   0x00 + 20 bytes        Pay-to-Pubkey-Hash (the pubkey hash)
+#   0x01 + 20 bytes        Pay-to-Script-Hash (the script hash)
+#   varint(size + 6) + ?   anything else, raw
+# Core reserves 0x02 to 0x05 for Pay-to-Pubkey scripts, we store those raw.
+COMPRESSED_P2PKH = 0x00
+COMPRESSED_P2SH  = 0x01
+SPECIAL_SCRIPTS  = 6
+
+P2PKH_PREFIX = b'\x76\xa9\x14' # OP_DUP OP_HASH160 <20 bytes>
+P2PKH_SUFFIX = b'\x88\xac'     # OP_EQUALVERIFY OP_CHECKSIG
+P2SH_PREFIX  = b'\xa9\x14'     # OP_HASH160 <20 bytes>
+P2SH_SUFFIX  = b'\x87'         # OP_EQUAL
+
+NULL_TX_ID = b'\0' * 32 # previous output of coinbase Inputs
+
+MAX_SCRIPT_SIZE = 10000 # larger scripts fail to execute, their outputs are unspendable
+
+SNAPSHOT_MAGIC  = b'BFUTXO01'
+SNAPSHOT_HEADER = struct.Struct(str('<8s2sQQ')) # magic, byte order, count, heap size
+
+
+def compress_script(script):
+    raw = script.to_bytes()
+
+    # Only the exact canonical bytes can be rebuilt from the hash, not the same
+    # template with a non-minimal push (such as OP_PUSHDATA1 of 19 bytes):
+    if len(raw) == 25 and raw[:3] == P2PKH_PREFIX and raw[23:] == P2PKH_SUFFIX:
+        return chr(COMPRESSED_P2PKH) + raw[3:23]
+
+    if len(raw) == 23 and raw[:2] == P2SH_PREFIX and raw[22:] == P2SH_SUFFIX:
+        return chr(COMPRESSED_P2SH) + raw[2:22]
+
+    return encode_varint(len(raw) + SPECIAL_SCRIPTS) + raw
+
+
+def decompress_script(data):
+    kind = bytearray(data[:1])[0]
+
+    if kind == COMPRESSED_P2PKH:
+        return P2PKH_PREFIX + data[1:21] + P2PKH_SUFFIX
+
+    if kind == COMPRESSED_P2SH:
+        return P2SH_PREFIX + data[1:21] + P2SH_SUFFIX
+
+    buffer = Buffer(data)
+    size = buffer.read_varint() - SPECIAL_SCRIPTS
+
+    return bytes(buffer.read(size))
+
+
+def outpoint_key(tx_id, index):
+    # Transaction IDs are hex in display order, keys use the internal byte order:
+    return decode_hex(tx_id)[::-1] + encode_int(index, length = 4, big_endian = False)
+
+
+def is_unspendable(script_bytes):
+    # Outputs starting with OP_RETURN, or with scripts too large to execute, can
+    # never be spent, they aren't stored:
+    return script_bytes[:1] == b'\x6a' or len(script_bytes) > MAX_SCRIPT_SIZE
+
+
+class UTXOSet(object):
+    """
+    The set of unspent transaction outputs, keyed by (tx_id, index).
+
+    Each entry costs a dict slot and a 36-byte key plus a fixed 18 bytes in flat
+    arrays (amount, script offset and length). Scripts are compressed like
+    Bitcoin Core does, so standard outputs take 21 bytes of a shared heap. Space
+    left by spent outputs is reused once it dominates the heap.
+    """
+
+    class Error(BitforgeError):
+        pass
+
+    class MissingOutput(Error, KeyValueError):
+        "Output {value} of transaction {key} is not in the UTXOSet"
+
+    class DuplicateOutput(Error, KeyValueError):
+        "Output {value} of transaction {key} is already in the UTXOSet"
+
+    class DuplicateInput(Error, KeyValueError):
+        "Output {value} of transaction {key} is spent twice by the same transaction"
+
+    class UnspendableOutput(Error, KeyValueError):
+        "Output {value} of transaction {key} is unspendable, it can't be added to the UTXOSet"
+
+    class InvalidSnapshot(Error, StringError):
+        "The file {string} is not a UTXOSet snapshot for this platform"
+
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.slots   = {} # outpoint key -> index in the arrays below
+        self.free    = [] # slots left by spent outputs, reused first
+        self.amounts = array.array('q')
+        self.offsets = array.array('Q')
+        self.lengths = array.array('H')
+        self.heap    = bytearray()
+        self.garbage = 0  # heap bytes belonging to spent outputs
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, outpoint):
+        return outpoint_key(*outpoint) in self.slots
+
+    def add(self, tx_id, index, output):
+        if is_unspendable(output.script.to_bytes()):
+            raise UTXOSet.UnspendableOutput(tx_id, index)
+
+        self.add_compressed(outpoint_key(tx_id, index), output.amount, compress_script(output.script))
+
+    def get(self, tx_id, index):
+        slot = self.slots.get(outpoint_key(tx_id, index))
+        return None if slot is None else self.get_output(slot)
+
+    def spend(self, tx_id, index):
+        key = outpoint_key(tx_id, index)
+
+        if key not in self.slots:
+            raise UTXOSet.MissingOutput(tx_id, index)
+
+        return self.remove(key)
+
+    def apply(self, tx):
+        """
+        Spend the outputs referenced by `tx` Inputs, and add its own outputs.
+        Returns the spent Outputs, in Input order, to pass to undo(). If any
+        referenced output is missing or spent twice, or an output is already
+        in the set, raises and changes nothing.
+        """
+        keys   = []
+        unique = set()
+
+        for input in tx.inputs:
+            key = outpoint_key(input.tx_id, input.txo_index)
+
+            if key[:32] == NULL_TX_ID:
+                keys.append(None) # coinbase, spends nothing
+            elif key in unique:
+                raise UTXOSet.DuplicateInput(input.tx_id, input.txo_index)
+            elif key in self.slots:
+                keys.append(key)
+                unique.add(key)
+            else:
+                raise UTXOSet.MissingOutput(input.tx_id, input.txo_index)
+
+        # Outputs are compressed before the set changes, so a failure leaves it intact:
+        tx_id_bytes = tx.get_id_bytes()
+        added       = []
+
+        for index, output in enumerate(tx.outputs):
+            if is_unspendable(output.script.to_bytes()):
+                continue
+
+            key = tx_id_bytes + encode_int(index, length = 4, big_endian = False)
+
+            if key in self.slots:
+                raise UTXOSet.DuplicateOutput(encode_hex(tx_id_bytes[::-1]), index)
+
+            added.append((key, output.amount, compress_script(output.script)))
+
+        spent = [ self.remove(key) if key is not None else None for key in keys ]
+
+        for key, amount, script in added:
+            self.add_compressed(key, amount, script)
+
+        return spent
+
+    def undo(self, tx, spent):
+        """
+        Revert apply(tx), given the spent Outputs it returned. Transactions must
+        be undone in the reverse order they were applied.
+        """
+        tx_id_bytes = tx.get_id_bytes()
+
+        for index, output in enumerate(tx.outputs):
+            key = tx_id_bytes + encode_int(index, length = 4, big_endian = False)
+
+            if key in self.slots:
+                self.remove(key)
+
+        for input, output in zip(tx.inputs, spent):
+            if output is not None:
+                key = outpoint_key(input.tx_id, input.txo_index)
+                self.add_compressed(key, output.amount, compress_script(output.script))
+
+    def add_compressed(self, key, amount, script):
+        if key in self.slots:
+            raise UTXOSet.DuplicateOutput(encode_hex(key[31::-1]), decode_int(key[32:], big_endian = False))
+
+        offset = len(self.heap)
+        self.heap += script
+
+        if self.free:
+            slot = self.free.pop()
+            self.amounts[slot] = amount
+            self.offsets[slot] = offset
+            self.lengths[slot] = len(script)
+        else:
+            slot = len(self.amounts)
+            self.amounts.append(amount)
+            self.offsets.append(offset)
+            self.lengths.append(len(script))
+
+        self.slots[key] = slot
+
+    def remove(self, key):
+        slot = self.slots.pop(key)
+        output = self.get_output(slot)
+
+        self.free.append(slot)
+        self.garbage += self.lengths[slot]
+
+        if self.garbage > len(self.heap) // 2:
+            self.compact()
+
+        return output
+
+    def get_script_bytes(self, slot):
+        offset = self.offsets[slot]
+        return decompress_script(bytes(self.heap[offset : offset + self.lengths[slot]]))
+
+    def get_output(self, slot):
+        return Output(self.amounts[slot], Script.from_bytes(self.get_script_bytes(slot)))
+
+    def compact(self):
+        # Rewrite the heap with live scripts only:
+        heap = bytearray()
+
+        for slot in self.slots.values():
+            offset = self.offsets[slot]
+            self.offsets[slot] = len(heap)
+            heap += self.heap[offset : offset + self.lengths[slot]]
+
+        self.heap = heap
+        self.garbage = 0
+
+    def snapshot(self, path):
+        """
+        Write the set to `path`, in a layout restore() can load straight from a
+        memory map: a header, then every key, amount and script length in
+        arrays, then the compressed scripts back to back.
+        """
+        items   = sorted(self.slots.items())
+        amounts = array.array('q', (self.amounts[slot] for key, slot in items))
+        lengths = array.array('H', (self.lengths[slot] for key, slot in items))
+
+        heap_size = sum(lengths)
+        byteorder = b'le' if sys.byteorder == 'little' else b'be'
+
+        with open(path, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, byteorder, len(items), heap_size))
+
+            for key, slot in items:
+                f.write(key)
+
+            f.write(amounts.tobytes())
+            f.write(lengths.tobytes())
+
+            for key, slot in items:
+                offset = self.offsets[slot]
+                f.write(self.heap[offset : offset + self.lengths[slot]])
+
+    @staticmethod
+    def restore(path):
+        utxos = UTXOSet()
+
+        with open(path, 'rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            except ValueError:
+                raise UTXOSet.InvalidSnapshot(path) # empty file
+
+        try:
+            if len(data) < SNAPSHOT_HEADER.size:
+                raise UTXOSet.InvalidSnapshot(path)
+
+            magic, byteorder, count, heap_size = SNAPSHOT_HEADER.unpack_from(data, 0)
+            expected_byteorder = b'le' if sys.byteorder == 'little' else b'be'
+
+            if magic != SNAPSHOT_MAGIC or byteorder != expected_byteorder:
+                raise UTXOSet.InvalidSnapshot(path)
+
+            keys_at    = SNAPSHOT_HEADER.size
+            amounts_at = keys_at + 36 * count
+            lengths_at = amounts_at + 8 * count
+            heap_at    = lengths_at + 2 * count
+
+            if len(data) != heap_at + heap_size:
+                raise UTXOSet.InvalidSnapshot(path)
+
+            utxos.amounts.frombytes(data[amounts_at : lengths_at])
+            utxos.lengths.frombytes(data[lengths_at : heap_at])
+            utxos.heap = bytearray(data[heap_at:])
+
+            offset  = 0
+            offsets = utxos.offsets
+            for length in utxos.lengths:
+                offsets.append(offset)
+                offset += length
+
+            utxos.slots = dict(
+                (data[keys_at + 36 * i : keys_at + 36 * (i + 1)], i) for i in range(count)
+            )
+
+        finally:
+            data.close()
+
+        return utxos
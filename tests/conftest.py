@@ -0,0 +1,6 @@
+import sys
+
+
+# Peer connections use async/await and asyncio.get_running_loop(), which need
+# Python 3.7. Message encoding is tested everywhere (test_bloom covers some):
+collect_ignore = [ 'test_p2p.py' ] if sys.version_info < (3, 7) else []
@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+
+from pytest import raises
+
+from bitforge.script import Script, Bytecode
+from bitforge.script.opcode import *
+from bitforge.tools import Buffer
+
+
+class TestBytecode:
+
+    def test_from_bytes(self):
+        script = Script.compile([ OP_DUP, OP_HASH160, b'a' * 20, OP_EQUALVERIFY, OP_CHECKSIG ])
+        code = Bytecode.from_bytes(script.to_bytes())
+
+        assert code.size() == 5
+        assert list(code.opcodes) == [ OP_DUP.number, OP_HASH160.number, 20, OP_EQUALVERIFY.number, OP_CHECKSIG.number ]
+        assert list(code.positions) == [ 0, 1, 2, 23, 24 ]
+        assert code.get_data(2) == b'a' * 20
+        assert code.get_data(0) == b''
+        assert code.get_opcode(3) == OP_EQUALVERIFY
+
+    def test_var_pushes(self):
+        code = Bytecode.from_bytes(OP_PUSHDATA2.bytes + b'\3\0' + b'abc' + OP_1.bytes)
+
+        assert code.size() == 2
+        assert code.get_data(0) == b'abc'
+        assert code.get_subscript_bytes(1) == OP_1.bytes
+        assert code.get_subscript_bytes(2) == b''
+
+    def test_truncated(self):
+        with raises(Buffer.InsufficientData):
+            Bytecode.from_bytes(b'\3ab')
+
+        with raises(Buffer.InsufficientData):
+            Bytecode.from_bytes(OP_PUSHDATA2.bytes + b'\3')
+
+    def test_cached(self):
+        script = Script.compile([ OP_1, OP_2, OP_ADD ])
+
+        assert Bytecode.for_script(script) is Bytecode.for_script(Script(script.instructions))
+        assert script.to_bytecode() is Bytecode.for_bytes(bytearray(script.to_bytes()))
+
+    def test_is_minimal_push(self):
+        minimal = Bytecode.from_bytes(b'\0' + b'\1\x11' + b'\2ab')
+        assert all(minimal.is_minimal_push(pc) for pc in range(minimal.size()))
+
+        code = Bytecode.from_bytes(
+            b'\1\5' +                          # should be OP_5
+            b'\1\x81' +                        # should be OP_1NEGATE
+            OP_PUSHDATA1.bytes + b'\2ab' +     # should be a direct push
+            OP_PUSHDATA1.bytes + b'\0'         # should be OP_0
+        )
+        assert not any(code.is_minimal_push(pc) for pc in range(code.size()))
@@ -5,6 +5,9 @@ from bitforge.pubkey import PublicKey
 from bitforge.script import Interpreter, Script
 from bitforge.encoding import encode_int, decode_hex, encode_script_number
 from bitforge.script.opcode import *
+from bitforge.script.tracer import StreamTracer, Profiler
+from bitforge.script.cache import VerificationCache
+from bitforge.transaction import Transaction, Input, Output
 
 
 class TestInterpreter:
@@ -54,7 +57,136 @@ class TestInterpreter:
         verified = interpreter.verify(Script.compile([OP_0]), Script.compile([OP_IF, OP_VERIFY, OP_ELSE, OP_1, OP_ENDIF]))
         assert verified is True
 
+    def test_tracer(self):
+        steps = []
+        interpreter = Interpreter(tracer = lambda *args: steps.append(args))
 
+        verified = interpreter.verify(Script.compile([OP_1]), Script.compile([OP_15, OP_ADD, OP_16, OP_EQUAL]))
+        assert verified is True
+
+        assert [ (pc, opcode, depth) for pc, opcode, depth, elapsed in steps ] == [
+            (0, OP_1, 1),
+            (0, OP_15, 2),
+            (1, OP_ADD, 1),
+            (2, OP_16, 2),
+            (3, OP_EQUAL, 1),
+        ]
+        assert all(elapsed >= 0 for pc, opcode, depth, elapsed in steps)
+
+    def test_profiler(self):
+        profiler = Profiler()
+        interpreter = Interpreter(tracer = profiler)
+
+        for i in range(3):
+            interpreter.verify(Script.compile([OP_1, OP_1]), Script.compile([OP_ADD, OP_2, OP_EQUAL]))
+
+        stats = dict((s.opcode, s) for s in profiler.get_stats())
+
+        assert stats[OP_1].count == 6
+        assert stats[OP_ADD].count == 3
+        assert stats[OP_EQUAL].count == 3
+        assert 'OP_ADD' in profiler.report()
+
+        profiler.reset()
+        assert profiler.get_stats() == []
+
+    def test_stream_tracer(self):
+        class Stream(list):
+            write = list.append
+
+        stream = Stream()
+        Interpreter(tracer = StreamTracer(stream)).verify(Script.compile([OP_1]), Script.compile([OP_DUP, OP_NOP]))
+
+        assert len(stream) == 3
+        assert 'OP_DUP' in stream[1]
+
+
+
+    def test_cache(self):
+        steps = []
+        cache = VerificationCache(capacity = 2)
+        interpreter = Interpreter(tracer = lambda *args: steps.append(args), cache = cache)
+
+        script_sig = Script.compile([OP_1])
+        script_pubkey = Script.compile([OP_1, OP_EQUAL])
+        tx = Transaction([ Input('00' * 32, 0, script_sig), Input('11' * 32, 0, script_sig) ], [ Output(0, Script()) ])
+
+        assert interpreter.verify(script_sig, script_pubkey, tx) is True
+        assert len(cache) == 1
+        executed = len(steps)
+
+        assert interpreter.verify(script_sig, script_pubkey, tx) is True
+        assert len(steps) == executed # answered from the cache
+
+        # Different flags, script or input index are different spends:
+        assert interpreter.verify(script_sig, script_pubkey, tx, flags = Interpreter.SCRIPT_VERIFY_NULLDUMMY) is True
+        assert interpreter.verify(script_sig, Script.compile([OP_2, OP_EQUAL]), tx) is False
+        assert len(steps) > executed
+        assert len(cache) == 2
+
+        # Bounded, failures not cached:
+        assert interpreter.verify(script_sig, Script.compile([OP_DUP, OP_EQUAL]), tx, nin = 1) is True
+        assert len(cache) == 2
+
+    def test_cache_script_sig(self):
+        cache = VerificationCache()
+        interpreter = Interpreter(cache = cache)
+
+        script_pubkey = Script.compile([OP_1, OP_EQUAL])
+        tx = Transaction([ Input('00' * 32, 0, Script()) ], [ Output(0, Script()) ])
+
+        assert interpreter.verify(Script.compile([OP_1]), script_pubkey, tx) is True
+        assert len(cache) == 1
+
+        # Same transaction, input and scriptPubkey, another scriptSig:
+        assert interpreter.verify(Script.compile([OP_2]), script_pubkey, tx) is False
+        assert interpreter.errstr != ''
+
+        # A cache hit doesn't show the state of the failed run:
+        assert interpreter.verify(Script.compile([OP_1]), script_pubkey, tx) is True
+        assert interpreter.errstr == '' and interpreter.stack == []
+
+        with raises(ValueError):
+            interpreter.verify(Script.compile([OP_1]), script_pubkey, tx, nin = 1)
+
+    def test_cache_without_tx(self):
+        cache = VerificationCache()
+        interpreter = Interpreter(cache = cache)
+
+        assert interpreter.verify(Script.compile([OP_1]), Script.compile([OP_1])) is True
+        assert len(cache) == 0
+
+    def test_verify_transaction(self):
+        script_sig = Script.compile([OP_1])
+        tx = Transaction([ Input('00' * 32, 0, script_sig), Input('11' * 32, 0, script_sig) ], [ Output(0, Script()) ])
+        interpreter = Interpreter(cache = VerificationCache())
+
+        assert interpreter.verify_transaction(tx, [ Script.compile([OP_1, OP_EQUAL]) ] * 2) is True
+        assert interpreter.verify_transaction(tx, [ Script.compile([OP_1, OP_EQUAL]), Script.compile([OP_0]) ]) is False
+
+        with raises(ValueError):
+            interpreter.verify_transaction(tx, [])
+
+    def test_verify_transaction_id_once(self):
+        ids = []
+
+        class CountingTransaction(Transaction):
+            def get_id_bytes(self):
+                ids.append(self)
+                return Transaction.get_id_bytes(self)
+
+        script_sig = Script.compile([OP_1])
+        tx = CountingTransaction([ Input('%064x' % i, 0, script_sig) for i in range(5) ], [ Output(0, Script()) ])
+        interpreter = Interpreter(cache = VerificationCache())
+
+        assert interpreter.verify_transaction(tx, [ Script.compile([OP_1, OP_EQUAL]) ] * 5) is True
+        assert len(ids) == 1
+
+    def test_input_index_without_cache(self):
+        tx = Transaction([ Input('00' * 32, 0, Script()) ], [ Output(0, Script()) ])
+
+        with raises(ValueError):
+            Interpreter().verify(Script.compile([OP_1]), Script.compile([OP_1]), tx, nin = 1)
 
     # def test_from_hex_errors(self):
     #     with raises(PublicKey.InvalidHex): PublicKey.from_hex('a')
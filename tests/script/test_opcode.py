@@ -1,4 +1,5 @@
 from __future__ import unicode_literals
+import pickle
 
 from pytest import raises
 
@@ -14,6 +15,18 @@ class TestOpcode:
         with raises(Opcode.UnknownOpcodeNumber):
             Opcode(256)
 
+        with raises(Opcode.UnknownOpcodeNumber):
+            Opcode(-1)
+
+    def test_interned(self):
+        assert Opcode(80) is OP_RESERVED
+        assert Opcode(10) is Opcode.const_push_for(10)
+        assert Opcode(0) is OP_FALSE is OP_0
+        assert len(set(Opcode(n) for n in range(256))) == 256
+
+    def test_pickle(self):
+        assert pickle.loads(pickle.dumps(OP_CHECKSIG)) is OP_CHECKSIG
+
     def test_name(self):
         assert Opcode.const_push_for(3).name == '_PUSH_3_BYTES'
         assert OP_0.name == 'OP_0'
@@ -62,7 +75,12 @@ class TestOpcode:
         with raises(Opcode.UnknownOpcodeName):
             Opcode.from_name('OP_FOO')
 
+        with raises(Opcode.UnknownOpcodeName):
+            Opcode.from_name('CHECKSIG')
+
         assert Opcode.from_name('OP_1') == OP_1
+        assert Opcode.from_name('OP_TRUE') is OP_1
+        assert Opcode.from_name('OP_CHECKSIG') is OP_CHECKSIG
 
     def test_const_push_for(self):
         with raises(Opcode.InvalidConstPushLength):
@@ -1,10 +1,12 @@
-import pytest, inspect
+import pytest, inspect, copy
 from pytest import raises, fixture, fail
 
 from bitforge.script import *
-from bitforge.script.script import SCRIPT_SUBCLASSES
+from bitforge.script.script import SCRIPT_SUBCLASSES, SCRIPT_TEMPLATES
+from bitforge.script.template import TemplateIndex, PUSH, PUSHES, NUMBER
 from bitforge.script.opcode import *
 import bitforge.script.opcode as opcode_module
+import bitforge.script.script as script_module
 from bitforge.encoding import *
 from bitforge.tools import Buffer
 from bitforge import Address, PrivateKey
@@ -227,3 +229,54 @@ class TestScript:
 
             assert Script.classify(special) == Script.classify(generic) == cls
             assert isinstance(Script.create(special.instructions), cls)
+
+    def test_structure_cached(self):
+        script = Script.compile([ OP_HASH160, b'a' * 20, OP_EQUAL ])
+
+        assert script.get_structure() == (OP_HASH160, 'PUSH', OP_EQUAL)
+        assert script.get_structure() is script.get_structure()
+        assert isinstance(script, PayToScriptOut)
+
+    def test_classify_multisig(self):
+        pubkey = PrivateKey().to_public_key().to_bytes()
+
+        assert Script.classify(Script.compile([ OP_1, pubkey, OP_1, OP_CHECKMULTISIG ])) is RedeemMultisig
+        assert Script.classify(Script.compile([ OP_2, pubkey, pubkey, pubkey, OP_3, OP_CHECKMULTISIG ])) is RedeemMultisig
+        assert Script.classify(Script.compile([ OP_1, OP_1, OP_CHECKMULTISIG ])) is None
+        assert Script.classify(Script.compile([ pubkey, pubkey, OP_1, OP_CHECKMULTISIG ])) is None
+        assert Script.classify(Script.compile([ OP_1, pubkey, OP_DUP, OP_CHECKMULTISIG ])) is None
+
+    def test_classify_unknown(self):
+        assert Script.classify(Script()) is None
+        assert Script.classify(Script.compile([ OP_0, b'foo' ])) is None
+        assert not isinstance(Script.create(Script.compile([ OP_1 ]).instructions), tuple(SCRIPT_SUBCLASSES))
+
+    def test_register_template(self, monkeypatch):
+        # Register on a copy, so other tests see the standard templates only:
+        monkeypatch.setattr(script_module, 'SCRIPT_TEMPLATES', copy.deepcopy(SCRIPT_TEMPLATES))
+
+        class HashLock(Script):
+            pass
+
+        Script.register_template((OP_SHA256, PUSH, OP_EQUAL), HashLock)
+        Script.register_template((OP_RETURN, PUSH), HashLock) # shadowed by OpReturnOut
+
+        script = Script.compile([ OP_SHA256, b'a' * 32, OP_EQUAL ])
+
+        assert isinstance(script, HashLock)
+        assert HashLock.is_valid(script)
+        assert Script.classify(OpReturnOut.create(b'data')) is OpReturnOut
+
+
+class TestTemplateIndex:
+    def test_match(self):
+        index = TemplateIndex()
+        index.register((OP_DUP, PUSHES, NUMBER), 'a')
+        index.register((OP_DUP, PUSH, OP_1), 'b')
+
+        assert index.match((OP_DUP, 'PUSH', OP_1)) == 'a'
+        assert index.match_all((OP_DUP, 'PUSH', OP_1)) == [ 'a', 'b' ]
+        assert index.match_all((OP_DUP, 'PUSH', 'PUSH', 'PUSH', OP_16)) == [ 'a' ]
+        assert index.match((OP_DUP, OP_16)) is None
+        assert index.match((OP_DUP, 'PUSH', OP_DUP)) is None
+        assert index.match(()) is None
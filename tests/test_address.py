@@ -102,3 +102,41 @@ class TestAddress:
             assert address.type == type
             assert address.to_string() == string_b58h
             assert encode_hex(address.phash) == string_hex.encode('utf-8')
+
+
+    def test_decode_many(self, valid_addresses):
+        strings = [ e[0] for e in valid_addresses ] + [ 'a', '', data['base58h'][:-1] + '1' ]
+        batch = Address.decode_many(strings)
+
+        assert batch.size() == len(strings)
+        assert list(batch.valid) == [ 1 ] * len(valid_addresses) + [ 0, 0, 0 ]
+
+        for i, (string_b58h, string_hex, network, type) in enumerate(valid_addresses):
+            assert batch.networks[i] is network
+            assert batch.types[i] == type
+            assert encode_hex(batch.get_hash(i)) == string_hex.encode('utf-8')
+            assert batch.get_address(i) == Address.from_string(string_b58h)
+
+        assert batch.networks[-1] is None
+        assert batch.get_hash(len(strings) - 1) == b'\0' * 20
+        assert batch.get_address(len(strings) - 1) is None
+
+    def test_validate_many(self):
+        wrong_version = encode_base58h(b'\x42' + b'\0' * 20)
+        wrong_length  = encode_base58h(b'\0' * 20)
+
+        valid = Address.validate_many([ data['base58h'], 'a@', wrong_version, wrong_length, data['base58h'] ])
+
+        assert valid == bytearray([ 1, 0, 0, 0, 1 ])
+
+    def test_is_valid(self):
+        assert Address.is_valid(data['base58h'])
+        assert not Address.is_valid('a@')
+        assert not Address.is_valid(encode_base58h(b'\x42' + b'\0' * 20))
+
+    def test_slots_and_hash(self):
+        address = Address.from_string(data['base58h'])
+
+        assert not hasattr(address, '__dict__')
+        assert hash(address) == hash(Address.from_string(data['base58h']))
+        assert len(set([ address, Address.from_string(data['base58h']) ])) == 1
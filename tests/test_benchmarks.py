@@ -0,0 +1,51 @@
+from benchmarks.corpus import parse_script, parse_flags, load_tx_valid
+from benchmarks.runner import Result, compare, percentile
+from bitforge.encoding import decode_hex
+from bitforge.script import Interpreter
+
+
+def result(name, ops_per_sec):
+    return Result(name, 100, ops_per_sec, 0.1, 0.2, 0.3, None)
+
+
+class TestCorpus:
+    def test_parse_script(self):
+        assert parse_script('').to_bytes() == b''
+        assert parse_script('0 1 16 -1').to_bytes() == decode_hex('0051604f')
+        assert parse_script('DUP OP_HASH160').to_bytes() == decode_hex('76a9')
+        assert parse_script('0x4c 0x01 0x07').to_bytes() == decode_hex('4c0107')
+        assert parse_script('1000').to_bytes() == decode_hex('02e803')
+        assert parse_script("'ab'").to_bytes() == decode_hex('026162')
+
+    def test_parse_flags(self):
+        assert parse_flags('') == 0
+        assert parse_flags('P2SH,STRICTENC') == Interpreter.SCRIPT_VERIFY_P2SH | Interpreter.SCRIPT_VERIFY_STRICTENC
+
+    def test_load_tx_valid(self):
+        corpus = load_tx_valid()
+
+        assert len(corpus.transactions) > 0
+        assert len(corpus.spends) > 0
+
+        for spend in corpus.spends:
+            assert spend.tx.inputs[spend.nin].script == spend.script_sig
+
+
+class TestRunner:
+    def test_percentile(self):
+        values = list(range(101))
+
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([ 7 ], 0.9) == 7
+
+    def test_compare(self):
+        baseline = [ result('a', 1000.0), result('b', 1000.0), result('c', 1000.0) ]
+        current  = [ result('a', 950.0), result('b', 800.0), result('d', 10.0) ]
+
+        comparisons = compare(baseline, current, threshold = 0.1)
+
+        assert [ c.name for c in comparisons ] == [ 'a', 'b' ]
+        assert not comparisons[0].regressed
+        assert comparisons[1].regressed
+        assert abs(comparisons[1].change + 0.2) < 1e-9
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+from pytest import raises
+
+import bitforge
+
+
+def run_python(code):
+    return subprocess.check_output([ sys.executable, '-c', code ]).decode('ascii').strip()
+
+
+class TestLazyImports:
+    def test_import_is_lazy(self):
+        loaded = run_python(
+            "import sys, bitforge; "
+            "print(','.join(m for m in ('ecdsa', 'bitforge.privkey', 'bitforge.script') if m in sys.modules))"
+        )
+
+        assert loaded == ''
+
+    def test_ecdsa_loaded_on_sign(self):
+        loaded = run_python(
+            "import sys, bitforge; "
+            "key = bitforge.PrivateKey(1); print('ecdsa' in sys.modules); "
+            "key.sign(b'0' * 32); print('ecdsa' in sys.modules)"
+        )
+
+        assert loaded.split() == [ 'False', 'True' ]
+
+    def test_public_names(self):
+        from bitforge.transaction import Transaction
+        from bitforge.script import Opcode
+
+        assert bitforge.Transaction is Transaction
+        assert bitforge.Opcode is Opcode
+        assert bitforge.networks.default is not None
+
+        for name in bitforge.__all__:
+            assert name in dir(bitforge)
+            assert getattr(bitforge, name) is not None
+
+    def test_unknown_name(self):
+        with raises(AttributeError):
+            bitforge.Nope
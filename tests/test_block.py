@@ -0,0 +1,195 @@
+import os
+import tempfile
+import shutil
+from pytest import raises, fixture
+
+from bitforge.encoding import encode_int
+from bitforge.block import *
+
+
+block1 = BlockHeader.from_hex(
+    '010000006fe28c0ab6f1b372c1a6a246ae63f74f931e8365e15a089c68d6190000000000'
+    '982051fd1e4ba744bbbe680e1fee14677ba1a3c3540bf7b1cdb606e857233e0e61bc6649'
+    'ffff001d01e36299'
+)
+
+REGTEST_BITS = 0x207fffff
+regtest_genesis = BlockHeader(1, NULL_HASH, NULL_HASH, 1296688602, REGTEST_BITS, 2)
+
+
+def mine(parent, count, tag = 0):
+    # Regtest targets accept about half of all hashes:
+    headers = []
+    prev = parent.get_id_bytes()
+
+    for i in range(count):
+        header = BlockHeader(1, prev, encode_int(tag, length = 32), 1296688603 + i, REGTEST_BITS, 0)
+
+        while not header.check_pow():
+            header = header._replace(nonce = header.nonce + 1)
+
+        headers.append(header)
+        prev = header.get_id_bytes()
+
+    return headers
+
+
+@fixture
+def tempdir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path)
+
+
+class TestBlockHeader:
+    def test_genesis(self):
+        genesis = GENESIS['livenet']
+
+        assert genesis.get_id() == '000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f'
+        assert genesis.check_pow()
+        assert genesis.get_difficulty() == 1
+
+    def test_from_bytes(self):
+        assert block1.to_hex() == BlockHeader.from_bytes(block1.to_bytes()).to_hex()
+        assert block1.get_id() == '00000000839a8e6886ab5951d76f411475428afc90947ee320161bbf18eb6048'
+        assert block1.prev_hash == GENESIS['livenet'].get_id_bytes()
+        assert block1.time == 1231469665
+
+        with raises(BlockHeader.InvalidSize):
+            BlockHeader.from_bytes(block1.to_bytes()[:79])
+
+    def test_bits(self):
+        assert bits_to_target(0x1d00ffff) == POW_LIMIT
+        assert bits_to_target(0x1b0404cb) == 0x0404cb * 2 ** (8 * (0x1b - 3))
+        assert bits_to_target(REGTEST_BITS) == REGTEST_POW_LIMIT
+
+        for bits in (0x1d00ffff, 0x1b0404cb, 0x207fffff, 0x03123456, 0x02008000):
+            assert target_to_bits(bits_to_target(bits)) == bits
+
+        for bits in (0, 0x04923456, 0xff123456):
+            with raises(InvalidBits):
+                bits_to_target(bits)
+
+    def test_work(self):
+        assert GENESIS['livenet'].get_work() == 0x100010001
+
+
+class TestHeaderChain:
+    def test_mainnet(self):
+        chain = HeaderChain(GENESIS['livenet'])
+
+        assert chain.add(block1) == 1
+        assert chain.add(block1) == 0 # already there
+        assert chain.get_height() == 1
+        assert chain.get_tip() == block1
+        assert chain.get_height_of(block1.get_id_bytes()) == 1
+        assert chain.get_work() == 2 * 0x100010001
+
+    def test_validation(self):
+        chain = HeaderChain(regtest_genesis, pow_limit = REGTEST_POW_LIMIT)
+        headers = mine(regtest_genesis, 3)
+
+        with raises(HeaderChain.UnknownParent):
+            chain.add_headers(headers[1:])
+
+        with raises(HeaderChain.BrokenLink):
+            chain.add_headers([ headers[0], headers[2] ])
+
+        bad = headers[0]
+        while bad.check_pow():
+            bad = bad._replace(nonce = bad.nonce + 1)
+
+        with raises(HeaderChain.InvalidProofOfWork):
+            chain.add(bad)
+
+        with raises(HeaderChain.TargetTooHigh):
+            HeaderChain(regtest_genesis).add(headers[0])
+
+        assert chain.get_height() == 0
+        assert chain.add_headers(headers) == 3
+        assert chain.get_tip() == headers[-1]
+
+    def test_fork(self):
+        chain = HeaderChain(regtest_genesis, pow_limit = REGTEST_POW_LIMIT)
+        main = mine(regtest_genesis, 5)
+        chain.add_headers(main)
+
+        # Less or equal work is kept aside, the tip stays:
+        assert chain.add_headers(mine(main[1], 3, tag = 1)) == 0
+        assert chain.get_tip() == main[-1]
+
+        # More work replaces the tail:
+        fork = mine(main[1], 4, tag = 2)
+        assert chain.add_headers(fork) == 4
+        assert chain.get_height() == 6
+        assert chain.get_tip() == fork[-1]
+        assert main[-1].get_id_bytes() not in chain
+        assert chain.get_work() == 7 * regtest_genesis.get_work()
+
+    def test_fork_in_batches(self):
+        chain = HeaderChain(regtest_genesis, pow_limit = REGTEST_POW_LIMIT)
+        main = mine(regtest_genesis, 10)
+        chain.add_headers(main)
+
+        # A fork from height 5, heavier only once its second batch arrives:
+        first  = mine(main[4], 3, tag = 1)
+        second = mine(first[-1], 3, tag = 1)
+
+        assert chain.add_headers(first) == 0
+        assert chain.get_tip() == main[-1]
+
+        assert chain.add_headers(second) == 6
+        assert chain.get_height() == 11
+        assert chain.get_tip() == second[-1]
+        assert chain.get(6) == first[0]
+        assert chain.get_work() == 12 * regtest_genesis.get_work()
+
+        # The replaced headers are kept, and win again with more work:
+        assert chain.add_headers(mine(main[-1], 2, tag = 2)) == 7
+        assert chain.get_height() == 12
+        assert chain.get(10) == main[-1]
+        assert first[0].get_id_bytes() not in chain
+
+    def test_reorg_one_header_at_a_time(self):
+        chain = HeaderChain(regtest_genesis, pow_limit = REGTEST_POW_LIMIT)
+        main = mine(regtest_genesis, 3)
+        chain.add_headers(main)
+
+        fork = mine(main[1], 1, tag = 1)
+        fork = fork + mine(fork[0], 1, tag = 1)
+
+        assert chain.add(fork[0]) == 0
+        assert chain.add(fork[1]) == 2
+        assert chain.get_tip() == fork[1]
+        assert chain.get_height_of(main[-1].get_id_bytes()) is None
+
+    def test_locator(self):
+        chain = HeaderChain(regtest_genesis, pow_limit = REGTEST_POW_LIMIT)
+        chain.add_headers(mine(regtest_genesis, 30))
+
+        heights = [ chain.get_height_of(hash) for hash in chain.get_locator() ]
+        assert heights == [ 30, 29, 28, 27, 26, 25, 24, 23, 22, 21, 19, 15, 7, 0 ]
+
+    def test_store(self, tempdir):
+        path = os.path.join(tempdir, 'headers')
+        headers = mine(regtest_genesis, 20)
+
+        with HeaderChain(regtest_genesis, path, REGTEST_POW_LIMIT) as chain:
+            chain.add_headers(headers[:10])
+            chain.add_headers(headers[10:])
+            work = chain.get_work()
+
+        with HeaderChain(regtest_genesis, path, REGTEST_POW_LIMIT) as chain:
+            assert chain.get_height() == 20
+            assert chain.get_work() == work
+            assert chain.get(7) == headers[6]
+            assert chain.get_height_of(headers[-1].get_id_bytes()) == 20
+
+        with raises(HeaderChain.GenesisMismatch):
+            HeaderChain(GENESIS['livenet'], path)
+
+        with open(path, 'wb') as f:
+            f.write(b'garbage')
+
+        with raises(HeaderChain.InvalidStore):
+            HeaderChain(regtest_genesis, path)
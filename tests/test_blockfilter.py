@@ -0,0 +1,100 @@
+import random
+
+from pytest import raises
+
+from bitforge import Address, Transaction, Script
+from bitforge.encoding import decode_hex, encode_hex
+from bitforge.transaction import AddressInput, AddressOutput, DataOutput, ScriptOutput
+from bitforge.utxo import UTXOSet
+from bitforge.blockfilter import *
+
+
+# Testnet genesis block, from the BIP158 test vectors:
+GENESIS_HASH   = decode_hex('000000000933ea01ad0ee984209779baaec3ced90fa3f408719526f8d77f4943')[::-1]
+GENESIS_SCRIPT = decode_hex(
+    '4104678afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f61deb649f6'
+    'bc3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac'
+)
+
+rng = random.Random(158)
+
+def random_bytes(length):
+    return bytes(bytearray(rng.getrandbits(8) for i in range(length)))
+
+def random_address():
+    return Address(random_bytes(20))
+
+
+def test_siphash():
+    # From the SipHash paper, key 00..0f and message 00..0e:
+    assert siphash(0x0706050403020100, 0x0F0E0D0C0B0A0908, bytes(bytearray(range(15)))) == 0xA129CA6149BE45E5
+
+
+class TestGCSFilter:
+    def test_genesis(self):
+        filter = GCSFilter.create(GENESIS_HASH, [ GENESIS_SCRIPT ])
+
+        assert filter.to_hex() == '019dfca8'
+        assert encode_hex(filter.get_header()[::-1]) == b'21584579b7eb08997773e5aeff3a7f932700042d0ed2a6129012b7d7ae81b750'
+        assert GCSFilter.from_hex(GENESIS_HASH, '019dfca8') == filter
+
+    def test_empty(self):
+        filter = GCSFilter.create(GENESIS_HASH, [])
+
+        assert filter.to_bytes() == b'\0'
+        assert not filter.match(GENESIS_SCRIPT)
+        assert list(filter.decode()) == []
+
+    def test_roundtrip(self):
+        elements = [ random_bytes(rng.randrange(20, 80)) for i in range(500) ]
+        filter   = GCSFilter.create(GENESIS_HASH, elements + elements[:10])
+        decoded  = GCSFilter.from_bytes(GENESIS_HASH, filter.to_bytes())
+
+        assert len(decoded) == 500
+        assert list(decoded.decode()) == sorted(filter.hash_elements(elements))
+
+    def test_match(self):
+        elements = [ random_bytes(25) for i in range(200) ]
+        others   = [ random_bytes(25) for i in range(1000) ]
+        filter   = GCSFilter.create(GENESIS_HASH, elements)
+
+        assert all(filter.match(element) for element in elements)
+        assert filter.match_any(others + elements[-1:])
+        assert not filter.match_any(others)
+
+        assert set(filter.get_matches(others + elements)) == set(elements)
+
+    def test_invalid(self):
+        with raises(GCSFilter.InvalidKey):
+            GCSFilter(b'short', 0, b'')
+
+        with raises(GCSFilter.InvalidFilter):
+            list(GCSFilter.from_hex(GENESIS_HASH, '029dfca8').decode())
+
+        # Items, but no data at all:
+        with raises(GCSFilter.InvalidFilter):
+            GCSFilter.from_hex(GENESIS_HASH, '01').match(b'element')
+
+
+def test_basic_filter():
+    utxos = UTXOSet()
+    funding = Transaction(
+        [ AddressInput.create('00' * 32, 0, random_address()) ],
+        [ AddressOutput.create(1000, random_address()), AddressOutput.create(2000, random_address()) ]
+    )
+    utxos.apply(funding)
+
+    tx_id = encode_hex(funding.get_id_bytes()[::-1]).decode('ascii')
+    spend = Transaction(
+        [ AddressInput.create(tx_id, 0, random_address()) ],
+        [ AddressOutput.create(900, random_address()), DataOutput.create(b'hello') ]
+    )
+    spent = utxos.apply(spend)
+
+    filter = basic_filter(GENESIS_HASH, [ spend ], spent)
+
+    assert len(filter) == 2
+    assert filter.match(spend.outputs[0].script.to_bytes())
+    assert filter.match(funding.outputs[0].script.to_bytes())
+    assert not filter.match(spend.outputs[1].script.to_bytes())
+    assert not filter.match(funding.outputs[1].script.to_bytes())
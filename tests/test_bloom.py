@@ -0,0 +1,151 @@
+from pytest import raises
+
+from bitforge import PrivateKey, Transaction, Script
+from bitforge.encoding import decode_hex, encode_hex
+from bitforge.transaction import AddressInput, AddressOutput, DataOutput
+from bitforge.script import PayToPubkeyIn
+from bitforge.block import GENESIS
+from bitforge.merkle import PartialMerkleTree
+from bitforge.p2p.messages import FilterLoad, MerkleBlock, encode_message, decode_message
+from bitforge.bloom import *
+
+
+privkeys  = [ PrivateKey(0xC0FFEE + i) for i in range(3) ]
+addresses = [ pk.to_address() for pk in privkeys ]
+
+
+def display_id(tx):
+    return encode_hex(tx.get_id_bytes()[::-1]).decode('ascii')
+
+def pay(address, tx_id = '%064x' % 1, index = 0):
+    return Transaction([ AddressInput.create(tx_id, index, addresses[2]) ], [ AddressOutput.create(1000, address) ])
+
+
+class TestMurmur3:
+    def test_vectors(self):
+        # From Bitcoin Core's hash_tests:
+        vectors = [
+            (0x00000000, 0x00000000, ''),
+            (0x6a396f08, 0xFBA4C795, ''),
+            (0x81F16F39, 0xffffffff, ''),
+            (0x514E28B7, 0x00000000, '00'),
+            (0xEA3F0B17, 0xFBA4C795, '00'),
+            (0xFD6CF10D, 0x00000000, 'ff'),
+            (0x16C6B7AB, 0x00000000, '0011'),
+            (0x8EB51C3D, 0x00000000, '001122'),
+            (0xB4471BF8, 0x00000000, '00112233'),
+            (0xE2301FA8, 0x00000000, '0011223344'),
+            (0xFC2E4A15, 0x00000000, '001122334455'),
+            (0xB074502C, 0x00000000, '00112233445566'),
+            (0x8034D2A0, 0x00000000, '0011223344556677'),
+            (0xB4698DEF, 0x00000000, '001122334455667788'),
+        ]
+
+        for expected, seed, data in vectors:
+            assert murmur3(decode_hex(data), seed) == expected
+
+
+class TestBloomFilter:
+    elements = [
+        '99108ad8ed9bb6274d3980bab5a85c048f0950c8',
+        'b5a2c786d9ef4658287ced5914b37a1b4aa32eee',
+        'b9300670b4c5366e95b2699e8b18bc75e5f729c5',
+    ]
+
+    def test_serialize(self):
+        # From Bitcoin Core's bloom_tests:
+        for tweak, expected in [ (0, '03614e9b050000000000000001'), (2147483649, '03ce4299050000000100008001') ]:
+            bloom = BloomFilter.create(3, 0.01, tweak, BLOOM_UPDATE_ALL)
+
+            for element in self.elements:
+                bloom.add(decode_hex(element))
+
+            assert bloom.to_hex() == expected
+            assert decode_hex(self.elements[0]) in bloom
+            assert decode_hex('19108ad8ed9bb6274d3980bab5a85c048f0950c8') not in bloom
+            assert BloomFilter.from_hex(expected).to_hex() == expected
+
+    def test_limits(self):
+        assert len(BloomFilter.create(10 ** 6, 0.0001).data) == MAX_FILTER_SIZE
+        assert len(BloomFilter.create(10 ** 6, 0.0001, max_size = None).data) > MAX_FILTER_SIZE
+
+        with raises(BloomFilter.InvalidFilter):
+            BloomFilter.from_bytes(BloomFilter(bytearray(1), 51).to_bytes())
+
+    def test_iter_pushes(self):
+        data = bytearray(b'\x01\xaa\x4c\x02\xbb\xbb\x4d\x01\x00\xcc\x76\x4e\x01\x00\x00\x00\xdd\x4c\x05\xee')
+        assert [ bytes(push) for push in iter_pushes(data, 0, len(data)) ] == [
+            b'\xaa', b'\xbb\xbb', b'\xcc', b'\xdd'
+        ]
+
+    def test_match_output(self):
+        bloom = BloomFilter.create(10, 0.0001)
+        bloom.add_address(addresses[0])
+
+        tx = pay(addresses[0])
+
+        assert bloom.match(tx)
+        assert not bloom.match(pay(addresses[1]))
+
+        # The matched output was added, so spending it matches too:
+        assert bloom.match(pay(addresses[1], display_id(tx), 0))
+        assert not bloom.match(pay(addresses[1], display_id(tx), 1))
+
+    def test_update_none(self):
+        bloom = BloomFilter.create(10, 0.0001, flags = BLOOM_UPDATE_NONE)
+        bloom.add_address(addresses[0])
+        tx = pay(addresses[0])
+
+        assert bloom.match(tx)
+        assert not bloom.match(pay(addresses[1], display_id(tx), 0))
+
+    def test_update_flags_mask(self):
+        # Bits above BLOOM_UPDATE_MASK don't change the update behavior:
+        bloom = BloomFilter.create(10, 0.0001, flags = BLOOM_UPDATE_ALL | 0x80)
+        bloom.add_address(addresses[0])
+        tx = pay(addresses[0])
+
+        assert bloom.match(tx)
+        assert bloom.match(pay(addresses[1], display_id(tx), 0))
+
+    def test_empty(self):
+        # A zero-length filter, which peers can send, matches everything:
+        bloom = BloomFilter.from_bytes(BloomFilter(b'', 3, 7).to_bytes())
+
+        assert b'anything' in bloom
+        assert bloom.match(pay(addresses[0]))
+
+        bloom.add(b'anything')
+        assert bloom.data == bytearray()
+
+    def test_match_input(self):
+        bloom = BloomFilter.create(10, 0.0001)
+        bloom.add_public_key(privkeys[2].to_public_key())
+
+        signed = pay(addresses[1]).sign([ privkeys[2] ], 0)
+        assert bloom.match(signed)
+
+        bloom = BloomFilter.create(10, 0.0001)
+        bloom.add_outpoint('%064x' % 1, 0)
+        assert bloom.match(pay(addresses[1]))
+
+    def test_match_id_and_script(self):
+        tx = Transaction([ AddressInput.create('%064x' % 1, 0, addresses[2]) ], [ DataOutput.create(b'hello') ])
+
+        bloom = BloomFilter.create(10, 0.0001)
+        bloom.add(tx.get_id_bytes())
+        assert bloom.match(tx)
+
+        bloom = BloomFilter.create(10, 0.0001)
+        bloom.add_script(tx.outputs[0].script)
+        assert bloom.match_bytes(tx.to_bytes())
+
+
+class TestMessages:
+    def test_roundtrip(self):
+        bloom = BloomFilter.create(3, 0.01)
+        tree  = PartialMerkleTree.create([ b'\1' * 32, b'\2' * 32 ], [ True, False ])
+
+        for message in [ FilterLoad(bloom), MerkleBlock(GENESIS['livenet'], tree) ]:
+            data = encode_message(message)
+            assert encode_message(decode_message(data)) == data
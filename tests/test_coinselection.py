@@ -0,0 +1,104 @@
+import random
+from pytest import raises
+
+from bitforge import PrivateKey
+from bitforge.encoding import encode_hex
+from bitforge.transaction import AddressInput, AddressOutput
+from bitforge.transaction.size import transaction_size
+from bitforge.coinselection import *
+
+
+privkey = PrivateKey(0xC0FFEE)
+address = privkey.to_address()
+change_script = AddressOutput.create(0, address).script
+
+
+def make_coins(amounts):
+    return [
+        Coin(AddressInput.create('%064x' % i, 0, address), amount)
+        for i, amount in enumerate(amounts)
+    ]
+
+
+class TestStrategies:
+    def test_branch_and_bound(self):
+        assert sorted(branch_and_bound([ 7000, 5000, 2000, 1000 ], 9000, 0)) == [ 0, 2 ]
+        assert sorted(branch_and_bound([ 7000, 5000, 2000, 1000 ], 8500, 600)) == [ 0, 2 ]
+        assert branch_and_bound([ 7000, 5000 ], 8000, 100) is None
+        assert branch_and_bound([ 1000 ], 2000, 100) is None
+
+    def test_branch_and_bound_tries(self):
+        values = sorted(random.Random(1).sample(range(1000, 10 ** 6), 200), reverse = True)
+        assert branch_and_bound(values, 10 ** 9, 0, max_tries = 10) is None
+
+    def test_knapsack(self):
+        rng = random.Random(1)
+
+        assert knapsack([ 5000, 3000, 2000 ], 3000, rng) == [ 1 ]
+        assert sorted(knapsack([ 5000, 3000, 2000, 100 ], 5100, rng)) == [ 0, 3 ]
+        assert knapsack([ 1000, 9000 ], 5000, rng) == [ 1 ]
+        assert knapsack([ 1000, 2000 ], 5000, rng) is None
+
+    def test_largest_first(self):
+        assert largest_first([ 1000, 5000, 3000 ], 7000) == [ 1, 2 ]
+        assert largest_first([ 1000, 5000 ], 7000) is None
+
+
+class TestSelectCoins:
+    def test_changeless(self):
+        coins = make_coins([ 1000, 2000, 5000, 7000 ])
+        selection = select_coins(coins, [ AddressOutput.create(9000, address) ], 0, change_script)
+
+        assert selection.strategy == 'branch_and_bound'
+        assert sorted(c.amount for c in selection.coins) == [ 2000, 7000 ]
+        assert selection.change == 0
+        assert selection.fee == 0
+
+    def test_change(self):
+        coins = make_coins([ 100000, 200000, 500000 ])
+        outputs = [ AddressOutput.create(250000, address) ]
+        selection = select_coins(coins, outputs, 10, change_script, rng = random.Random(1))
+
+        total_in = sum(c.amount for c in selection.coins)
+
+        assert selection.change > 0
+        assert len(selection.outputs) == 2
+        assert total_in == 250000 + selection.change + selection.fee
+
+        tx = selection.to_transaction()
+        for i in range(len(tx.inputs)):
+            tx = tx.sign([ privkey ], i)
+
+        # The fee pays for the signed size, which never exceeds the estimate:
+        assert len(tx.to_bytes()) <= transaction_size(selection.to_transaction().inputs, selection.outputs)
+        assert selection.fee >= 10 * len(tx.to_bytes())
+
+    def test_largest_first_only(self):
+        coins = make_coins([ 100000, 200000, 500000 ])
+        selection = select_coins(coins, [ AddressOutput.create(50000, address) ], 1, change_script, strategies = [ 'largest_first' ])
+
+        assert [ c.amount for c in selection.coins ] == [ 500000 ]
+
+    def test_dust_change_goes_to_fee(self):
+        coins = make_coins([ 10300 ])
+        selection = select_coins(coins, [ AddressOutput.create(10000, address) ], 0, change_script)
+
+        assert selection.change == 0
+        assert selection.fee == 300
+
+    def test_insufficient_funds(self):
+        with raises(InsufficientFunds):
+            select_coins(make_coins([ 1000, 2000 ]), [ AddressOutput.create(5000, address) ], 1, change_script)
+
+    def test_skips_uneconomic_coins(self):
+        coins = make_coins([ 100, 100000 ])
+        selection = select_coins(coins, [ AddressOutput.create(50000, address) ], 5, change_script)
+
+        assert [ c.amount for c in selection.coins ] == [ 100000 ]
+
+    def test_many_coins_fast(self):
+        rng = random.Random(7)
+        coins = make_coins([ rng.randrange(1000, 10 ** 7) for i in range(5000) ])
+        selection = select_coins(coins, [ AddressOutput.create(3 * 10 ** 8, address) ], 5, change_script, rng = rng)
+
+        assert sum(c.amount for c in selection.coins) >= 3 * 10 ** 8
@@ -0,0 +1,54 @@
+import hashlib
+import os
+
+from bitforge.encoding import *
+
+
+items = [ os.urandom(n) for n in (0, 1, 20, 33, 64, 65, 3000) ]
+
+def expected_hash160(data):
+    return hashlib.new('ripemd160', hashlib.sha256(data).digest()).digest()
+
+def expected_double_sha256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def test_hash160():
+    # The compressed public key of secret 1, and its address hash:
+    pubkey = decode_hex('0279be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798')
+    assert encode_hex(hash160(pubkey)) == b'751e76e8199196d454941c45d1b3a323f1433bd6'
+
+
+def test_double_sha256():
+    assert double_sha256(b'') == expected_double_sha256(b'')
+
+
+class TestBatches:
+    def test_sequence(self):
+        assert hash160_many(items) == [ expected_hash160(item) for item in items ]
+        assert double_sha256_many(items) == [ expected_double_sha256(item) for item in items ]
+
+    def test_offsets(self):
+        data    = b''.join(items)
+        offsets = [ 0 ]
+
+        for item in items:
+            offsets.append(offsets[-1] + len(item))
+
+        assert hash160_many(data, offsets) == hash160_many(items)
+        assert double_sha256_many(bytearray(data), offsets) == double_sha256_many(items)
+
+    def test_size(self):
+        records = [ os.urandom(33) for i in range(10) ]
+
+        assert hash160_many(b''.join(records), size = 33) == [ expected_hash160(record) for record in records ]
+
+    def test_workers(self):
+        many = items * 20
+
+        assert hash160_many(many, workers = 4) == hash160_many(many)
+        assert double_sha256_many(many, workers = 4) == double_sha256_many(many)
+
+    def test_empty(self):
+        assert hash160_many([]) == []
+        assert double_sha256_many(b'', [ 0 ]) == []
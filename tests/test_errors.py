@@ -0,0 +1,45 @@
+import pickle
+
+from bitforge.errors import *
+
+
+class CountedRepr(object):
+    calls = 0
+
+    def __len__(self):
+        return 3
+
+    def __repr__(self):
+        CountedRepr.calls += 1
+        return '<counted>'
+
+
+class MockStringError(StringError):
+    "Bad string {string} of length {length}"
+
+class MockKeyValueError(KeyValueError):
+    "No {key} with value {value}"
+
+
+class TestErrors:
+    def test_lazy_message(self):
+        CountedRepr.calls = 0
+        error = MockStringError(CountedRepr())
+
+        assert CountedRepr.calls == 0
+        assert str(error) == 'Bad string <counted> of length 3'
+        assert str(error) == error.message
+        assert CountedRepr.calls == 1
+
+    def test_cause(self):
+        cause = ValueError()
+        error = MockKeyValueError('name', 'x', cause = cause)
+
+        assert error.cause is cause
+        assert str(error) == 'No name with value x'
+
+    def test_pickle(self):
+        error = pickle.loads(pickle.dumps(MockKeyValueError('name', 'x')))
+
+        assert error.key == 'name'
+        assert str(error) == 'No name with value x'
@@ -0,0 +1,67 @@
+from pytest import raises
+
+from bitforge import HDPrivateKey, HDPublicKey
+from bitforge.hdprivkey import HARDENED_START
+
+
+# BIP32 test vector 1 (seed 000102030405060708090a0b0c0d0e0f), as (index,
+# hardened, xpub, xprv) for each step of m/0H/1/2H/2/1000000000:
+MASTER_XPRV = 'xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPPqjiChkVvvNKmPGJxWUtg6LnF5kejMRNNU3TGtRBeJgk33yuGBxrMPHi'
+MASTER_XPUB = 'xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhePY2gZ29ESFjqJoCu1Rupje8YtGqsefD265TMg7usUDFdp6W1EGMcet8'
+
+VECTOR_1 = [
+    (0, True,
+     'xpub68Gmy5EdvgibQVfPdqkBBCHxA5htiqg55crXYuXoQRKfDBFA1WEjWgP6LHhwBZeNK1VTsfTFUHCdrfp1bgwQ9xv5ski8PX9rL2dZXvgGDnw',
+     'xprv9uHRZZhk6KAJC1avXpDAp4MDc3sQKNxDiPvvkX8Br5ngLNv1TxvUxt4cV1rGL5hj6KCesnDYUhd7oWgT11eZG7XnxHrnYeSvkzY7d2bhkJ7'),
+    (1, False,
+     'xpub6ASuArnXKPbfEwhqN6e3mwBcDTgzisQN1wXN9BJcM47sSikHjJf3UFHKkNAWbWMiGj7Wf5uMash7SyYq527Hqck2AxYysAA7xmALppuCkwQ',
+     'xprv9wTYmMFdV23N2TdNG573QoEsfRrWKQgWeibmLntzniatZvR9BmLnvSxqu53Kw1UmYPxLgboyZQaXwTCg8MSY3H2EU4pWcQDnRnrVA1xe8fs'),
+    (2, True,
+     'xpub6D4BDPcP2GT577Vvch3R8wDkScZWzQzMMUm3PWbmWvVJrZwQY4VUNgqFJPMM3No2dFDFGTsxxpG5uJh7n7epu4trkrX7x7DogT5Uv6fcLW5',
+     'xprv9z4pot5VBttmtdRTWfWQmoH1taj2axGVzFqSb8C9xaxKymcFzXBDptWmT7FwuEzG3ryjH4ktypQSAewRiNMjANTtpgP4mLTj34bhnZX7UiM'),
+    (2, False,
+     'xpub6FHa3pjLCk84BayeJxFW2SP4XRrFd1JYnxeLeU8EqN3vDfZmbqBqaGJAyiLjTAwm6ZLRQUMv1ZACTj37sR62cfN7fe5JnJ7dh8zL4fiyLHV',
+     'xprvA2JDeKCSNNZky6uBCviVfJSKyQ1mDYahRjijr5idH2WwLsEd4Hsb2Tyh8RfQMuPh7f7RtyzTtdrbdqqsunu5Mm3wDvUAKRHSC34sJ7in334'),
+    (1000000000, False,
+     'xpub6H1LXWLaKsWFhvm6RVpEL9P4KfRZSW7abD2ttkWP3SSQvnyA8FSVqNTEcYFgJS2UaFcxupHiYkro49S8yGasTvXEYBVPamhGW6cFJodrTHy',
+     'xprvA41z7zogVVwxVSgdKUHDy1SKmdb533PjDz7J6N6mV6uS3ze1ai8FHa8kmHScGpWmj4WggLyQjgPie1rFSruoUihUZREPSL39UNdE3BBDu76'),
+]
+
+
+class TestHDPrivateKey:
+    def test_vector_1(self):
+        key = HDPrivateKey.from_string(MASTER_XPRV)
+
+        assert key.to_string() == MASTER_XPRV
+        assert key.to_hd_public_key().to_string() == MASTER_XPUB
+
+        for index, hardened, xpub, xprv in VECTOR_1:
+            key = key.derive(index, hardened)
+
+            assert key.to_string() == xprv
+            assert key.to_hd_public_key().to_string() == xpub
+
+    def test_hardened_index(self):
+        key = HDPrivateKey.from_string(MASTER_XPRV)
+        assert key.derive(HARDENED_START) == key.derive(0, hardened = True)
+
+
+class TestHDPublicKey:
+    def test_vector_1(self):
+        # Public derivation of the non-hardened steps, from m/0H/1/2H:
+        xprv = HDPrivateKey.from_string(MASTER_XPRV)
+
+        for index, hardened, xpub, _ in VECTOR_1[:3]:
+            xprv = xprv.derive(index, hardened)
+
+        key = xprv.to_hd_public_key()
+
+        for index, hardened, xpub, _ in VECTOR_1[3:]:
+            key = key.derive(index)
+            assert key.to_string() == xpub
+
+        assert HDPublicKey.from_string(xpub).to_string() == xpub
+
+    def test_hardened(self):
+        with raises(ValueError):
+            HDPrivateKey.from_string(MASTER_XPRV).to_hd_public_key().derive(0, hardened = True)
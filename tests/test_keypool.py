@@ -0,0 +1,107 @@
+import os
+import stat
+import time
+
+from pytest import raises
+
+from bitforge import HDPrivateKey
+from bitforge.keypool import *
+
+
+hd_key = HDPrivateKey.from_seed(b'\2' * 32)
+
+
+def wait_for(condition, timeout = 30):
+    deadline = time.time() + timeout
+
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+class TestKeyPool:
+    def test_random(self):
+        with KeyPool(5, background = False) as pool:
+            pool.fill()
+            assert len(pool) == 5
+
+            keys = [ pool.get() for i in range(7) ] # the last 2 are computed on demand
+
+            assert len(set(key.address for key in keys)) == 7
+            assert all(key.index == NO_INDEX for key in keys)
+            assert all(key.privkey.to_public_key() == key.pubkey for key in keys)
+            assert all(key.pubkey.to_address() == key.address for key in keys)
+
+    def test_hd(self):
+        with KeyPool(5, hd_key = hd_key, background = False) as pool:
+            pool.fill()
+            keys = [ pool.get() for i in range(6) ]
+
+        assert [ key.index for key in keys ] == list(range(6))
+        assert all(key.privkey == hd_key.derive(key.index).to_private_key() for key in keys)
+
+    def test_background(self):
+        with KeyPool(6, low_watermark = 3) as pool:
+            wait_for(lambda: len(pool) == 6)
+
+            for i in range(4):
+                pool.get()
+
+            wait_for(lambda: len(pool) == 6)
+
+    def test_invalid_watermark(self):
+        for low_watermark in (0, 7):
+            with raises(KeyPool.InvalidWatermark):
+                KeyPool(6, low_watermark = low_watermark, background = False)
+
+        with KeyPool(2, background = False) as pool:
+            assert pool.low_watermark == 1
+
+    def test_journal(self, tmpdir):
+        path = str(tmpdir.join('keys.journal'))
+
+        with KeyPool(5, hd_key = hd_key, path = path, background = False) as pool:
+            pool.fill()
+            used = [ pool.get() for i in range(3) ]
+
+        with KeyPool(5, hd_key = hd_key, path = path, background = False) as pool:
+            assert len(pool) == 2
+            assert [ pool.get().index for i in range(2) ] == [ 3, 4 ]
+
+        # Derivation resumes after the last key, even with the pool empty:
+        with KeyPool(5, hd_key = hd_key, path = path, background = False) as pool:
+            assert len(pool) == 0
+            assert pool.get().index == 5
+
+    def test_journal_mode(self, tmpdir):
+        path = str(tmpdir.join('keys.journal'))
+
+        with KeyPool(2, path = path, background = False) as pool:
+            pool.fill()
+
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+        # Journals written with a laxer mode are tightened when compacted:
+        os.chmod(path, 0o644)
+        KeyPool(2, path = path, background = False).close()
+
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    def test_journal_torn_write(self, tmpdir):
+        path = tmpdir.join('keys.journal')
+
+        with KeyPool(2, path = str(path), background = False) as pool:
+            pool.fill()
+            expected = list(pool.keys)
+
+        path.write(b'key L1aW4aubDFB7yfras2S1mN3bqg9', mode = 'ab')
+
+        with KeyPool(2, path = str(path), background = False) as pool:
+            assert list(pool.keys) == expected
+
+    def test_invalid_journal(self, tmpdir):
+        path = tmpdir.join('keys.journal')
+        path.write(b'nonsense\n', mode = 'wb')
+
+        with raises(KeyPool.InvalidJournal):
+            KeyPool(2, path = str(path), background = False)
@@ -0,0 +1,209 @@
+import random
+from pytest import raises
+
+from bitforge import PrivateKey, Transaction
+from bitforge.transaction import AddressInput, AddressOutput
+from bitforge.transaction.size import transaction_size
+from bitforge.mempool import *
+
+
+address = PrivateKey(0xC0FFEE).to_address()
+
+
+def spend(*outpoints, **kwargs):
+    # A transaction spending (tx, index) pairs, where tx is a Transaction or a hex ID:
+    inputs = [
+        AddressInput.create(display_id(tx.get_id_bytes()) if isinstance(tx, Transaction) else tx, index, address)
+        for tx, index in outpoints
+    ]
+
+    outputs = [ AddressOutput.create(1000 + i, address) for i in range(kwargs.get('outputs', 1)) ]
+    return Transaction(inputs, outputs)
+
+
+def funding(i):
+    return ('%064x' % (i + 1), 0)
+
+
+def check_aggregates(mempool):
+    # Compare incremental aggregates to values computed from scratch:
+    for txid, entry in mempool.entries.items():
+        ancestors   = mempool.get_ancestors([ txid ])
+        descendants = mempool.get_descendants([ txid ])
+
+        assert entry.ancestor_count == len(ancestors)
+        assert entry.ancestor_size  == sum(e.size for e in ancestors)
+        assert entry.ancestor_fee   == sum(e.fee for e in ancestors)
+
+        assert entry.descendant_count == len(descendants)
+        assert entry.descendant_size  == sum(e.size for e in descendants)
+        assert entry.descendant_fee   == sum(e.fee for e in descendants)
+
+    assert mempool.size == sum(e.size for e in mempool.entries.values())
+
+
+class TestMempool:
+    def test_add(self):
+        mempool = Mempool()
+        tx = spend(funding(0))
+        entry = mempool.add(tx, 1000)
+
+        assert tx.get_id_bytes() in mempool
+        assert entry.size == transaction_size(tx.inputs, tx.outputs) # unsigned, sized as if signed
+        assert mempool.get_spender(*funding(0)) == tx.get_id_bytes()
+
+        with raises(Mempool.AlreadyInMempool):
+            mempool.add(tx, 1000)
+
+        with raises(Mempool.Conflict):
+            mempool.add(spend(funding(0), funding(1)), 1000)
+
+    def test_aggregates(self):
+        mempool = Mempool()
+
+        a = spend(funding(0), outputs = 2)
+        b = spend((a, 0))
+        c = spend((a, 1), (b, 0))
+
+        for tx, fee in [ (a, 100), (b, 200), (c, 300) ]:
+            mempool.add(tx, fee, size = 100)
+
+        entry_a, entry_c = mempool.get(a.get_id_bytes()), mempool.get(c.get_id_bytes())
+
+        assert (entry_a.descendant_count, entry_a.descendant_fee) == (3, 600)
+        assert (entry_c.ancestor_count, entry_c.ancestor_size, entry_c.ancestor_fee) == (3, 300, 600)
+        check_aggregates(mempool)
+
+        removed = mempool.remove(b.get_id_bytes())
+
+        assert sorted(e.txid for e in removed) == sorted([ b.get_id_bytes(), c.get_id_bytes() ])
+        assert (entry_a.descendant_count, entry_a.descendant_fee) == (1, 100)
+        assert mempool.get_spender(display_id(a.get_id_bytes()), 1) is None
+        check_aggregates(mempool)
+
+    def test_limits(self):
+        mempool = Mempool(max_ancestors = 3, max_descendants = 3)
+        chain = [ spend(funding(0)) ]
+        mempool.add(chain[0], 100)
+
+        for i in range(2):
+            chain.append(spend((chain[-1], 0)))
+            mempool.add(chain[-1], 100)
+
+        with raises(Mempool.TooManyAncestors):
+            mempool.add(spend((chain[-1], 0)), 100)
+
+        mempool = Mempool(max_descendants = 2)
+        parent = spend(funding(0), outputs = 3)
+        mempool.add(parent, 100)
+        mempool.add(spend((parent, 0)), 100)
+
+        with raises(Mempool.TooManyDescendants):
+            mempool.add(spend((parent, 1)), 100)
+
+    def test_select(self):
+        mempool = Mempool()
+
+        # A child paying for its parent (CPFP) beats a middling loner:
+        parent = spend(funding(0))
+        child  = spend((parent, 0))
+        loner  = spend(funding(1))
+        cheap  = spend(funding(2))
+
+        mempool.add(parent, 100, size = 100)   # 1 sat/byte
+        mempool.add(child, 1900, size = 100)   # 10 sat/byte with its parent
+        mempool.add(loner, 500, size = 100)    # 5 sat/byte
+        mempool.add(cheap, 200, size = 100)    # 2 sat/byte
+
+        selected = [ e.tx for e in mempool.select(1000) ]
+        assert selected == [ parent, child, loner, cheap ]
+
+        selected = [ e.tx for e in mempool.select(300) ]
+        assert selected == [ parent, child, loner ]
+
+        selected = [ e.tx for e in mempool.select(1000, min_fee_rate = 3) ]
+        assert selected == [ parent, child, loner ]
+
+    def test_select_modified(self):
+        # Once a shared parent is picked, its other child competes on its own:
+        mempool = Mempool()
+
+        parent = spend(funding(0), outputs = 2)
+        rich   = spend((parent, 0))
+        poor   = spend((parent, 1))
+        loner  = spend(funding(1))
+
+        mempool.add(parent, 0, size = 100)
+        mempool.add(rich, 2000, size = 100) # 10 sat/byte with the parent
+        mempool.add(poor, 600, size = 100)  # 3 with the parent, 6 alone
+        mempool.add(loner, 500, size = 100) # 5
+
+        selected = [ e.tx for e in mempool.select(1000) ]
+        assert selected == [ parent, rich, poor, loner ]
+
+    def test_trim(self):
+        mempool = Mempool()
+        txs = [ spend(funding(i)) for i in range(4) ]
+
+        for i, tx in enumerate(txs):
+            mempool.add(tx, 100 * (i + 1), size = 100)
+
+        child = spend((txs[0], 0))
+        mempool.add(child, 50, size = 100)
+
+        removed = mempool.trim(300)
+
+        assert sorted(e.txid for e in removed) == sorted([ txs[0].get_id_bytes(), child.get_id_bytes() ])
+        assert mempool.peek_worst().tx == txs[1]
+        assert mempool.peek_best().tx == txs[3]
+        check_aggregates(mempool)
+
+    def test_remove_block(self):
+        mempool = Mempool()
+
+        parent = spend(funding(0))
+        child  = spend((parent, 0))
+        rival  = spend(funding(1))
+
+        for tx in (parent, child, rival):
+            mempool.add(tx, 100, size = 100)
+
+        # The block confirms the parent, and another spend of rival's output:
+        conflicts = mempool.remove_block([ parent, spend(funding(1), funding(2)) ])
+
+        assert [ e.tx for e in conflicts ] == [ rival ]
+        assert list(mempool.entries) == [ child.get_id_bytes() ]
+        assert mempool.get(child.get_id_bytes()).ancestor_count == 1
+        check_aggregates(mempool)
+
+    def test_random(self):
+        rng = random.Random(1)
+        mempool = Mempool()
+        unspent = [ funding(i) for i in range(50) ]
+
+        for i in range(300):
+            if mempool.entries and rng.random() < 0.2:
+                txid = rng.choice(list(mempool.entries))
+                removed = mempool.remove(txid)
+                check_aggregates(mempool)
+                continue
+
+            outpoints = rng.sample(unspent, min(len(unspent), rng.randint(1, 3)))
+            tx = spend(*outpoints, outputs = 2)
+
+            try:
+                mempool.add(tx, rng.randrange(1000), size = rng.randrange(100, 1000))
+            except (Mempool.Conflict, Mempool.TooManyAncestors, Mempool.TooManyDescendants):
+                continue
+
+            unspent = [ o for o in unspent if o not in outpoints ] + [ (tx, 0), (tx, 1) ]
+
+        check_aggregates(mempool)
+
+        # Selected packages always come after their ancestors:
+        seen = set()
+        for entry in mempool.select(10 ** 9):
+            assert entry.parents <= seen
+            seen.add(entry.txid)
+
+        assert len(seen) == len(mempool)
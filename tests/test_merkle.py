@@ -0,0 +1,135 @@
+import hashlib
+from pytest import raises
+
+from bitforge.encoding import decode_hex
+from bitforge.merkle import *
+
+
+def txid(string):
+    # Transaction IDs are displayed reversed:
+    return decode_hex(string)[::-1]
+
+# Block 100000:
+block_txids = [ txid(s) for s in [
+    '8c14f0db3df150123e6f3dbbf30f8b955a8249b62ac1d1ff16284aefa3d06d87',
+    'fff2525b8931402dd09222c50775608f75787bd2b87e56995a7bdd30f79702c4',
+    '6359f0868171b1d194cbee1af2f16ea598ae8fad666d9b012c8ed2b79a236ec4',
+    'e9a66845e05d5abc0ad04ec80f774a7e585c6e8db975962d069a522137b80c1d',
+]]
+
+block_root = txid('f3e94742aca4b5ef85488dc37c06c3282295ffec960994b2c0d5ac2a25a95766')
+
+
+def fake_hashes(count):
+    return [ hashlib.sha256(str(i).encode('ascii')).digest() for i in range(count) ]
+
+def naive_root(hashes):
+    while len(hashes) > 1:
+        if len(hashes) % 2:
+            hashes = hashes + hashes[-1:]
+
+        hashes = [ hash_pair(hashes[i] + hashes[i + 1]) for i in range(0, len(hashes), 2) ]
+
+    return hashes[0]
+
+
+class TestMerkleRoot:
+    def test_block(self):
+        assert merkle_root(block_txids) == block_root
+
+    def test_sizes(self):
+        assert merkle_root([]) == NULL_HASH
+
+        for count in range(1, 40):
+            hashes = fake_hashes(count)
+            assert merkle_root(hashes) == naive_root(hashes)
+
+
+class TestMerkleTree:
+    def test_build(self):
+        assert MerkleTree(block_txids).get_root() == block_root
+        assert MerkleTree().get_root() == NULL_HASH
+
+    def test_append(self):
+        hashes = fake_hashes(40)
+        tree = MerkleTree()
+
+        for count, hash in enumerate(hashes, 1):
+            tree.append(hash)
+
+            assert len(tree) == count
+            assert tree.get_root() == merkle_root(hashes[:count])
+
+        assert tree.levels == MerkleTree(hashes).levels
+
+    def test_replace(self):
+        hashes = fake_hashes(13)
+        tree = MerkleTree(hashes)
+
+        tree.replace(0, hashes[12])
+        tree.replace(12, hashes[0])
+
+        assert tree.get_root() == merkle_root([ hashes[12] ] + hashes[1:12] + [ hashes[0] ])
+
+        with raises(MerkleTree.InvalidIndex): tree.replace(13, hashes[0])
+        with raises(MerkleTree.InvalidHash): tree.append(b'short')
+
+    def test_branch(self):
+        for count in (1, 2, 5, 16, 17):
+            tree = MerkleTree(fake_hashes(count))
+
+            for index in range(count):
+                branch = tree.get_branch(index)
+                assert branch_root(tree.get_hash(0, index), branch, index) == tree.get_root()
+
+
+class TestPartialMerkleTree:
+    def test_extract(self):
+        for count in (1, 2, 3, 7, 16, 33):
+            hashes = fake_hashes(count)
+
+            for step in (1, 2, 3, 5, count + 1):
+                matches = [ i % step == 0 for i in range(count) ]
+                proof = PartialMerkleTree.create(hashes, matches)
+
+                root, matched = proof.extract()
+                assert root == merkle_root(hashes)
+                assert matched == [ (i, hashes[i]) for i in range(count) if matches[i] ]
+
+                # Flags are padded to whole bytes on the wire:
+                decoded = PartialMerkleTree.from_bytes(proof.to_bytes())
+                assert decoded.extract() == (root, matched)
+                assert decoded.verify(root)
+
+    def test_no_matches(self):
+        proof = PartialMerkleTree.create(block_txids, [ False ] * 4)
+
+        assert proof.hashes == (block_root,)
+        assert proof.extract() == (block_root, [])
+
+    def test_invalid(self):
+        proof = PartialMerkleTree.create(block_txids, [ False, True, False, False ])
+
+        assert not proof.verify(NULL_HASH)
+
+        with raises(PartialMerkleTree.InvalidTree):
+            PartialMerkleTree(0, [], []).extract()
+
+        with raises(PartialMerkleTree.InvalidTree):
+            proof._replace(hashes = proof.hashes[:-1]).extract()
+
+        with raises(PartialMerkleTree.InvalidTree):
+            proof._replace(hashes = proof.hashes + (NULL_HASH,)).extract()
+
+        with raises(PartialMerkleTree.InvalidTree):
+            proof._replace(flags = proof.flags + (False,) * 8).extract()
+
+    def test_duplicate_siblings(self):
+        # A 3-leaf tree and its forged 4-leaf twin share the root (CVE-2012-2459):
+        hashes = fake_hashes(3)
+        forged = PartialMerkleTree.create(hashes + hashes[2:], [ False, False, False, True ])
+
+        assert MerkleTree(hashes + hashes[2:]).get_root() == merkle_root(hashes)
+
+        with raises(PartialMerkleTree.InvalidTree):
+            forged.extract()
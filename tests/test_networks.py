@@ -0,0 +1,62 @@
+from pytest import raises, fixture
+
+from bitforge import networks, Address, PrivateKey
+from bitforge.networks import Network
+
+
+@fixture
+def isolated_networks(monkeypatch):
+    monkeypatch.setattr(networks, '_networks', list(networks._networks))
+    monkeypatch.setattr(networks, '_indexes', dict((attr, dict(index)) for attr, index in networks._indexes.items()))
+
+def altnet():
+    return networks.livenet._replace(
+        name = 'altnet', pubkeyhash = 48, scripthash = 50, wif_prefix = 176,
+        hd_public_key = 0x019da462, hd_private_key = 0x019d9cfe, magic = 0xdbb6c0fb
+    )
+
+
+class TestNetworks:
+    def test_find(self):
+        assert networks.find('livenet') is networks.livenet
+        assert networks.find('testnet') is networks.testnet
+        assert networks.find(111, 'pubkeyhash') is networks.testnet
+        assert networks.find(0x0488ade4, 'hd_private_key') is networks.livenet
+        assert networks.find(networks.testnet) is networks.testnet
+
+    def test_find_unknown(self):
+        with raises(networks.UnknownNetwork):
+            networks.find('nope')
+
+        with raises(networks.UnknownNetwork):
+            networks.find(0, 'nope')
+
+        with raises(networks.UnknownNetwork):
+            networks.find([], 'pubkeyhash')
+
+        assert networks.find('nope', raises = False) is None
+
+    def test_find_unindexed(self):
+        assert networks.find(networks.livenet.seeds, 'seeds') is networks.livenet
+
+    def test_register(self, isolated_networks):
+        network = networks.register(altnet())
+
+        assert networks.find('altnet') is network
+        assert networks.find(48, 'pubkeyhash') is network
+        assert networks.find(176, 'wif_prefix') is network
+
+        address = Address(b'\1' * 20, 'altnet')
+        assert Address.from_string(address.to_string()) == address
+        assert PrivateKey(1, 'altnet').network is network
+
+    def test_register_duplicate(self, isolated_networks):
+        with raises(networks.NetworkAlreadyRegistered):
+            networks.register(networks.livenet._replace(pubkeyhash = 1))
+
+    def test_register_shared_attribute(self, isolated_networks):
+        regtest = networks.register(networks.testnet._replace(name = 'regtest', port = 18444))
+
+        assert networks.find('regtest') is regtest
+        assert networks.find(111, 'pubkeyhash') is networks.testnet
+        assert networks.find(18444, 'port') is regtest
@@ -0,0 +1,192 @@
+import asyncio
+from pytest import raises
+
+from bitforge import PrivateKey, Transaction
+from bitforge.transaction import AddressInput, AddressOutput
+from bitforge.block import GENESIS
+from bitforge.p2p.messages import *
+from bitforge.p2p.peer import Peer, PeerPool, connect
+from bitforge.p2p.testing import FakePeer
+
+
+address = PrivateKey(0xC0FFEE).to_address()
+
+
+def make_transactions(count, offset = 0):
+    return [
+        Transaction([ AddressInput.create('%064x' % (offset + i), 0, address) ], [ AddressOutput.create(i + 1, address) ])
+        for i in range(count)
+    ]
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(asyncio.wait_for(coroutine, 10))
+    finally:
+        loop.close()
+
+
+class TestMessages:
+    def test_roundtrip(self):
+        txs  = make_transactions(3)
+        item = InvItem(MSG_TX, txs[0].get_id_bytes())
+
+        messages = [
+            Version.create(1500000000, 42, start_height = 7, receiver = NetAddress.create('127.0.0.1', 8333, 1)),
+            Verack(),
+            Ping(1), Pong(2),
+            Inv([ item ]), GetData([ item ]), NotFound([]),
+            TxMessage(txs[0]),
+            GetHeaders([ GENESIS['livenet'].get_id_bytes() ]),
+            Headers([ GENESIS['livenet'] ]),
+            BlockMessage(GENESIS['livenet'], txs),
+        ]
+
+        for message in messages:
+            data = encode_message(message)
+            assert encode_message(decode_message(data)) == data
+            assert type(decode_message(data)) == type(message)
+
+        assert decode_message(encode_message(messages[0])) == messages[0]
+
+    def test_header(self):
+        data = encode_message(Verack())
+
+        assert data[:4] == b'\xf9\xbe\xb4\xd9'
+        assert data[4:16] == b'verack' + b'\0' * 6
+        assert decode_header(data) == ('verack', 0, data[20:24])
+
+        with raises(InvalidMagic):
+            decode_message(data, 'testnet')
+
+    def test_invalid(self):
+        data = bytearray(encode_message(Ping(1)))
+        data[-1] ^= 1
+
+        with raises(InvalidChecksum):
+            decode_message(bytes(data))
+
+        with raises(MalformedPayload):
+            decode_payload('ping', b'\0')
+
+        with raises(PayloadTooLarge):
+            decode_header(encode_message(Verack())[:16] + b'\xff' * 8)
+
+    def test_unknown(self):
+        message = decode_payload('sendcmpct', b'\0' * 9)
+
+        assert message == UnknownMessage('sendcmpct', b'\0' * 9)
+
+
+class TestPeer:
+    def test_get_data(self):
+        txs = make_transactions(5)
+
+        async def test():
+            fake = await FakePeer(txs, announce = False).start()
+            peer = await connect('127.0.0.1', fake.port)
+            reading = asyncio.ensure_future(peer.run())
+
+            items  = [ InvItem(MSG_TX, tx.get_id_bytes()) for tx in txs ]
+            result = await peer.get_data(items + [ InvItem(MSG_TX, b'\0' * 32) ])
+
+            assert [ m.transaction.to_bytes() for m in result[:5] ] == [ tx.to_bytes() for tx in txs ]
+            assert result[5] is None
+            assert peer.version.user_agent == USER_AGENT
+
+            peer.close()
+            await reading
+            await fake.close()
+
+        run(test())
+
+    def test_get_data_timeout(self):
+        txs = make_transactions(2)
+
+        async def test():
+            fake = await FakePeer(txs, announce = False, respond = False).start()
+            peer = await connect('127.0.0.1', fake.port)
+            reading = asyncio.ensure_future(peer.run())
+
+            with raises(Peer.RequestTimeout):
+                await peer.get_data([ InvItem(MSG_TX, tx.get_id_bytes()) for tx in txs ], timeout = 0.1)
+
+            assert not peer.pending
+
+            peer.close()
+            await reading
+            await fake.close()
+
+        run(test())
+
+    def test_handshake_failed(self):
+        async def test():
+            fake = await FakePeer(network = 'testnet').start()
+
+            with raises(Peer.HandshakeFailed):
+                await connect('127.0.0.1', fake.port)
+
+            await fake.close()
+
+        run(test())
+
+
+class TestPeerPool:
+    def test_ingest(self):
+        # Two peers with overlapping transactions, each fetched once:
+        txs   = make_transactions(300)
+        fakes = [ FakePeer(txs[:200]), FakePeer(txs[100:]) ]
+
+        async def test():
+            pool = PeerPool(queue_size = 10, max_in_flight = 16)
+
+            for fake in fakes:
+                await fake.start()
+                await pool.connect('127.0.0.1', fake.port)
+
+            received = [ await pool.get() for i in range(300) ]
+
+            assert len(pool) == 2
+            assert sorted(tx.get_id_bytes() for tx in received) == sorted(tx.get_id_bytes() for tx in txs)
+
+            await pool.close()
+            assert len(pool) == 0
+
+            for fake in fakes:
+                await fake.close()
+
+        run(test())
+
+        # Requests are pipelined in windows of at most max_in_flight:
+        requests = fakes[0].requests + fakes[1].requests
+        assert max(len(r.items) for r in requests) <= 16
+        assert sum(len(r.items) for r in requests) == 300
+
+    def test_request_timeout(self):
+        # The first peer announces but never delivers, the second one serves the
+        # transactions once the requests to the first time out:
+        txs    = make_transactions(20)
+        silent = FakePeer(txs, respond = False)
+        backup = FakePeer(txs, announce = False)
+
+        async def test():
+            pool = PeerPool(max_in_flight = 8, request_timeout = 0.2)
+
+            await backup.start()
+            await pool.connect('127.0.0.1', backup.port)
+            await silent.start()
+            await pool.connect('127.0.0.1', silent.port)
+
+            received = [ await pool.get() for i in range(20) ]
+            assert sorted(tx.get_id_bytes() for tx in received) == sorted(tx.get_id_bytes() for tx in txs)
+
+            await pool.close()
+            await silent.close()
+            await backup.close()
+
+        run(test())
+
+        assert sum(len(r.items) for r in silent.requests) == 20
+        assert sum(len(r.items) for r in backup.requests) == 20
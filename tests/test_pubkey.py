@@ -34,6 +34,14 @@ class TestPublicKey:
             PublicKey((0, 0))
 
 
+    def test_trusted(self):
+        pubkey = PublicKey(data['pubkey_pair'])
+
+        assert PublicKey.trusted(data['pubkey_pair']) == pubkey
+        assert PrivateKey.from_hex(data['privkey_hex']).to_public_key() == pubkey
+        assert PublicKey.trusted(data['pubkey_pair'], 'testnet').network is bitforge.networks.testnet
+
+
     def test_unknown_network(self):
         with raises(PublicKey.UnknownNetwork):
             PublicKey(data['pubkey_pair'], network = 'a')
@@ -93,6 +101,22 @@ class TestPublicKey:
             PublicKey.from_bytes(b'a' * 70)
 
 
+    def test_from_bytes_decompression(self):
+        PublicKey.clear_cache()
+
+        for secret in range(1, 50):
+            pubkey = PrivateKey(secret * 0x1F2E3D4C5B6A).to_public_key()
+            compressed = pubkey.to_bytes()
+
+            assert PublicKey.from_bytes(compressed).pair == pubkey.pair
+            assert PublicKey.from_bytes(bytearray(compressed)).pair == pubkey.pair # cached
+            assert PublicKey.from_bytes(pubkey._replace(compressed = False).to_bytes()).pair == pubkey.pair
+
+        # x = 5 isn't the coordinate of any point:
+        with raises(PublicKey.InvalidPair):
+            PublicKey.from_bytes(b'\2' + b'\0' * 31 + b'\5')
+
+
     def test_to_bytes(self):
         bytes = data['pubkey_bin']
         assert PublicKey.from_bytes(bytes).to_bytes() == bytes
@@ -0,0 +1,100 @@
+import random
+
+from pytest import raises
+
+from bitforge import Address, HDPrivateKey, Script, Transaction
+from bitforge.transaction import AddressInput, AddressOutput, ScriptOutput, DataOutput
+from bitforge.script import PayToPubkeyOut, PayToScriptOut, OpReturnOut
+from bitforge.scriptindex import *
+
+
+rng = random.Random(46)
+
+def random_address(type = Address.Type.PublicKey):
+    return Address(bytes(bytearray(rng.getrandbits(8) for i in range(20))), type = type)
+
+def pay(*addresses):
+    inputs = [ AddressInput.create('%064x' % 1, 0, random_address()) ]
+    return Transaction(inputs, [ AddressOutput.create(1000, address) for address in addresses ])
+
+
+class TestScriptIndex:
+    def test_add_get(self):
+        index = ScriptIndex()
+        p2pkh = PayToPubkeyOut.create(random_address())
+        p2sh  = PayToScriptOut.create(p2pkh)
+
+        index.add(p2pkh, 7)
+        index.add(p2sh, 8)
+
+        assert len(index) == 2
+        assert index.get(p2pkh) == 7
+        assert index.get(p2sh) == 8
+        assert PayToPubkeyOut.create(random_address()) not in index
+
+        index.add(p2pkh, 9)
+        assert len(index) == 2
+        assert index.get(p2pkh) == 9
+
+    def test_unsupported(self):
+        with raises(ScriptIndex.UnsupportedScript):
+            ScriptIndex().add(OpReturnOut.create(b'hello'))
+
+    def test_grow(self):
+        index = ScriptIndex()
+        addresses = [ random_address() for i in range(5000) ]
+
+        for i, address in enumerate(addresses):
+            index.add_address(address, i)
+
+        assert len(index) == 5000
+        assert index.capacity >= 10000
+        assert all(index.get(PayToPubkeyOut.create(address)) == i for i, address in enumerate(addresses))
+
+    def test_add_xpub(self):
+        xpub  = HDPrivateKey.from_seed(b'\1' * 32).to_hd_public_key()
+        index = ScriptIndex()
+        index.add_xpub(xpub, 0, 5)
+
+        assert len(index) == 5
+        assert index.get(PayToPubkeyOut.create(xpub.derive(3).to_public_key().to_address())) == 3
+        assert index.get(PayToPubkeyOut.create(xpub.derive(5).to_public_key().to_address())) is None
+
+    def test_match_transaction(self):
+        mine   = random_address()
+        redeem = PayToPubkeyOut.create(random_address())
+
+        index = ScriptIndex()
+        index.add_address(mine, 1)
+        index.add(PayToScriptOut.create(redeem), 2)
+
+        tx = pay(random_address(), mine)
+        tx = Transaction(tx.inputs, tx.outputs + (ScriptOutput.create(1000, redeem), DataOutput.create(b'hello')))
+
+        assert index.match_transaction(tx) == [ (1, 1), (2, 2) ]
+        assert index.match_transaction_bytes(pay(random_address()).to_bytes()) == []
+
+        # Same hash, different kind:
+        assert index.match_transaction(pay(Address(redeem.to_hash()))) == []
+
+    def test_persistence(self, tmpdir):
+        path = str(tmpdir.join('index.bin'))
+        addresses = [ random_address() for i in range(2000) ]
+
+        with ScriptIndex(path) as index:
+            for i, address in enumerate(addresses):
+                index.add_address(address, i)
+
+        with ScriptIndex(path) as index:
+            assert len(index) == 2000
+            assert all(index.get(PayToPubkeyOut.create(address)) == i for i, address in enumerate(addresses))
+
+            index.add_address(random_address())
+            assert len(index) == 2001
+
+    def test_invalid_store(self, tmpdir):
+        path = tmpdir.join('index.bin')
+        path.write(b'not an index', mode = 'wb')
+
+        with raises(ScriptIndex.InvalidStore):
+            ScriptIndex(str(path))
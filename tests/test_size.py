@@ -0,0 +1,96 @@
+from pytest import raises
+
+from bitforge import PrivateKey, Transaction, Script
+from bitforge.transaction import AddressInput, ScriptInput, MultisigInput
+from bitforge.transaction import AddressOutput, ScriptOutput, MultisigOutput, DataOutput
+from bitforge.transaction.size import *
+
+
+privkeys = [ PrivateKey(0xC0FFEE + i) for i in range(3) ]
+pubkeys  = [ pk.to_public_key() for pk in privkeys ]
+address  = privkeys[0].to_address()
+tx_id    = '%064x' % 1
+
+
+def sign_all(tx, keys):
+    for i in range(len(tx.inputs)):
+        tx = tx.sign(keys, i)
+
+    return tx
+
+
+class TestSize:
+    def test_script_size(self):
+        multisig = MultisigInput.create(tx_id, 0, pubkeys, 2)
+        scripts = [
+            Script(),
+            AddressOutput.create(1, address).script,
+            multisig.script,
+            DataOutput.create(b'\xFF' * 80).script,
+            multisig.sign(privkeys[:2], b'\0' * 32).script,
+        ]
+
+        for script in scripts:
+            assert script.size() == len(script.to_bytes())
+
+            for instruction in script.instructions:
+                assert instruction.size() == len(instruction.to_bytes())
+
+    def test_output_size(self):
+        multisig = MultisigInput.create(tx_id, 0, pubkeys, 2)
+        outputs = [
+            AddressOutput.create(1, address),
+            ScriptOutput.create(1, multisig.script),
+            MultisigOutput.create(1, pubkeys, 2),
+            DataOutput.create(b'\xFF' * 40),
+        ]
+
+        for output in outputs:
+            assert output_size(output) == len(output.to_bytes())
+
+    def test_address_input_size(self):
+        tx = Transaction([ AddressInput.create(tx_id, i, address) for i in range(3) ], [ AddressOutput.create(1, address) ])
+        signed = sign_all(tx, privkeys[:1])
+
+        # Signatures take 70 to 72 bytes:
+        assert len(signed.to_bytes()) <= transaction_size(tx.inputs, tx.outputs)
+        assert len(signed.to_bytes()) >= transaction_size(tx.inputs, tx.outputs) - 3 * 2
+
+        # Signed Inputs are measured as they are:
+        assert transaction_size(signed.inputs, signed.outputs) == len(signed.to_bytes())
+
+    def test_uncompressed_address_input_size(self):
+        privkey = PrivateKey(0xC0FFEE, compressed = False)
+        input = AddressInput.create(tx_id, 0, privkey.to_address())
+        signed = input.sign([ privkey ], b'\0' * 32)
+
+        # Compressed keys are assumed, unless told otherwise:
+        assert len(signed.to_bytes()) > input_size(input)
+        assert len(signed.to_bytes()) <= input_size(input, compressed = False)
+        assert input_size(input, compressed = False) == UNCOMPRESSED_ADDRESS_INPUT_SIZE
+
+    def test_multisig_input_size(self):
+        tx = Transaction([ MultisigInput.create(tx_id, 0, pubkeys, 2) ], [ AddressOutput.create(1, address) ])
+        signed = sign_all(tx, privkeys[:2])
+
+        assert len(signed.to_bytes()) <= transaction_size(tx.inputs, tx.outputs)
+        assert len(signed.to_bytes()) >= transaction_size(tx.inputs, tx.outputs) - 2 * 2
+
+    def test_script_input_size(self):
+        redeem = AddressOutput.create(1, address).script
+        input = ScriptInput.create(tx_id, 0, redeem)
+
+        with raises(UnknownInputType):
+            input_size(input)
+
+        signed = input.sign(privkeys[:1], b'\0' * 32)
+        assert len(signed.to_bytes()) <= input_size(input, signatures = 1)
+
+    def test_estimate_fee(self):
+        inputs  = [ AddressInput.create(tx_id, 0, address) ]
+        outputs = [ AddressOutput.create(1, address) ]
+        size = transaction_size(inputs, outputs)
+
+        assert size == 10 + ADDRESS_INPUT_SIZE + ADDRESS_OUTPUT_SIZE
+        assert estimate_fee(inputs, outputs, 1) == size
+        assert estimate_fee(inputs, outputs, 0.5) == (size + 1) // 2
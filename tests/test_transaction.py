@@ -26,6 +26,12 @@ class TestTransaction:
     def test_create(self):
         MockTransaction()
 
+    def test_slots(self):
+        privkey = PrivateKey()
+
+        for obj in [ privkey, privkey.to_public_key(), Input('', 0, Script()), Output(1000, Script()) ]:
+            assert not hasattr(obj, '__dict__')
+
     def test_no_inputs(self):
         with raises(Transaction.NoInputs):
             Transaction([], [])
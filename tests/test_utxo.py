@@ -0,0 +1,204 @@
+from pytest import raises
+
+from bitforge import PrivateKey, Transaction, Script
+from bitforge.encoding import decode_hex, encode_hex
+from bitforge.transaction import AddressInput, AddressOutput, Output, ScriptOutput, DataOutput
+from bitforge.script import PayToPubkeyOut
+from bitforge.utxo import UTXOSet, compress_script, decompress_script
+
+
+privkey = PrivateKey(0xC0FFEE)
+address = privkey.to_address()
+redeem  = Script.from_bytes(decode_hex('5121' + '02' * 33 + '51ae'))
+
+FUNDING_TX_ID = 'ab' * 32
+
+
+def spending_tx(tx_id, index, amount):
+    tx = Transaction(
+        [ AddressInput.create(tx_id, index, address) ],
+        [ AddressOutput.create(amount - 1000, address), DataOutput.create(b'hello') ]
+    )
+
+    return tx.sign([ privkey ], 0)
+
+
+class TestScriptCompression:
+    def test_p2pkh(self):
+        script = PayToPubkeyOut.create(address)
+        compressed = compress_script(script)
+
+        assert compressed == b'\0' + address.phash
+        assert decompress_script(compressed) == script.to_bytes()
+
+    def test_p2sh(self):
+        script = ScriptOutput.create(0, redeem).script
+        compressed = compress_script(script)
+
+        assert len(compressed) == 21 and compressed[:1] == b'\1'
+        assert decompress_script(compressed) == script.to_bytes()
+
+    def test_non_canonical(self):
+        # The P2PKH and P2SH templates, with the hash pushed by OP_PUSHDATA1 and
+        # one byte shorter, so the scripts are 25 and 23 bytes long:
+        scripts = [
+            Script.from_bytes(b'\x76\xa9\x4c\x13' + b'\xab' * 19 + b'\x88\xac'),
+            Script.from_bytes(b'\xa9\x4c\x13' + b'\xab' * 19 + b'\x87'),
+        ]
+
+        for script in scripts:
+            compressed = compress_script(script)
+
+            assert compressed[:1] not in (b'\0', b'\1')
+            assert decompress_script(compressed) == script.to_bytes()
+
+    def test_other(self):
+        compressed = compress_script(redeem)
+
+        assert compressed[:1] == bytes(bytearray([ len(redeem.to_bytes()) + 6 ]))
+        assert decompress_script(compressed) == redeem.to_bytes()
+
+
+class TestUTXOSet:
+    def test_add_get_spend(self):
+        utxos  = UTXOSet()
+        output = AddressOutput.create(5000, address)
+
+        utxos.add(FUNDING_TX_ID, 1, output)
+
+        assert len(utxos) == 1
+        assert (FUNDING_TX_ID, 1) in utxos
+        assert (FUNDING_TX_ID, 0) not in utxos
+        assert utxos.get(FUNDING_TX_ID, 1) == Output(5000, output.script)
+        assert utxos.get(FUNDING_TX_ID, 0) is None
+
+        with raises(UTXOSet.DuplicateOutput):
+            utxos.add(FUNDING_TX_ID, 1, output)
+
+        assert utxos.spend(FUNDING_TX_ID, 1) == Output(5000, output.script)
+        assert len(utxos) == 0
+
+        with raises(UTXOSet.MissingOutput):
+            utxos.spend(FUNDING_TX_ID, 1)
+
+    def test_apply_undo(self):
+        utxos = UTXOSet()
+        funding = AddressOutput.create(10000, address)
+        utxos.add(FUNDING_TX_ID, 0, funding)
+
+        tx = spending_tx(FUNDING_TX_ID, 0, 10000)
+        spent = utxos.apply(tx)
+
+        assert spent == [ Output(10000, funding.script) ]
+        assert (FUNDING_TX_ID, 0) not in utxos
+        assert (encode_hex(tx.get_id_bytes()[::-1]), 0) in utxos
+        assert len(utxos) == 1 # the OP_RETURN output isn't stored
+
+        utxos.undo(tx, spent)
+
+        assert len(utxos) == 1
+        assert utxos.get(FUNDING_TX_ID, 0) == Output(10000, funding.script)
+
+    def test_apply_missing(self):
+        utxos = UTXOSet()
+        utxos.add(FUNDING_TX_ID, 0, AddressOutput.create(10000, address))
+
+        tx = Transaction(
+            [ AddressInput.create(FUNDING_TX_ID, 0, address), AddressInput.create(FUNDING_TX_ID, 1, address) ],
+            [ AddressOutput.create(5000, address) ]
+        )
+
+        with raises(UTXOSet.MissingOutput):
+            utxos.apply(tx)
+
+        assert (FUNDING_TX_ID, 0) in utxos
+
+    def test_apply_duplicate_input(self):
+        utxos = UTXOSet()
+        utxos.add(FUNDING_TX_ID, 0, AddressOutput.create(10000, address))
+
+        tx = Transaction(
+            [ AddressInput.create(FUNDING_TX_ID, 0, address), AddressInput.create(FUNDING_TX_ID, 0, address) ],
+            [ AddressOutput.create(5000, address) ]
+        )
+
+        with raises(UTXOSet.DuplicateInput):
+            utxos.apply(tx)
+
+        assert len(utxos) == 1
+        assert utxos.get(FUNDING_TX_ID, 0) == AddressOutput.create(10000, address)
+
+    def test_apply_oversized_script(self):
+        utxos = UTXOSet()
+        utxos.add(FUNDING_TX_ID, 0, AddressOutput.create(10000, address))
+
+        # Too large to ever execute, and to fit a script length in the set:
+        oversized = Output(1000, Script.from_bytes(b'\x61' * 70000))
+
+        tx = Transaction(
+            [ AddressInput.create(FUNDING_TX_ID, 0, address) ],
+            [ AddressOutput.create(8000, address), oversized ]
+        )
+
+        spent = utxos.apply(tx)
+
+        assert len(spent) == 1
+        assert len(utxos) == 1
+        assert (encode_hex(tx.get_id_bytes()[::-1]), 1) not in utxos
+
+        with raises(UTXOSet.UnspendableOutput):
+            utxos.add(FUNDING_TX_ID, 1, oversized)
+
+    def test_apply_duplicate(self):
+        utxos = UTXOSet()
+        utxos.add(FUNDING_TX_ID, 0, AddressOutput.create(10000, address))
+
+        tx = spending_tx(FUNDING_TX_ID, 0, 10000)
+        utxos.add(encode_hex(tx.get_id_bytes()[::-1]), 0, AddressOutput.create(1, address))
+
+        with raises(UTXOSet.DuplicateOutput):
+            utxos.apply(tx)
+
+        assert (FUNDING_TX_ID, 0) in utxos
+        assert len(utxos) == 2
+
+    def test_compact(self):
+        utxos = UTXOSet()
+
+        for i in range(100):
+            utxos.add(FUNDING_TX_ID, i, Output(i, redeem))
+
+        for i in range(100):
+            if i % 4:
+                utxos.spend(FUNDING_TX_ID, i)
+
+        # More than half the heap was garbage at some point, it was compacted:
+        assert len(utxos.heap) < 50 * len(compress_script(redeem))
+
+        for i in range(100):
+            assert utxos.get(FUNDING_TX_ID, i) == (None if i % 4 else Output(i, redeem))
+
+    def test_snapshot_restore(self, tmpdir):
+        utxos = UTXOSet()
+
+        for i in range(50):
+            script = AddressOutput.create(0, address).script if i % 2 else redeem
+            utxos.add(FUNDING_TX_ID, i, Output(i * 1000, script))
+
+        utxos.spend(FUNDING_TX_ID, 7)
+
+        path = str(tmpdir.join('utxos.bin'))
+        utxos.snapshot(path)
+        restored = UTXOSet.restore(path)
+
+        assert len(restored) == 49
+
+        for i in range(50):
+            assert restored.get(FUNDING_TX_ID, i) == utxos.get(FUNDING_TX_ID, i)
+
+    def test_restore_invalid(self, tmpdir):
+        path = tmpdir.join('bad.bin')
+        path.write_binary(b'not a snapshot at all, not at all')
+
+        with raises(UTXOSet.InvalidSnapshot):
+            UTXOSet.restore(str(path))